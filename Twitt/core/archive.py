@@ -0,0 +1,106 @@
+"""
+Module containing the archival of rows marked as deleted.
+
+Default managers hide rows marked as deleted and the read indexes skip
+them, but the rows themselves still take pages in the hot tables and their
+foreign key and unique indexes. archive_deleted moves them, in batches, to
+cold tables holding each row as JSON under its old primary key. Posts and
+comments are purged again before they move (see core.purge), which also
+releases images of posts not purged yet, and the hot rows are deleted
+through the ORM, so rows still pointing at them are collected.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import (
+    ArchivedComment,
+    ArchivedFollowing,
+    ArchivedLike,
+    ArchivedPost,
+    Comment,
+    Following,
+    Like,
+    Post,
+)
+from .purge import PURGES
+
+# In this order, so rows are archived before the rows they point at.
+ARCHIVES = [
+    (Like, ArchivedLike),
+    (Following, ArchivedFollowing),
+    (Comment, ArchivedComment),
+    (Post, ArchivedPost),
+]
+
+
+def archive_batch(model, archive, batch_size):
+    """
+    Move one batch of rows marked as deleted to their cold table.
+
+    Parameters:
+    model (type): The hot model, e.g. Post.
+    archive (type): Its cold model, e.g. ArchivedPost.
+    batch_size (int): The most rows to move.
+
+    Returns:
+    int: The number of rows moved, 0 once none are left.
+    """
+    marked = model.all_objects.filter(mark_as_deleted=True)
+    ids = list(marked.order_by("pk").values_list("pk", flat=True)[:batch_size])
+    if model in PURGES:
+        for pk in ids:
+            PURGES[model](pk, batch_size)
+    with transaction.atomic():
+        rows = list(marked.filter(pk__in=ids).values())
+        archive.objects.bulk_create(
+            [
+                archive(id=row["id"], created_at=row["created_at"], data=row)
+                for row in rows
+            ],
+            ignore_conflicts=True,
+        )
+        marked.filter(pk__in=[row["id"] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_deleted(batch_size=None):
+    """
+    Move every Post, Like, Comment and Following marked as deleted to the cold tables.
+
+    Each batch is its own transaction, so the hot tables are never locked
+    for the whole run.
+
+    Parameters:
+    batch_size (int): Rows per batch, DELETION_ARCHIVE_BATCH_SIZE by default.
+
+    Returns:
+    dict: Model name to the number of rows moved.
+    """
+    batch_size = batch_size or settings.DELETION_ARCHIVE_BATCH_SIZE
+    stats = {}
+    for model, archive in ARCHIVES:
+        stats[model.__name__] = 0
+        while True:
+            moved = archive_batch(model, archive, batch_size)
+            if not moved:
+                break
+            stats[model.__name__] += moved
+    return stats
+
+
+def table_sizes():
+    """
+    Count the live, marked and archived rows of each archived model.
+
+    Returns:
+    dict: Model name to {"live", "marked", "archived"} counts.
+    """
+    return {
+        model.__name__: {
+            "live": model.objects.count(),
+            "marked": model.all_objects.filter(mark_as_deleted=True).count(),
+            "archived": archive.objects.count(),
+        }
+        for model, archive in ARCHIVES
+    }
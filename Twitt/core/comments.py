@@ -0,0 +1,249 @@
+"""
+Module containing the comment tree: inserting replies and reading threads.
+
+Comments form a tree through Comment.reply_to, and walking it level by
+level costs one query per level or per node. Each comment also stores a
+materialized path: the ordinal of every comment from its top-level ancestor
+down to itself, as fixed-width base36 segments. Ordinals are handed out on
+insert from Post.comment_sequence or the parent's reply_sequence, so the
+paths of a subtree are one contiguous, sibling-ordered range of the
+(post, path) index. comment_thread reads a page of comments at any level
+with their replies, a bounded number per comment and level, in one query.
+"""
+
+import base64
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    PositiveIntegerField,
+    Q,
+    Subquery,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.functions import Concat, Length, Substr
+
+from utils.exceptions.exceptions import InvalidCursorException
+
+from .models import Comment, Post
+
+SEGMENT_WIDTH = 6
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Sorts after every segment, to close the range of a subtree.
+PATH_END = "~"
+
+
+def encode_segment(ordinal):
+    """
+    Encode a sibling ordinal as a path segment sorting in numeric order.
+
+    Parameters:
+    ordinal (int): The ordinal, from 1.
+
+    Returns:
+    str: SEGMENT_WIDTH base36 digits, or PATH_END past the largest ordinal.
+    """
+    if ordinal >= len(DIGITS) ** SEGMENT_WIDTH:
+        return PATH_END
+    digits = []
+    for _ in range(SEGMENT_WIDTH):
+        ordinal, digit = divmod(ordinal, len(DIGITS))
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits))
+
+
+def ancestor_paths(path):
+    """
+    Return the paths of a comment and of every comment above it.
+
+    Parameters:
+    path (str): The path of the comment.
+
+    Returns:
+    list: The paths, from the top-level comment down.
+    """
+    return [path[:end] for end in range(SEGMENT_WIDTH, len(path) + 1, SEGMENT_WIDTH)]
+
+
+def encode_thread_cursor(ordinal):
+    return base64.urlsafe_b64encode(str(ordinal).encode()).decode().rstrip("=")
+
+
+def decode_thread_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ordinal = int(base64.urlsafe_b64decode(padded).decode())
+    except Exception:
+        ordinal = -1
+    if ordinal < 0:
+        raise InvalidCursorException(
+            item="Cursor", message="Cursor is not valid or has expired."
+        )
+    return ordinal
+
+
+def add_comment(user, post, comment_text, reply_to=None):
+    """
+    Create a comment, or a reply, with its path, and update the counters above it.
+
+    The ordinal is taken by incrementing the sequence of the post or the
+    parent, whose row stays locked until the transaction ends, so
+    concurrent replies get distinct ordinals.
+
+    Parameters:
+    user (User): The author.
+    post (Post): The post commented on; ignored for replies, which go on the parent's post.
+    comment_text (str): The text.
+    reply_to (Comment): The parent comment, or None for a top-level comment.
+
+    Returns:
+    Comment: The new comment.
+    """
+    with transaction.atomic():
+        if reply_to is None:
+            Post.objects.filter(pk=post.pk).update(
+                comment_sequence=F("comment_sequence") + 1
+            )
+            ordinal = Post.objects.values_list("comment_sequence", flat=True).get(
+                pk=post.pk
+            )
+            path, depth = encode_segment(ordinal), 0
+        else:
+            parent = Q(pk=reply_to.pk)
+            Comment.objects.filter(
+                post_id=reply_to.post_id, path__in=ancestor_paths(reply_to.path)
+            ).update(
+                descendant_count=F("descendant_count") + 1,
+                reply_count=Case(
+                    When(parent, then=F("reply_count") + 1),
+                    default=F("reply_count"),
+                    output_field=PositiveIntegerField(),
+                ),
+                reply_sequence=Case(
+                    When(parent, then=F("reply_sequence") + 1),
+                    default=F("reply_sequence"),
+                    output_field=PositiveIntegerField(),
+                ),
+            )
+            ordinal = Comment.objects.values_list("reply_sequence", flat=True).get(
+                pk=reply_to.pk
+            )
+            post = reply_to.post
+            path, depth = reply_to.path + encode_segment(ordinal), reply_to.depth + 1
+        return Comment.objects.create(
+            user=user,
+            post=post,
+            reply_to=reply_to,
+            comment_text=comment_text,
+            path=path,
+            depth=depth,
+        )
+
+
+def comment_thread(
+    post_id, root_id=None, cursor=None, limit=None, depth=None, replies=None
+):
+    """
+    Return one page of the comments of a post, or of the replies to a comment, with their replies.
+
+    The page holds up to `limit` comments of one level, after `cursor`.
+    Below each, `depth` levels of replies are nested, at most `replies` per
+    comment, in creation order. Everything is read in one query.
+
+    Parameters:
+    post_id (UUID): The post.
+    root_id (UUID): A comment of the post; its replies are paged, and the
+        page is returned under it. None pages the top-level comments.
+    cursor (str): The cursor returned with the previous page of this level.
+    limit (int): Comments on the paged level, COMMENT_THREAD_PAGE_SIZE by default.
+    depth (int): Levels of replies below it, COMMENT_THREAD_DEPTH by default.
+    replies (int): Replies per comment below it, COMMENT_THREAD_REPLIES by default.
+
+    Returns:
+    tuple: The list of comments, each with a `replies` list, and the
+        cursor of the next page, or None. With root_id the list is the root
+        alone, or empty if it does not exist.
+    """
+    limit = limit or settings.COMMENT_THREAD_PAGE_SIZE
+    depth = settings.COMMENT_THREAD_DEPTH if depth is None else depth
+    replies = replies or settings.COMMENT_THREAD_REPLIES
+    after = decode_thread_cursor(cursor) if cursor else 0
+
+    comments = Comment.objects.all()
+    if root_id:
+        root = comments.filter(pk=root_id, post_id=post_id)
+        base = Subquery(root.values("path")[:1])
+        level = Subquery(root.values("depth")[:1]) + 1
+        sequence = Subquery(root.values("reply_sequence")[:1])
+    else:
+        base, level = Value(""), Value(0)
+        sequence = Subquery(
+            Post.objects.filter(pk=post_id).values("comment_sequence")[:1]
+        )
+
+    # The subtrees of ordinals after + 1 to after + limit on the paged level.
+    page = Q(
+        post_id=post_id,
+        path__gte=Concat(
+            base, Value(encode_segment(after + 1)), output_field=TextField()
+        ),
+        path__lt=Concat(
+            base, Value(encode_segment(after + limit + 1)), output_field=TextField()
+        ),
+        depth__lte=level + depth,
+    )
+    # Below it, only the first `replies` ordinals of each level.
+    for below in range(1, depth + 1):
+        segment = Substr(
+            "path", Length(base) + below * SEGMENT_WIDTH + 1, SEGMENT_WIDTH
+        )
+        page &= Q(depth__lt=level + below) | Q(
+            **{"segment_{}__lte".format(below): encode_segment(replies)}
+        )
+        comments = comments.alias(**{"segment_{}".format(below): segment})
+
+    rows = (
+        # post_id is repeated in each branch so both can use an index.
+        comments.filter(Q(pk=root_id, post_id=post_id) | page if root_id else page)
+        .annotate(sequence=sequence)
+        .select_related("user")
+        .order_by("path")
+    )
+    return _nest(rows, after, limit, replies, root_id)
+
+
+def _nest(rows, after, limit, replies, root_id):
+    # Rows come in path order, so parents come before their replies.
+    nodes, top, sequence = {}, [], None
+    for comment in rows:
+        comment.replies = []
+        comment.replies_cursor = None
+        sequence = comment.sequence
+        parent = nodes.get(comment.path[:-SEGMENT_WIDTH])
+        if parent is not None:
+            parent.replies.append(comment)
+        elif str(comment.pk) == str(root_id) if root_id else comment.depth == 0:
+            top.append(comment)
+        else:
+            # Below a comment marked as deleted, awaiting its purge.
+            continue
+        nodes[comment.path] = comment
+
+    root = top[0] if root_id and top else None
+    for comment in nodes.values():
+        # Below the paged level, replies were cut after ordinal `replies`.
+        if comment is not root and comment.replies and comment.reply_sequence > replies:
+            comment.replies_cursor = encode_thread_cursor(replies)
+
+    next_cursor = None
+    if sequence is not None and sequence > after + limit:
+        next_cursor = encode_thread_cursor(after + limit)
+    if root is not None:
+        root.replies_cursor = next_cursor
+    return top, next_cursor
@@ -1,48 +1,153 @@
 import json
-import time
-from channels.generic.websocket import WebsocketConsumer
-from .models import Like, Post
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from utils.exceptions.exceptions import InvalidCursorException
+from utils.validators import is_valid_uuid
+from .notifications import (
+    like_count_group,
+    mark_seen,
+    notification_group,
+    unread_notifications,
+)
 
 
-class Consumer(WebsocketConsumer):
-    def connect(self):
-        self.accept()
-        while int(1) in Post.objects.all().values_list("no_of_likes", flat=True):
-            self.send(text_data=json.dumps({"value": Like.objects.count()}))
-            time.sleep(2)
-        self.close()
+class LikeCountConsumer(AsyncWebsocketConsumer):
+    """
+    Stream live like counts for the posts a client subscribes to.
 
-    def disconnect(self, close_code):
-        pass
+    Clients send {"subscribe": [post_id, ...]} or {"unsubscribe": [post_id, ...]}
+    and receive {"post_id": ..., "count": ...} whenever the likes of a
+    subscribed post change, at most once per LIKE_COUNT_STREAM_INTERVAL.
+    Updates are pushed by core.notifications.publisher, so the consumer
+    never queries the database.
+    """
 
-    def receive(self, text_data):
-        self.send(text_data=text_data)
-        self.close()
+    async def connect(self):
+        self.post_ids = set()
+        await self.accept()
 
+    async def disconnect(self, close_code):
+        for post_id in self.post_ids:
+            await self.channel_layer.group_discard(
+                like_count_group(post_id), self.channel_name
+            )
 
-import json
-from channels.generic.websocket import AsyncWebsocketConsumer
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+
+        for post_id in data.get("unsubscribe") or []:
+            if post_id in self.post_ids:
+                self.post_ids.discard(post_id)
+                await self.channel_layer.group_discard(
+                    like_count_group(post_id), self.channel_name
+                )
+
+        for post_id in data.get("subscribe") or []:
+            if len(self.post_ids) >= settings.LIKE_COUNT_MAX_SUBSCRIPTIONS:
+                break
+            if not isinstance(post_id, str) or not is_valid_uuid(post_id):
+                continue
+            if post_id not in self.post_ids:
+                self.post_ids.add(post_id)
+                await self.channel_layer.group_add(
+                    like_count_group(post_id), self.channel_name
+                )
+
+    async def like_count(self, event):
+        await self.send(
+            text_data=json.dumps({"post_id": event["post_id"], "count": event["count"]})
+        )
 
 
 class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Push notifications to a user, replaying the unread ones stored while offline.
+
+    On connect, unread notifications after the `cursor` query parameter (the
+    cursor of the last notification the client received) are sent oldest
+    first as {"notifications": [...], "cursor": ..., "more": ...} frames, at
+    most NOTIFICATION_REPLAY_LIMIT of them. Clients send {"replay": cursor}
+    to fetch the next pages and {"seen": cursor} to mark notifications up to
+    that cursor as read. New notifications arrive as single objects; one may
+    also appear in a replay, so clients drop duplicates by id.
+    """
+
     async def connect(self):
         self.user = self.scope["user"]
-        self.group_name = f"user_{self.user.id}"
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+        self.group_name = notification_group(self.user.id)
 
         # Join room group
         await self.channel_layer.group_add(self.group_name, self.channel_name)
 
         await self.accept()
+        query = parse_qs(self.scope.get("query_string", b"").decode())
+        try:
+            await self.replay(query.get("cursor", [None])[0])
+        except InvalidCursorException as exception:
+            await self.send(text_data=json.dumps({"error": exception.message}))
+            await self.replay(None)
 
     async def disconnect(self, close_code):
         # Leave room group
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if self.user.is_authenticated:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data):
-        pass
+        try:
+            data = json.loads(text_data)
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+
+        try:
+            if isinstance(data.get("seen"), str):
+                await database_sync_to_async(mark_seen)(self.user.id, data["seen"])
+            if "replay" in data:
+                await self.replay(data["replay"])
+        except InvalidCursorException as exception:
+            await self.send(text_data=json.dumps({"error": exception.message}))
+
+    async def replay(self, cursor):
+        """
+        Send the unread notifications after cursor in pages, up to NOTIFICATION_REPLAY_LIMIT.
+        """
+        if cursor is not None and not isinstance(cursor, str):
+            return
+        page_size = settings.NOTIFICATION_REPLAY_PAGE_SIZE
+        sent = 0
+        while sent < settings.NOTIFICATION_REPLAY_LIMIT:
+            notifications, next_cursor = await database_sync_to_async(
+                unread_notifications
+            )(self.user.id, cursor, page_size)
+            if not notifications:
+                break
+            cursor = notifications[-1]["cursor"]
+            sent += len(notifications)
+            await self.send(
+                text_data=json.dumps(
+                    {
+                        "notifications": notifications,
+                        "cursor": cursor,
+                        "more": next_cursor is not None,
+                    }
+                )
+            )
+            if next_cursor is None:
+                break
 
     async def send_notification(self, event):
         notification = event["notification"]
 
         # Send message to WebSocket
-        await self.send(text_data=json.dumps({"notification": notification}))
+        await self.send(text_data=json.dumps(notification))
@@ -0,0 +1,50 @@
+"""
+Module containing the home feed engine.
+
+The feed of a user is the set of posts written by the accounts they follow.
+It is fetched in one query, joining Following -> target -> posts through a
+subquery, ordered newest first and paged with a keyset cursor. The number of
+queries per page does not depend on how many accounts the user follows.
+
+With settings.FEED_FANOUT_ON_WRITE enabled, pages are read from the
+materialized timeline in core.timeline instead.
+"""
+
+from django.conf import settings
+
+from utils.keyset import paginate
+from .models import Following, Post
+from .timeline import get_timeline
+
+
+def feed_queryset(user):
+    """
+    Build the unpaged feed queryset for a user.
+
+    Parameters:
+    user (User): The user reading the feed.
+
+    Returns:
+    QuerySet: Posts of every account the user follows, with authors joined.
+    """
+    targets = Following.objects.filter(follower=user).values("target_id")
+    return Post.objects.filter(user_id__in=targets).select_related("user")
+
+
+def get_feed(user, cursor=None, limit=None):
+    """
+    Fetch one page of the home feed of a user.
+
+    Parameters:
+    user (User): The user reading the feed.
+    cursor (str): An optional cursor returned with the previous page.
+    limit (int): The page size, defaults to settings.FEED_PAGE_SIZE.
+
+    Returns:
+    tuple: A (posts, next_cursor) pair. next_cursor is None on the last page.
+    """
+    if settings.FEED_FANOUT_ON_WRITE:
+        return get_timeline(user, cursor=cursor, limit=limit)
+
+    limit = limit or settings.FEED_PAGE_SIZE
+    return paginate(feed_queryset(user), cursor=cursor, limit=limit)
@@ -0,0 +1,238 @@
+"""
+Module containing the image variant pipeline for Post.image and User.profile_pic.
+
+Uploads are stored as sent, which can be multi-megabyte screenshots and
+camera files. Once the transaction saving a new image commits, a worker
+thread decodes it and writes resized WebP and JPEG variants, without EXIF
+or other metadata, and records them in the model's `<field>_variants` JSON
+field. Serializers and templates pick a variant from there and fall back to
+the original while the variants are not ready yet.
+
+Pillow releases the GIL while decoding, resizing and encoding, so a small
+thread pool keeps several cores busy without blocking request threads.
+"""
+
+import io
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def variants_field(field_name):
+    """
+    Return the name of the JSON field holding the variants of an image field.
+
+    Parameters:
+    field_name (str): The image field name, e.g. `image`.
+
+    Returns:
+    str: The variants field name, e.g. `image_variants`.
+    """
+    return "{}_variants".format(field_name)
+
+
+def variant_path(name, label, extension):
+    """
+    Return the storage path of one variant of a stored image.
+
+    Parameters:
+    name (str): The storage name of the original image.
+    label (str): The variant label, e.g. `small`.
+    extension (str): The variant file extension, `webp` or `jpeg`.
+
+    Returns:
+    str: A path under variants/ named after the original, e.g. variants/posts/a.jpg/small.webp.
+    """
+    return "variants/{}/{}.{}".format(name, label, extension)
+
+
+def _resize(image, width, height):
+    if height:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.Resampling.LANCZOS)
+
+
+def _flatten(image):
+    if image.mode in ("RGBA", "LA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_variants(name, specs):
+    """
+    Decode a stored image and write its resized variants to storage.
+
+    EXIF orientation is applied to the pixels and every other piece of
+    metadata is dropped; only the ICC colour profile is kept. JPEG sources
+    are decoded at a reduced DCT scale when the largest variant allows it.
+
+    Parameters:
+    name (str): The storage name of the original image.
+    specs (dict): Variant label to (width, height). A height of None keeps
+        the aspect ratio and never upscales; otherwise the image is cropped
+        to exactly that size.
+
+    Returns:
+    dict: {"source": name, "sizes": {label: {"width", "height", "cropped", "webp", "jpeg"}}}
+    """
+    quality = settings.IMAGE_VARIANT_QUALITY
+    sizes = {}
+    with default_storage.open(name) as source, Image.open(source) as image:
+        image.draft(
+            "RGB",
+            (
+                max(width for width, _ in specs.values()),
+                max(height or 1 for _, height in specs.values()),
+            ),
+        )
+        icc_profile = image.info.get("icc_profile")
+        image = _flatten(ImageOps.exif_transpose(image))
+
+        for label, (width, height) in specs.items():
+            variant = _resize(image, width, height)
+            sizes[label] = {
+                "width": variant.width,
+                "height": variant.height,
+                "cropped": bool(height),
+            }
+            for extension, format in FORMATS.items():
+                buffer = io.BytesIO()
+                variant.save(
+                    buffer,
+                    format,
+                    quality=quality,
+                    optimize=format == "JPEG",
+                    icc_profile=icc_profile,
+                )
+                path = variant_path(name, label, extension)
+                default_storage.delete(path)
+                sizes[label][extension] = default_storage.save(
+                    path, ContentFile(buffer.getvalue())
+                )
+    return {"source": name, "sizes": sizes}
+
+
+def variant_urls(variants):
+    """
+    Return a variants mapping with storage paths replaced by URLs.
+
+    Parameters:
+    variants (dict): A mapping returned by render_variants.
+
+    Returns:
+    dict: Variant label to {"width", "height", "cropped", "webp", "jpeg"} with URLs.
+    """
+    return {
+        label: dict(
+            size,
+            **{extension: default_storage.url(size[extension]) for extension in FORMATS}
+        )
+        for label, size in (variants or {}).get("sizes", {}).items()
+    }
+
+
+class ImageVariantProcessor:
+    """
+    ImageVariantProcessor renders image variants on worker threads off the request path.
+
+    Attributes:
+        executor (ThreadPoolExecutor): Worker threads rendering variants.
+        stats (dict): Running totals of jobs, failures and seconds spent.
+
+    Methods:
+        - schedule(instance, field_name, specs): Render variants for a model image after commit if it changed.
+        - process(model, pk, field_name, name, specs): Render variants and record them on the row, blocking.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.stats = {"jobs": 0, "failed": 0, "seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_VARIANT_WORKERS,
+                    thread_name_prefix="image-variants",
+                )
+            return self.executor
+
+    def schedule(self, instance, field_name, specs):
+        """
+        Queue variant rendering for an image field once the current transaction commits.
+
+        Nothing is queued when the field is empty or its variants already
+        belong to the stored file, so unrelated saves cost nothing.
+
+        Parameters:
+        instance (Model): The saved model instance.
+        field_name (str): The image field to render, e.g. `image`.
+        specs (dict): Variant label to (width, height), see render_variants.
+        """
+        name = getattr(instance, field_name).name
+        variants = getattr(instance, variants_field(field_name)) or {}
+        if not name or variants.get("source") == name:
+            return
+        model, pk = type(instance), instance.pk
+        transaction.on_commit(
+            lambda: self._executor().submit(
+                self.process, model, pk, field_name, name, specs
+            )
+        )
+
+    def process(self, model, pk, field_name, name, specs):
+        """
+        Render the variants of one stored image and record them on its row.
+
+        The row is only updated while it still points at the same file.
+        Identical uploads share one blob and therefore one set of variants,
+        so nothing is deleted here; collect_media_garbage removes variants
+        whose source blob is gone.
+
+        Parameters:
+        model (type): The model class owning the image.
+        pk (UUID): The primary key of the row.
+        field_name (str): The image field, e.g. `image`.
+        name (str): The storage name the variants are rendered from.
+        specs (dict): Variant label to (width, height), see render_variants.
+
+        Returns:
+        bool: Whether the row was updated.
+        """
+        started = time.perf_counter()
+        target = variants_field(field_name)
+        updated = False
+        try:
+            variants = render_variants(name, specs)
+            rows = model._default_manager.filter(pk=pk, **{field_name: name})
+            updated = bool(rows.update(**{target: variants}))
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Rendering variants of %s failed", name)
+        finally:
+            close_old_connections()
+
+        self.stats["jobs"] += 1
+        self.stats["seconds"] += time.perf_counter() - started
+        return updated
+
+
+processor = ImageVariantProcessor()
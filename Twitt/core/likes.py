@@ -0,0 +1,129 @@
+"""
+Module containing the like counter.
+
+Likes and dislikes run in one transaction: the Like row is inserted or
+deleted first, guarded by the unique (user, post) constraint, and the
+counter is only moved when that row actually changed. The counter is moved
+with a database-side F() expression, so concurrent requests never lose an
+update and only the counter column is written.
+
+When settings.LIKE_COUNTER_SHARDS is above 1, the delta goes to a random
+LikeCounterShard row instead of the post row. `fold_like_shards` moves the
+accumulated shard totals back into Post.no_of_likes.
+"""
+
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import Like, LikeCounterShard, Post
+
+
+def _move_counter(post_id, delta):
+    shards = settings.LIKE_COUNTER_SHARDS
+    if shards <= 1:
+        Post.objects.filter(id=post_id).update(no_of_likes=F("no_of_likes") + delta)
+        return
+
+    shard = random.randrange(shards)
+    updated = LikeCounterShard.objects.filter(post_id=post_id, shard=shard).update(
+        count=F("count") + delta
+    )
+    if not updated:
+        LikeCounterShard.objects.bulk_create(
+            [LikeCounterShard(post_id=post_id, shard=shard)], ignore_conflicts=True
+        )
+        LikeCounterShard.objects.filter(post_id=post_id, shard=shard).update(
+            count=F("count") + delta
+        )
+
+
+def like_post(user, post):
+    """
+    Like a post on behalf of a user.
+
+    Parameters:
+    user (User): The user liking the post.
+    post (Post): The post being liked.
+
+    Returns:
+    Like: The new Like, or None if the user had already liked the post.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                like = Like.objects.create(user=user, post=post)
+        except IntegrityError:
+            return None
+        _move_counter(post.id, 1)
+    return like
+
+
+def unlike_post(user, post):
+    """
+    Remove the like of a user from a post.
+
+    Parameters:
+    user (User): The user removing their like.
+    post (Post): The post being disliked.
+
+    Returns:
+    bool: True if a like was removed, False if there was none.
+    """
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post=post).delete()
+        if not deleted:
+            return False
+        _move_counter(post.id, -1)
+    return True
+
+
+def like_count(post):
+    """
+    Read the like count of a post, including unfolded counter shards.
+
+    Parameters:
+    post (Post): The post to count likes for.
+
+    Returns:
+    int: The number of likes.
+    """
+    if settings.LIKE_COUNTER_SHARDS <= 1:
+        return Post.objects.values_list("no_of_likes", flat=True).get(id=post.id)
+
+    return (
+        Post.objects.filter(id=post.id)
+        .annotate(total=F("no_of_likes") + Sum("like_counter_shards__count", default=0))
+        .values_list("total", flat=True)
+        .get()
+    )
+
+
+def fold_like_shards():
+    """
+    Move shard totals into Post.no_of_likes and delete the folded shards.
+
+    Each post is folded in its own short transaction with its shard rows
+    locked, so likes arriving meanwhile are either folded or kept.
+
+    Returns:
+    int: The number of posts folded.
+    """
+    post_ids = list(
+        LikeCounterShard.objects.values_list("post_id", flat=True).distinct()
+    )
+    folded = 0
+    for post_id in post_ids:
+        with transaction.atomic():
+            shards = list(
+                LikeCounterShard.objects.select_for_update().filter(post_id=post_id)
+            )
+            total = sum(shard.count for shard in shards)
+            Post.objects.filter(id=post_id).update(no_of_likes=F("no_of_likes") + total)
+            LikeCounterShard.objects.filter(
+                id__in=[shard.id for shard in shards]
+            ).delete()
+        folded += 1
+    return folded
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_deleted, table_sizes
+
+
+class Command(BaseCommand):
+    """
+    Move posts, likes, comments and followings marked as deleted to the cold tables.
+
+    Meant to run periodically, so the hot tables only hold live rows. Purges
+    of deleted posts and comments that were still queued when a process
+    stopped are finished on the way. Row counts are printed before and after.
+    """
+
+    help = "Archive rows marked as deleted into the cold tables in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.write_sizes("before", table_sizes())
+        started = time.perf_counter()
+        stats = archive_deleted(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Archived {} ({:.2f}s).".format(
+                    ", ".join(
+                        "{} {}".format(moved, name) for name, moved in stats.items()
+                    ),
+                    time.perf_counter() - started,
+                )
+            )
+        )
+        self.write_sizes("after", table_sizes())
+
+    def write_sizes(self, label, sizes):
+        for name, counts in sizes.items():
+            self.stdout.write(
+                "{:<7} {:<10} live={live} marked={marked} archived={archived}".format(
+                    label, name, **counts
+                )
+            )
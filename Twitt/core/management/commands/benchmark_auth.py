@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from core.models import Post, User
+from core.views import UserPostListAPIView
+from utils.authentication import (
+    CachedJWTAuthentication,
+    VersionedRefreshToken,
+    user_cache,
+)
+
+
+class Command(BaseCommand):
+    """
+    Compare queries and latency per request of the JWT authentication classes.
+
+    Requests list the posts of the authenticated user, which takes one query
+    of its own. Fixtures are created inside a transaction that is rolled back.
+    The skip lookup case only differs from a miss with a shared default cache.
+    """
+
+    help = "Report queries and latency per request with and without the user cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(
+                username="bench_auth", email="bench_auth@example.com"
+            )
+            Post.objects.create(user=user, image="posts/bench.jpg", caption="bench")
+            token = VersionedRefreshToken.for_user(user).access_token
+            request = APIRequestFactory().get(
+                "/user/posts/", HTTP_AUTHORIZATION="Bearer {}".format(token)
+            )
+
+            cases = [
+                ("JWTAuthentication", [JWTAuthentication], False, True),
+                ("cached, miss", [CachedJWTAuthentication], False, True),
+                ("cached, hit", [CachedJWTAuthentication], False, False),
+                ("skip lookup, miss", [CachedJWTAuthentication], True, True),
+            ]
+            self.stdout.write(
+                "{:<20} {:>14} {:>14} {:>10}".format(
+                    "authentication", "auth queries", "queries/req", "ms/req"
+                )
+            )
+            for name, classes, skip, cold in cases:
+                view = UserPostListAPIView.as_view(
+                    authentication_classes=classes, skip_user_lookup=skip
+                )
+                self.run_case(name, view, request, options["requests"], cold)
+            transaction.set_rollback(True)
+        user_cache.clear()
+
+    def run_case(self, name, view, request, count, cold):
+        user_cache.clear()
+        view(request)
+        queries = 0
+        started = time.perf_counter()
+        for _ in range(count):
+            if cold:
+                user_cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = view(request)
+            queries += len(context.captured_queries)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.data
+        self.stdout.write(
+            "{:<20} {:>14.2f} {:>14.2f} {:>10.3f}".format(
+                name,
+                # Listing the posts takes one query.
+                queries / count - 1,
+                queries / count,
+                elapsed * 1000 / count,
+            )
+        )
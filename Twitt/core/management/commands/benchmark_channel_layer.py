@@ -0,0 +1,182 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+
+from django.core.management.base import BaseCommand
+
+from utils.channel_layer import BrokerChannelLayer, ChannelBroker
+
+
+def run_broker(ports):
+    broker = ChannelBroker(port=0)
+
+    async def serve():
+        ports.put(await broker.start())
+        await broker.serve_forever()
+
+    asyncio.run(serve())
+
+
+def run_worker(port, groups, expected, batch, ready, results):
+    layer = BrokerChannelLayer(port=port, batch=batch, capacity=expected)
+
+    async def consume():
+        received = 0
+        last = None
+        done = asyncio.Event()
+
+        async def drain(channel):
+            nonlocal received, last
+            while True:
+                await layer.receive(channel)
+                last = time.time()
+                received += 1
+                if received >= expected:
+                    done.set()
+
+        tasks = []
+        for group in range(groups):
+            channel = await layer.new_channel()
+            await layer.group_add("bench_{}".format(group), channel)
+            tasks.append(asyncio.ensure_future(drain(channel)))
+        ready.put(True)
+        idle = 0
+        while not done.is_set() and idle < 20:
+            before = received
+            await asyncio.sleep(0.25)
+            idle = idle + 1 if received == before else 0
+        for task in tasks:
+            task.cancel()
+        results.put(
+            {
+                "received": received,
+                "last": last,
+                "dropped": layer.stats["dropped"],
+            }
+        )
+
+    asyncio.run(consume())
+
+
+class Command(BaseCommand):
+    """
+    Measure channel layer throughput from one sender to several worker processes.
+
+    A ChannelBroker runs in its own process, and each worker process joins
+    every benchmark group with one channel, as daphne workers would with
+    their sockets. The sender makes concurrent group_send calls in chunks.
+    The command reports group_send calls per second on the sender and
+    delivered messages per second across all workers, batched and with one
+    write per message for comparison.
+    """
+
+    help = "Measure BrokerChannelLayer messages per second across worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--groups", type=int, default=100)
+        parser.add_argument("--messages", type=int, default=20000)
+        parser.add_argument("--chunk", type=int, default=500)
+        parser.add_argument(
+            "--no-batch",
+            action="store_true",
+            help="Only run with one write per message.",
+        )
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context("fork")
+        ports = context.Queue()
+        broker = context.Process(target=run_broker, args=(ports,), daemon=True)
+        broker.start()
+        port = ports.get(timeout=10)
+
+        modes = [False] if options["no_batch"] else [True, False]
+        self.stdout.write(
+            "{:>8} {:>8} {:>9} {:>10} {:>13} {:>10} {:>8}".format(
+                "batched",
+                "workers",
+                "messages",
+                "send/s",
+                "delivered",
+                "deliver/s",
+                "dropped",
+            )
+        )
+        try:
+            for batch in modes:
+                self.run_round(context, port, batch, options)
+        finally:
+            broker.terminate()
+            broker.join()
+
+    def run_round(self, context, port, batch, options):
+        groups, messages = options["groups"], options["messages"]
+        expected = messages  # Every worker is in every group.
+        ready, results = context.Queue(), context.Queue()
+        workers = [
+            context.Process(
+                target=run_worker,
+                args=(port, groups, expected, batch, ready, results),
+                daemon=True,
+            )
+            for _ in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+        for _ in workers:
+            ready.get(timeout=30)
+
+        layer = BrokerChannelLayer(port=port, batch=batch)
+        started, sent = asyncio.run(
+            self.send_all(layer, groups, messages, options["chunk"])
+        )
+
+        reports = []
+        for _ in workers:
+            try:
+                reports.append(results.get(timeout=60))
+            except queue.Empty:
+                break
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+
+        delivered = sum(report["received"] for report in reports)
+        finished = max(
+            (report["last"] or started for report in reports), default=started
+        )
+        dropped = layer.stats["dropped"] + sum(report["dropped"] for report in reports)
+        self.stdout.write(
+            "{:>8} {:>8} {:>9} {:>10,.0f} {:>13,} {:>10,.0f} {:>8}".format(
+                "yes" if batch else "no",
+                len(workers),
+                messages,
+                messages / (sent - started),
+                delivered,
+                delivered / (finished - started) if finished > started else 0,
+                dropped,
+            )
+        )
+
+    async def send_all(self, layer, groups, messages, chunk):
+        # Connect before timing; nothing is subscribed to this group.
+        while not layer.stats["published"]:
+            await layer.group_send("bench_warm_up", {"type": "warm.up"})
+            await asyncio.sleep(0.05)
+        layer.stats.update(published=0, writes=0, dropped=0)
+        started = time.time()
+        for offset in range(0, messages, chunk):
+            await asyncio.gather(
+                *(
+                    layer.group_send(
+                        "bench_{}".format(number % groups),
+                        {"type": "bench.message", "number": number},
+                    )
+                    for number in range(offset, min(offset + chunk, messages))
+                )
+            )
+        sent = time.time()
+        await layer.close()
+        return started, sent
@@ -0,0 +1,143 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.comments import add_comment, comment_thread
+from core.models import Comment, Post, User
+
+SHAPES = {
+    # Most comments reply to a random earlier one, so threads are wide.
+    "wide": 0.8,
+    # Every comment but the first of each thread replies to the latest one.
+    "deep": 1.0,
+}
+
+
+class Command(BaseCommand):
+    """
+    Compare reading a comment thread level by level with comment_thread.
+
+    For each shape, a post gets --comments comments through add_comment, at
+    most --max-depth levels deep, and the whole thread is read by following
+    reply_to one comment at a time, one level at a time, and with one
+    comment_thread query. The first page and a page of replies deep in the
+    thread are timed too. Fixtures are created inside a transaction that is
+    rolled back.
+    """
+
+    help = "Report queries and latency of comment thread reads on 10k-comment threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument("--max-depth", type=int, default=10)
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        self.stdout.write(
+            "{:<6} {:<22} {:>8} {:>9} {:>10}".format(
+                "shape", "read", "rows", "queries", "ms"
+            )
+        )
+        with transaction.atomic():
+            user = User.objects.create(
+                username="bench_thread", email="bench_thread@example.com"
+            )
+            for shape, reply_rate in SHAPES.items():
+                post = Post.objects.create(
+                    user=user, image="posts/bench.jpg", caption="bench"
+                )
+                started = time.perf_counter()
+                deepest = self.build(user, post, reply_rate, options)
+                self.write_row(
+                    shape,
+                    "add_comment",
+                    options["comments"],
+                    None,
+                    (time.perf_counter() - started) * 1000 / options["comments"],
+                )
+                depth = options["max_depth"]
+                self.run(shape, "per comment", lambda: self.per_comment(post))
+                self.run(shape, "per level", lambda: self.per_level(post))
+                self.run(
+                    shape,
+                    "comment_thread, all",
+                    lambda: comment_thread(post.id, None, None, 10**6, depth, 10**6)[0],
+                )
+                self.run(shape, "first page", lambda: comment_thread(post.id)[0])
+                self.run(
+                    shape,
+                    "deepest page",
+                    lambda: comment_thread(post.id, deepest.reply_to_id)[0],
+                )
+            transaction.set_rollback(True)
+
+    def build(self, user, post, reply_rate, options):
+        made, deepest = [], None
+        for _ in range(options["comments"]):
+            parents = [c for c in made[-50:] if c.depth < options["max_depth"] - 1]
+            parent = None
+            if parents and random.random() < reply_rate:
+                parent = parents[-1] if reply_rate == 1.0 else random.choice(parents)
+            comment = add_comment(user, post, "bench", reply_to=parent)
+            made.append(comment)
+            if deepest is None or comment.depth > deepest.depth:
+                deepest = comment
+        return deepest
+
+    def per_comment(self, post):
+        def load(comment):
+            comment.replies = [
+                load(reply) for reply in comment.all_replies.select_related("user")
+            ]
+            return comment
+
+        return [
+            load(comment)
+            for comment in Comment.objects.filter(
+                post=post, reply_to=None
+            ).select_related("user")
+        ]
+
+    def per_level(self, post):
+        level = list(
+            Comment.objects.filter(post=post, reply_to=None).select_related("user")
+        )
+        top = level
+        while level:
+            by_id = {comment.id: comment for comment in level}
+            for comment in level:
+                comment.replies = []
+            level = list(
+                Comment.objects.filter(reply_to__in=list(by_id)).select_related("user")
+            )
+            for comment in level:
+                by_id[comment.reply_to_id].replies.append(comment)
+        return top
+
+    def run(self, shape, name, read):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # Counted by hand: the debug query log only keeps the last 9000.
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            comments = read()
+            elapsed = time.perf_counter() - started
+        rows, stack = 0, list(comments)
+        while stack:
+            comment = stack.pop()
+            rows += 1
+            stack.extend(comment.replies)
+        self.write_row(shape, name, rows, len(queries), elapsed * 1000)
+
+    def write_row(self, shape, name, rows, queries, ms):
+        self.stdout.write(
+            "{:<6} {:<22} {:>8} {:>9} {:>10.1f}".format(
+                shape, name, rows, "-" if queries is None else queries, ms
+            )
+        )
@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.comments import encode_segment
+from core.models import Comment, Like, Post, User
+from core.purge import delete_post, purge_post
+
+
+class Command(BaseCommand):
+    """
+    Compare deleting a post in the request with marking it and purging it later.
+
+    For each size, two posts get that many likes and top-level comments.
+    One is deleted through the ORM cascade, as the API used to, and the other
+    with delete_post, whose purge_post is then timed as the worker would run
+    it. Fixtures are created inside a transaction that is rolled back.
+    """
+
+    help = (
+        "Report request latency and queries of post deletion by number of dependents."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", type=int, nargs="+", default=[0, 100, 1000, 10000]
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            "{:>8} {:<14} {:>9} {:>10}".format("rows", "delete", "queries", "ms")
+        )
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(
+                    username="bench_delete_{}".format(i),
+                    email="d{}@example.com".format(i),
+                )
+                for i in range(max(options["sizes"]) or 1)
+            )
+            for size in options["sizes"]:
+                cascade, marked = self.build(users, size), self.build(users, size)
+                self.run(size * 2, "cascade", lambda: cascade.delete())
+                self.run(size * 2, "delete_post", lambda: delete_post(marked))
+                self.run(size * 2, "purge_post", lambda: purge_post(marked.pk))
+            transaction.set_rollback(True)
+
+    def build(self, users, size):
+        post = Post.objects.create(
+            user=users[0], image="posts/bench.jpg", caption="bench"
+        )
+        Like.objects.bulk_create(Like(user=user, post=post) for user in users[:size])
+        Comment.objects.bulk_create(
+            Comment(
+                user=users[0],
+                post=post,
+                comment_text="bench",
+                path=encode_segment(i + 1),
+            )
+            for i in range(size)
+        )
+        return post
+
+    def run(self, rows, name, delete):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            delete()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{:>8} {:<14} {:>9} {:>10.1f}".format(
+                rows, name, len(queries), elapsed * 1000
+            )
+        )
@@ -0,0 +1,73 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Post, User
+from core.views import DisLikeAPIView, LikeAPIView, PostRetrieveAPIView
+
+
+class Command(BaseCommand):
+    """
+    Benchmark core views on error-heavy traffic against a success path.
+
+    Requests go through the full DRF dispatch, including the project
+    exception handler, with authentication forced so only view and error
+    handling costs are measured. Fixtures are rolled back afterwards.
+    """
+
+    help = "Report latency of invalid-UUID and missing-post requests next to a successful request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=500)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            user = User.objects.create(
+                username="bench_errors", email="bench_errors@example.com"
+            )
+            post = Post.objects.create(
+                user=user, image="posts/bench.jpg", caption="bench"
+            )
+            cases = [
+                (
+                    "success (retrieve post)",
+                    PostRetrieveAPIView.as_view(),
+                    lambda: factory.get("/", {"post_id": str(post.id)}),
+                ),
+                (
+                    "invalid uuid (like)",
+                    LikeAPIView.as_view(),
+                    lambda: factory.post("/", {"post_id": "not-a-uuid"}),
+                ),
+                (
+                    "missing post (like)",
+                    LikeAPIView.as_view(),
+                    lambda: factory.post("/", {"post_id": str(uuid.uuid4())}),
+                ),
+                (
+                    "missing post (dislike)",
+                    DisLikeAPIView.as_view(),
+                    lambda: factory.post("/", {"post_id": str(uuid.uuid4())}),
+                ),
+            ]
+            for name, view, build in cases:
+                elapsed = 0.0
+                for _ in range(options["number"]):
+                    request = build()
+                    force_authenticate(request, user=user)
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    elapsed += time.perf_counter() - started
+                self.stdout.write(
+                    "{:<24} {:>4} {:>10.1f} us/request".format(
+                        name,
+                        response.status_code,
+                        elapsed * 1e6 / options["number"],
+                    )
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,90 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.feed import get_feed
+from core.models import Following, Post, User
+
+
+class Command(BaseCommand):
+    """
+    Benchmark the home feed engine against the per-follow query loop it replaced.
+
+    Fixtures are created inside a transaction that is rolled back, so the
+    command can be pointed at any database without leaving rows behind.
+    """
+
+    help = (
+        "Report query count and latency of the home feed at 10, 100 and 1,000 follows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--follows", type=int, nargs="+", default=[10, 100, 1000])
+        parser.add_argument("--posts-per-user", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            "{:>8} {:>14} {:>14} {:>14} {:>14}".format(
+                "follows", "legacy queries", "legacy ms", "feed queries", "feed ms"
+            )
+        )
+        for follows in options["follows"]:
+            with transaction.atomic():
+                reader = self.build_fixture(follows, options["posts_per_user"])
+                legacy = self.measure(self.legacy_feed, reader, options["repeat"])
+                engine = self.measure(get_feed, reader, options["repeat"])
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                "{:>8} {:>14} {:>14.2f} {:>14} {:>14.2f}".format(
+                    follows, legacy[0], legacy[1], engine[0], engine[1]
+                )
+            )
+
+    def build_fixture(self, follows, posts_per_user):
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username="bench_{}_{}".format(tag, i),
+                    email="bench_{}_{}@example.com".format(tag, i),
+                )
+                for i in range(follows + 1)
+            ]
+        )
+        reader, targets = users[0], users[1:]
+        Following.objects.bulk_create(
+            [Following(target=target, follower=reader) for target in targets]
+        )
+        Post.objects.bulk_create(
+            [
+                Post(user=target, image="posts/bench.jpg", caption="bench")
+                for target in targets
+                for _ in range(posts_per_user)
+            ]
+        )
+        return reader
+
+    def measure(self, func, reader, repeat):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            func(reader)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func(reader)
+        elapsed = (time.perf_counter() - started) * 1000 / repeat
+        return len(queries), elapsed
+
+    def legacy_feed(self, reader):
+        feed = []
+        for following in Following.objects.filter(follower=reader):
+            feed.extend(Post.objects.filter(user=following.target))
+        return feed
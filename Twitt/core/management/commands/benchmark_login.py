@@ -0,0 +1,133 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils.module_loading import import_string
+from rest_framework.test import APIRequestFactory
+
+from core.models import User
+from core.views import UserLoginAPIView
+from utils.authentication import VersionedRefreshToken
+
+PASSWORD = "bench-login-password"
+
+TUNABLE = "utils.hashers.TunablePBKDF2PasswordHasher"
+
+HASHERS = [
+    ("pbkdf2_sha256 1M", TUNABLE, 1000000),
+    ("pbkdf2_sha256 600k", TUNABLE, 600000),
+    ("pbkdf2_sha256 100k", TUNABLE, 100000),
+    ("scrypt", "django.contrib.auth.hashers.ScryptPasswordHasher", None),
+    ("argon2", "django.contrib.auth.hashers.Argon2PasswordHasher", None),
+    ("bcrypt_sha256", "django.contrib.auth.hashers.BCryptSHA256PasswordHasher", None),
+]
+
+
+class Command(BaseCommand):
+    """
+    Report logins per second per core under each password hasher setting.
+
+    Logins run one after another in this process through UserLoginAPIView,
+    so CPU time per login is the cost of one core. The first login of each
+    row re-hashes the password stored with the previous setting and is not
+    timed. Queries include the OutstandingToken row of the issued token. A row for the former authenticate() path and one for attempts
+    refused by the rate limit are added for comparison. Fixtures are created
+    inside a transaction that is rolled back.
+    """
+
+    help = "Measure logins per second per core for each password hasher setting."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=10)
+        parser.add_argument("--attempts", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.factory = APIRequestFactory()
+        self.view = UserLoginAPIView.as_view()
+        self.stdout.write(
+            "{:<22} {:>12} {:>10} {:>12} {:>10}".format(
+                "hasher", "logins/core", "ms/login", "queries", "status"
+            )
+        )
+        with transaction.atomic():
+            user = User.objects.create(
+                username="bench_login",
+                email="bench_login@example.com",
+                password=make_password(PASSWORD),
+            )
+            unlimited = override_settings(
+                LOGIN_RATE_LIMIT_ATTEMPTS=10**9,
+                LOGIN_RATE_LIMIT_ADDRESS_ATTEMPTS=10**9,
+            )
+            with unlimited:
+                for name, path, iterations in HASHERS:
+                    hasher = import_string(path)()
+                    if hasher.library:
+                        try:
+                            hasher._load_library()
+                        except ValueError:
+                            self.stdout.write("{:<22} not installed".format(name))
+                            continue
+                    with override_settings(
+                        PASSWORD_HASHERS=self.hashers(path),
+                        PASSWORD_PBKDF2_ITERATIONS=iterations or 1000000,
+                    ):
+                        self.run_logins(name, user, options["logins"])
+                with override_settings(
+                    PASSWORD_HASHERS=self.hashers(TUNABLE),
+                    PASSWORD_PBKDF2_ITERATIONS=1000000,
+                ):
+                    self.run_logins("authenticate() 1M", user, options["logins"], True)
+            with override_settings(LOGIN_RATE_LIMIT_ATTEMPTS=0):
+                self.run_limited(user, options["attempts"])
+            transaction.set_rollback(True)
+
+    def hashers(self, preferred):
+        # Keep the others so the hash stored by the previous row verifies.
+        paths = dict.fromkeys(path for _, path, _ in HASHERS)
+        return [preferred] + [path for path in paths if path != preferred]
+
+    def login(self, user, password=PASSWORD):
+        request = self.factory.post(
+            "/api/v1/user/login/",
+            {"email": user.email, "password": password},
+            format="json",
+        )
+        return self.view(request)
+
+    def run_logins(self, name, user, count, legacy=False):
+        # Re-hashes the password with the hasher of this row.
+        response = self.login(user)
+        assert response.status_code == 200, response.data
+        queries = 0
+        cpu, started = time.process_time(), time.perf_counter()
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as context:
+                if legacy:
+                    User.objects.filter(email=user.email).first()
+                    legacy_user = authenticate(username=user.email, password=PASSWORD)
+                    str(VersionedRefreshToken.for_user(legacy_user).access_token)
+                else:
+                    response = self.login(user)
+            queries += len(context.captured_queries)
+        cpu, elapsed = time.process_time() - cpu, time.perf_counter() - started
+        self.write_row(name, count / cpu, elapsed * 1000 / count, queries / count, 200)
+
+    def run_limited(self, user, count):
+        cpu, started = time.process_time(), time.perf_counter()
+        for _ in range(count):
+            response = self.login(user, "wrong-password")
+        cpu, elapsed = time.process_time() - cpu, time.perf_counter() - started
+        self.write_row(
+            "rate limited", count / cpu, elapsed * 1000 / count, 0, response.status_code
+        )
+
+    def write_row(self, name, per_core, ms, queries, status):
+        self.stdout.write(
+            "{:<22} {:>12,.1f} {:>10.2f} {:>12.2f} {:>10}".format(
+                name, per_core, ms, queries, status
+            )
+        )
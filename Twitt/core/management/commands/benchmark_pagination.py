@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Comment, Post, User
+from utils.keyset import encode_cursor, paginate
+
+
+class Command(BaseCommand):
+    """
+    Compare keyset and offset pagination of a post's comments at increasing depth.
+
+    Fixtures are created inside a transaction that is rolled back.
+    """
+
+    help = "Report page latency at page 1 and deep pages for keyset and OFFSET paging."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100000)
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 10000])
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        page_size, repeat = options["page_size"], options["repeat"]
+        with transaction.atomic():
+            user = User.objects.create(
+                username="bench_pages", email="bench_pages@example.com"
+            )
+            post = Post.objects.create(
+                user=user, image="posts/bench.jpg", caption="bench"
+            )
+            Comment.objects.bulk_create(
+                (
+                    Comment(user=user, post=post, comment_text="bench")
+                    for _ in range(options["rows"])
+                ),
+                batch_size=5000,
+            )
+            comments = Comment.objects.filter(post=post)
+            ordered = comments.order_by("-created_at", "-id")
+
+            self.stdout.write(
+                "{:>8} {:>12} {:>12}".format("page", "keyset ms", "offset ms")
+            )
+            for page in options["pages"]:
+                offset = (page - 1) * page_size
+                cursor = None
+                if offset:
+                    previous = ordered[offset - 1]
+                    cursor = encode_cursor(previous.created_at, previous.id)
+
+                keyset = self.time(
+                    lambda: paginate(comments, cursor=cursor, limit=page_size),
+                    repeat,
+                )
+                offset_ms = self.time(
+                    lambda: list(ordered[offset : offset + page_size]), repeat
+                )
+                self.stdout.write(
+                    "{:>8} {:>12.3f} {:>12.3f}".format(page, keyset, offset_ms)
+                )
+            transaction.set_rollback(True)
+
+    def time(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeat
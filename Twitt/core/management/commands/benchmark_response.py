@@ -0,0 +1,51 @@
+import inspect
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.response import Response
+
+from utils.custom_response import APIResponse
+
+
+def legacy_response(message="", data={}):
+    """Build a success response the way APIResponse did with inspect.stack()."""
+    # The old APIResponse walked the stack twice, in __new__ and __init__.
+    inspect.stack()[1].function
+    caller_function = inspect.stack()[1].function
+    message = message or f'{caller_function.replace("_", "-").title()} Successful.'
+    return Response(dict(success=True, message=message, data=data))
+
+
+def nested(depth, func):
+    if depth:
+        return nested(depth - 1, func)
+    return func()
+
+
+class Command(BaseCommand):
+    """
+    Micro-benchmark the per-response overhead of APIResponse.
+
+    Responses are built `depth` frames deep to approximate the call stack of
+    a real request going through middleware, DRF dispatch and the handler.
+    """
+
+    help = (
+        "Compare APIResponse construction with the old inspect.stack() based builder."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--number", type=int, default=2000)
+        parser.add_argument("--depth", type=int, default=40)
+
+    def handle(self, *args, **options):
+        number, depth = options["number"], options["depth"]
+        cases = [
+            ("inspect.stack()", lambda: nested(depth, legacy_response)),
+            ("APIResponse", lambda: nested(depth, lambda: APIResponse(data={}))),
+        ]
+        for name, func in cases:
+            seconds = timeit.timeit(func, number=number)
+            self.stdout.write(
+                "{:<16} {:>10.2f} us/response".format(name, seconds * 1e6 / number)
+            )
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+from django.test.utils import override_settings
+
+from core.comments import add_comment
+from core.likes import like_post, unlike_post
+from core.models import Following, Post, User
+from utils.write_queue import write_queue
+
+PROFILES = [
+    # Django's defaults: rollback journal and a 5 second busy timeout.
+    ("default", {}, {"journal_mode": "DELETE"}, False),
+    ("tuned", settings.DATABASES["default"]["OPTIONS"], settings.SQLITE_PRAGMAS, False),
+    (
+        "tuned+queue",
+        settings.DATABASES["default"]["OPTIONS"],
+        settings.SQLITE_PRAGMAS,
+        True,
+    ),
+]
+
+
+class Command(BaseCommand):
+    """
+    Compare concurrent write throughput of the SQLite profiles.
+
+    Worker threads, each with its own connection like daphne's request
+    threads, run a mix of likes, dislikes, comments, follows and unfollows on
+    fixture rows for --seconds per profile: Django's default SQLite options,
+    the tuned options from settings, and the tuned options with writes sent
+    through utils.write_queue. Writes failing with "database is locked" are
+    counted as errors, as a request would fail. The database stays in the
+    journal mode of the last profile, WAL; fixture rows are deleted afterwards.
+    """
+
+    help = "Report requests/s and lock errors of concurrent writes per SQLite profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--seconds", type=float, default=10.0)
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark needs the SQLite backend.")
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            User(
+                username="bench_writes_{}_{}".format(tag, i),
+                email="bench_writes_{}_{}@example.com".format(tag, i),
+            )
+            for i in range(options["users"])
+        )
+        posts = Post.objects.bulk_create(
+            Post(user=users[i % len(users)], image="posts/bench.jpg", caption="bench")
+            for i in range(options["posts"])
+        )
+        self.stdout.write(
+            "{:<12} {:>9} {:>9} {:>8} {:>8} {:>8} {:>10}".format(
+                "profile",
+                "requests",
+                "req/s",
+                "errors",
+                "p50 ms",
+                "p99 ms",
+                "per commit",
+            )
+        )
+        database = connection.settings_dict
+        original = database["OPTIONS"]
+        try:
+            for name, database["OPTIONS"], pragmas, queued in PROFILES:
+                connection.close()
+                with override_settings(
+                    SQLITE_PRAGMAS=pragmas, DATABASE_WRITE_QUEUE=queued
+                ):
+                    self.run(name, users, posts, options)
+        finally:
+            database["OPTIONS"] = original
+            connection.close()
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def request(self, users, posts):
+        user, post = random.choice(users), random.choice(posts)
+        action = random.random()
+        if action < 0.5:
+            write_queue.run(random.choice((like_post, unlike_post)), user, post)
+        elif action < 0.8:
+            write_queue.run(add_comment, user, post, "bench")
+        elif action < 0.9:
+            write_queue.run(
+                Following.objects.get_or_create,
+                target=user,
+                follower=random.choice(users),
+            )
+        else:
+            write_queue.run(
+                Following.objects.filter(
+                    target=user, follower=random.choice(users)
+                ).delete
+            )
+
+    def run(self, name, users, posts, options):
+        latencies, errors, failures = [], [0], []
+        batches = write_queue.stats["batches"]
+        deadline = time.perf_counter() + options["seconds"]
+
+        def worker():
+            try:
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        self.request(users, posts)
+                    except OperationalError:
+                        errors[0] += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            except Exception as exc:
+                failures.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if failures:
+            raise CommandError("Workers failed: {!r}".format(failures[0]))
+
+        latencies.sort()
+        commits = write_queue.stats["batches"] - batches
+        self.stdout.write(
+            "{:<12} {:>9} {:>9.0f} {:>8} {:>8.1f} {:>8.1f} {:>10}".format(
+                name,
+                len(latencies),
+                len(latencies) / elapsed,
+                errors[0],
+                latencies[len(latencies) // 2] * 1000 if latencies else 0,
+                latencies[len(latencies) * 99 // 100] * 1000 if latencies else 0,
+                "{:.1f}".format(len(latencies) / commits) if commits else "1",
+            )
+        )
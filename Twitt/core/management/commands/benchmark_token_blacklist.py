@@ -0,0 +1,101 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+from utils.blacklist import BlacklistFilter, compact_expired_tokens
+
+
+class Command(BaseCommand):
+    """
+    Follow blacklist lookup latency as the token tables grow, then compact them.
+
+    At each step the tables grow by that many blacklisted tokens, half of
+    them expired, and lookups of tokens that were never blacklisted are
+    timed with a query each and through BlacklistFilter. The last row is
+    measured after compact_expired_tokens. Fixtures are created inside a
+    transaction that is rolled back.
+    """
+
+    help = "Report token table sizes and blacklist lookup latency with and without the filter."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--steps", type=int, nargs="+", default=[1000, 10000, 100000]
+        )
+        parser.add_argument("--lookups", type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            "{:<10} {:>12} {:>12} {:>12} {:>12} {:>11} {:>10}".format(
+                "stage",
+                "outstanding",
+                "blacklisted",
+                "query us",
+                "filter us",
+                "rebuild ms",
+                "filter kB",
+            )
+        )
+        with transaction.atomic():
+            for step in options["steps"]:
+                self.grow(step)
+                self.measure("+{}".format(step), options["lookups"])
+            compact_expired_tokens()
+            self.measure("compacted", options["lookups"])
+            transaction.set_rollback(True)
+
+    def grow(self, count):
+        now = timezone.now()
+        tokens = OutstandingToken.objects.bulk_create(
+            (
+                OutstandingToken(
+                    jti=uuid.uuid4().hex,
+                    token="bench",
+                    created_at=now,
+                    expires_at=now + timedelta(days=-1 if i % 2 else 1),
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+        BlacklistedToken.objects.bulk_create(
+            (BlacklistedToken(token=token) for token in tokens), batch_size=5000
+        )
+
+    def measure(self, stage, lookups):
+        jtis = [uuid.uuid4().hex for _ in range(lookups)]
+
+        started = time.perf_counter()
+        for jti in jtis:
+            BlacklistedToken.objects.filter(token__jti=jti).exists()
+        query_us = (time.perf_counter() - started) * 1e6 / lookups
+
+        blacklist = BlacklistFilter()
+        started = time.perf_counter()
+        blacklist.rebuild()
+        rebuild_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for jti in jtis:
+            blacklist.is_blacklisted(jti)
+        filter_us = (time.perf_counter() - started) * 1e6 / lookups
+
+        self.stdout.write(
+            "{:<10} {:>12} {:>12} {:>12.1f} {:>12.1f} {:>11.1f} {:>10}".format(
+                stage,
+                OutstandingToken.objects.count(),
+                BlacklistedToken.objects.count(),
+                query_us,
+                filter_us,
+                rebuild_ms,
+                blacklist.metrics()["bytes"] // 1024,
+            )
+        )
@@ -0,0 +1,159 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+from rest_framework.test import force_authenticate
+
+from core.models import User
+from core.views import PostCreateAPIView
+
+DEFAULT_HANDLERS = [
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
+
+def resident_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class Command(BaseCommand):
+    """
+    Send a burst of large image uploads through PostCreateAPIView and report peak RSS.
+
+    Each request body is read from a file on disk, as a WSGI server would
+    stream it, so the measured memory is what the upload path itself holds.
+    Posts are rolled back, media goes to a temporary MEDIA_ROOT and the
+    fixture users are deleted afterwards. Linux only (reads /proc).
+    """
+
+    help = "Measure latency and peak RSS of a burst of large uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--uploads", type=int, default=100)
+        parser.add_argument("--size-mb", type=int, default=10)
+        parser.add_argument("--concurrency", type=int, default=10)
+        parser.add_argument(
+            "--default-handlers",
+            action="store_true",
+            help="Use Django's memory/temporary-file handlers for comparison.",
+        )
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        body_path = os.path.join(media_root, "body")
+        self.write_body(body_path, options["size_mb"])
+
+        settings = {"MEDIA_ROOT": media_root, "IMAGE_UPLOAD_MAX_SIZE": 64 << 20}
+        if options["default_handlers"]:
+            settings["FILE_UPLOAD_HANDLERS"] = DEFAULT_HANDLERS
+
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username="upload_{}_{}".format(tag, i),
+                    email="upload_{}_{}@example.com".format(tag, i),
+                )
+                for i in range(options["concurrency"])
+            ]
+        )
+        try:
+            with override_settings(**settings):
+                self.run_burst(body_path, users, options)
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+            shutil.rmtree(media_root)
+
+    def write_body(self, path, size_mb):
+        side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+        image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG", compress_level=0)
+        buffer.seek(0)
+        buffer.name = "burst.png"
+        with open(path, "wb") as body:
+            body.write(
+                encode_multipart(BOUNDARY, {"caption": "burst", "image": buffer})
+            )
+
+    def run_burst(self, body_path, users, options):
+        view = PostCreateAPIView.as_view()
+        length = os.path.getsize(body_path)
+        statuses = []
+
+        def upload(index):
+            user = users[index % len(users)]
+            with open(body_path, "rb") as body:
+                request = WSGIRequest(
+                    {
+                        "REQUEST_METHOD": "POST",
+                        "PATH_INFO": "/",
+                        "CONTENT_TYPE": MULTIPART_CONTENT,
+                        "CONTENT_LENGTH": str(length),
+                        "SERVER_NAME": "testserver",
+                        "SERVER_PORT": "80",
+                        "wsgi.input": body,
+                    }
+                )
+                force_authenticate(request, user=user)
+                try:
+                    with transaction.atomic():
+                        response = view(request)
+                        transaction.set_rollback(True)
+                finally:
+                    close_old_connections()
+            statuses.append(response.status_code)
+
+        peak = baseline = resident_bytes()
+        done = threading.Event()
+
+        def sample():
+            nonlocal peak
+            while not done.wait(0.005):
+                peak = max(peak, resident_bytes())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            list(executor.map(upload, range(options["uploads"])))
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+
+        self.stdout.write(
+            "{} uploads of {:.1f} MB, {} at a time, {} handlers".format(
+                options["uploads"],
+                length / (1 << 20),
+                options["concurrency"],
+                "default" if options["default_handlers"] else "streaming",
+            )
+        )
+        self.stdout.write(
+            "status codes: {}".format(
+                {code: statuses.count(code) for code in sorted(set(statuses))}
+            )
+        )
+        self.stdout.write(
+            "{:.2f} s total, {:.1f} ms per upload".format(
+                elapsed, elapsed * 1000 / options["uploads"]
+            )
+        )
+        self.stdout.write(
+            "RSS baseline {:.1f} MB, peak {:.1f} MB (+{:.1f} MB)".format(
+                baseline / (1 << 20), peak / (1 << 20), (peak - baseline) / (1 << 20)
+            )
+        )
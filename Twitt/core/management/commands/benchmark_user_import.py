@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    """
+    Import a generated file of users through import_users and roll it back.
+
+    One row in DUPLICATE_EVERY repeats an earlier email, to exercise the
+    duplicate checks. Hashing at the production iteration count would take
+    hours per million users, so PASSWORD_PBKDF2_ITERATIONS is lowered to
+    --iterations; the throughput of the pipeline around it is what is
+    measured. The file is written before the import starts, so it does not
+    add to the peak memory reported.
+    """
+
+    help = "Report users/s and peak memory of import_users on a generated file."
+
+    DUPLICATE_EVERY = 100
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000)
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **options):
+        descriptor, path = tempfile.mkstemp(suffix=".jsonl")
+        try:
+            with os.fdopen(descriptor, "w") as output:
+                for number in range(options["rows"]):
+                    if number and number % self.DUPLICATE_EVERY == 0:
+                        number -= 1
+                    output.write(
+                        json.dumps(
+                            {
+                                "email": "bench_import_{}@example.com".format(number),
+                                "username": "bench_import_{}".format(number),
+                                "first_name": "Bench",
+                                "password": "bench-password-{}".format(number),
+                            }
+                        )
+                        + "\n"
+                    )
+            with override_settings(
+                PASSWORD_PBKDF2_ITERATIONS=options["iterations"]
+            ), open(os.devnull, "w") as devnull, transaction.atomic():
+                call_command(
+                    "import_users",
+                    path,
+                    batch_size=options["batch_size"],
+                    workers=options["workers"],
+                    stdout=self.stdout,
+                    stderr=devnull,
+                )
+                transaction.set_rollback(True)
+        finally:
+            os.remove(path)
@@ -0,0 +1,120 @@
+import math
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Like, Post, User
+from utils.uuids import uuid7
+
+KEYS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+class Command(BaseCommand):
+    """
+    Compare Like insert throughput with uuid4 and UUIDv7 primary keys.
+
+    For each kind of key, --rows likes are bulk created in batches, spread
+    over --users users and as many posts as needed. Throughput is reported at
+    every --steps fraction of the run, to show inserts slowing down once the
+    indexes outgrow the page cache. On SQLite, the size and fill of the
+    primary key index follow, which page splits inflate. Everything is
+    created inside a transaction that is rolled back.
+    """
+
+    help = (
+        "Report Like insert throughput as the table grows with uuid4 and UUIDv7 keys."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--steps", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rows, users = options["rows"], options["users"]
+        self.stdout.write(
+            "{:<6} {:>12} {:>12} {:>12}".format(
+                "keys", "rows", "step rows/s", "total rows/s"
+            )
+        )
+        with transaction.atomic():
+            user_ids = [
+                user.id
+                for user in User.objects.bulk_create(
+                    User(
+                        username="bench_keys_{}".format(i),
+                        email="bench_keys_{}@example.com".format(i),
+                    )
+                    for i in range(users)
+                )
+            ]
+            post_ids = [
+                post.id
+                for post in Post.objects.bulk_create(
+                    (
+                        Post(user_id=user_ids[0], image="posts/bench.jpg")
+                        for _ in range(math.ceil(rows / users))
+                    ),
+                    batch_size=options["batch_size"],
+                )
+            ]
+            for name, make_key in KEYS.items():
+                savepoint = transaction.savepoint()
+                self.run(name, make_key, user_ids, post_ids, options)
+                transaction.savepoint_rollback(savepoint)
+            transaction.set_rollback(True)
+
+    def run(self, name, make_key, user_ids, post_ids, options):
+        rows, batch_size = options["rows"], options["batch_size"]
+        step = max(batch_size, rows // options["steps"])
+        started = step_started = time.perf_counter()
+        done, reported = 0, 0
+        while done < rows:
+            count = min(batch_size, rows - done)
+            Like.objects.bulk_create(
+                [
+                    Like(
+                        id=make_key(),
+                        user_id=user_ids[i % len(user_ids)],
+                        post_id=post_ids[i // len(user_ids)],
+                    )
+                    for i in range(done, done + count)
+                ]
+            )
+            done += count
+            if done - reported >= step or done == rows:
+                now = time.perf_counter()
+                self.stdout.write(
+                    "{:<6} {:>12} {:>12.0f} {:>12.0f}".format(
+                        name,
+                        done,
+                        (done - reported) / (now - step_started),
+                        done / (now - started),
+                    )
+                )
+                reported, step_started = done, now
+
+        if connection.vendor == "sqlite":
+            size, used = self.index_usage()
+            self.stdout.write(
+                "{:<6} primary key index {:.1f} MB, pages {:.0%} full".format(
+                    name, size / 2**20, used / size
+                )
+            )
+
+    def index_usage(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = %s AND sql IS NULL",
+                [Like._meta.db_table],
+            )
+            (index,) = cursor.fetchone()
+            cursor.execute(
+                "SELECT SUM(pgsize), SUM(pgsize - unused) FROM dbstat WHERE name = %s",
+                [index],
+            )
+            return cursor.fetchone()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.media import collect_garbage
+
+
+class Command(BaseCommand):
+    """
+    Delete uploaded blobs and variants nothing refers to any more.
+
+    Meant to run periodically. Only files untouched for the grace period
+    (MEDIA_GC_GRACE_SECONDS by default) are deleted.
+    """
+
+    help = "Delete unreferenced media blobs, orphaned files and stale image variants."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace", type=int, default=None)
+
+    def handle(self, *args, **options):
+        stats = collect_garbage(options["grace"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Deleted {blobs} blobs, {orphans} orphaned files and {variants} "
+                "variants ({bytes:,} bytes); repaired {repaired} counts.".format(
+                    **stats
+                )
+            )
+        )
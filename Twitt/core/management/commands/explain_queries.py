@@ -0,0 +1,148 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.feed import get_feed
+from core.models import Comment, Following, Like, Post, User
+from core.suggestions import suggest_users
+from core.views import (
+    CreateCommentAPIView,
+    CreateFollowerAPIView,
+    CreateReplyCommentAPIView,
+    DeleteCommentAPIView,
+    DisLikeAPIView,
+    LikeAPIView,
+    PostDeleteAPIView,
+    PostRetrieveAPIView,
+    RemoveFollowerAPIView,
+)
+
+
+class Command(BaseCommand):
+    """
+    Print the database query plan of every query issued by the core views.
+
+    Each view is called once against a small fixture, its SELECT statements
+    are recorded and then explained with the backend's EXPLAIN prefix, so a
+    full table scan on a hot path shows up in review. Fixtures are rolled
+    back afterwards.
+    """
+
+    help = "Print EXPLAIN plans for the queries of each core view."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader, author, post, comment = self.build_fixture()
+            for name, call in self.cases(reader, author, post, comment):
+                queries = []
+
+                def record(execute, sql, params, many, context):
+                    queries.append((sql, params))
+                    return execute(sql, params, many, context)
+
+                with connection.execute_wrapper(record):
+                    call()
+
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                for sql, params in queries:
+                    if sql.lstrip().upper().startswith("SELECT"):
+                        self.explain(sql, params)
+            transaction.set_rollback(True)
+
+    def build_fixture(self):
+        reader = User.objects.create(
+            username="explain_reader", email="explain_reader@example.com"
+        )
+        author = User.objects.create(
+            username="explain_author", email="explain_author@example.com"
+        )
+        Following.objects.create(target=author, follower=reader)
+        post = Post.objects.create(user=author, image="posts/explain.jpg", caption="x")
+        Like.objects.create(user=author, post=post)
+        comment = Comment.objects.create(user=reader, post=post, comment_text="x")
+        return reader, author, post, comment
+
+    def cases(self, reader, author, post, comment):
+        factory = APIRequestFactory()
+
+        def view(view_class, method, user, data=None, query=None):
+            def call():
+                path = "/" + ("?" + query if query else "")
+                request = getattr(factory, method)(path, data or {}, format="json")
+                force_authenticate(request, user=user)
+                view_class.as_view()(request).render()
+
+            return call
+
+        post_id = str(post.id)
+        return [
+            ("feed", lambda: get_feed(reader)),
+            ("suggestions", lambda: suggest_users(reader)),
+            (
+                "PostRetrieveAPIView",
+                view(PostRetrieveAPIView, "get", author, query="post_id=" + post_id),
+            ),
+            ("LikeAPIView", view(LikeAPIView, "post", reader, {"post_id": post_id})),
+            (
+                "DisLikeAPIView",
+                view(DisLikeAPIView, "post", reader, {"post_id": post_id}),
+            ),
+            (
+                "CreateCommentAPIView",
+                view(
+                    CreateCommentAPIView,
+                    "post",
+                    reader,
+                    {"post_id": post_id, "comment_text": "x"},
+                ),
+            ),
+            (
+                "CreateReplyCommentAPIView",
+                view(
+                    CreateReplyCommentAPIView,
+                    "post",
+                    author,
+                    {"reply_to": str(comment.id), "comment_text": "x"},
+                ),
+            ),
+            (
+                "DeleteCommentAPIView",
+                view(
+                    DeleteCommentAPIView,
+                    "delete",
+                    reader,
+                    {"comment_id": str(comment.id)},
+                ),
+            ),
+            (
+                "CreateFollowerAPIView",
+                view(
+                    CreateFollowerAPIView,
+                    "post",
+                    author,
+                    {"follower_id": str(reader.id)},
+                ),
+            ),
+            (
+                "RemoveFollowerAPIView",
+                view(
+                    RemoveFollowerAPIView,
+                    "post",
+                    author,
+                    {"follower_id": str(reader.id)},
+                ),
+            ),
+            (
+                "PostDeleteAPIView",
+                view(PostDeleteAPIView, "delete", author, query="post_id=" + post_id),
+            ),
+        ]
+
+    def explain(self, sql, params):
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute("{} {}".format(prefix, sql), params)
+            plan = cursor.fetchall()
+        self.stdout.write("  " + sql)
+        for row in plan:
+            self.stdout.write("    " + " ".join(str(column) for column in row))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.likes import fold_like_shards
+
+
+class Command(BaseCommand):
+    """
+    Fold LikeCounterShard totals back into Post.no_of_likes.
+
+    Meant to run periodically when LIKE_COUNTER_SHARDS is above 1.
+    """
+
+    help = "Fold sharded like counters into Post.no_of_likes."
+
+    def handle(self, *args, **options):
+        folded = fold_like_shards()
+        self.stdout.write(self.style.SUCCESS("Folded {} posts.".format(folded)))
@@ -0,0 +1,71 @@
+import os
+import resource
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import User
+from core.user_import import IMPORT_FORMATS, read_rows
+
+
+class Command(BaseCommand):
+    """
+    Create users from a CSV or JSONL file through core.user_import.
+
+    Rows hold email, username and optionally first_name, last_name and
+    password; CSV files start with a header row. The file is streamed, so
+    memory does not grow with its size. The command reports users created
+    per second and the peak memory of this process and of the hashing
+    workers.
+    """
+
+    help = "Import users in bulk from a CSV or JSONL file ('-' for stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=IMPORT_FORMATS)
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Hashing processes, 0 to hash in this process.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or os.path.splitext(path)[1].lstrip(".")
+        if format not in IMPORT_FORMATS:
+            raise CommandError("Pass --format csv or --format jsonl.")
+
+        started = time.perf_counter()
+        if path == "-":
+            importer = self.run(sys.stdin, format, options)
+        else:
+            with open(path, newline="", encoding="utf-8") as lines:
+                importer = self.run(lines, format, options)
+        elapsed = time.perf_counter() - started
+
+        for error in importer.errors:
+            self.stderr.write("row {row}: {message}".format(**error))
+        self.stdout.write(
+            "{rows} rows, {created} created, {duplicates} duplicates, "
+            "{invalid} invalid in {batches} batches.".format(**importer.stats)
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "{:,.0f} users/s over {:.1f}s; peak memory {:.0f} MB, "
+                "hashing workers {:.0f} MB.".format(
+                    importer.stats["created"] / elapsed,
+                    elapsed,
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+                )
+            )
+        )
+
+    def run(self, lines, format, options):
+        return User.objects.import_users(
+            read_rows(lines, format), options["batch_size"], options["workers"]
+        )
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import time
+import uuid
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.consumers import LikeCountConsumer
+from core.likes import like_post
+from core.models import Post, User
+from core.notifications import publisher
+
+
+class Command(BaseCommand):
+    """
+    Load test the live like-count stream with a growing number of sockets.
+
+    For each connection count, that many sockets subscribe to one post and a
+    burst of likes is made on it. The command reports how many count reads
+    the publisher made and how many updates the sockets received; reads
+    should stay flat however many sockets are listening. Fixture rows are
+    deleted afterwards.
+    """
+
+    help = "Show database reads of the like-count stream as connections grow."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--connections", type=int, nargs="+", default=[10, 100, 1000]
+        )
+        parser.add_argument("--likes", type=int, default=50)
+        parser.add_argument("--interval", type=float, default=0.2)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username="stream_{}_{}".format(tag, i),
+                    email="stream_{}_{}@example.com".format(tag, i),
+                )
+                for i in range(options["likes"] + 1)
+            ]
+        )
+        try:
+            self.stdout.write(
+                "{:>11} {:>6} {:>10} {:>16} {:>10}".format(
+                    "connections", "likes", "db reads", "updates received", "seconds"
+                )
+            )
+            with override_settings(LIKE_COUNT_STREAM_INTERVAL=options["interval"]):
+                for connections in options["connections"]:
+                    post = Post.objects.create(
+                        user=users[0], image="posts/stream.jpg", caption="stream"
+                    )
+                    async_to_sync(self.run_round)(
+                        post, users[1:], connections, options["interval"]
+                    )
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    async def run_round(self, post, likers, connections, interval):
+        sockets = []
+        for _ in range(connections):
+            socket = WebsocketCommunicator(LikeCountConsumer.as_asgi(), "/ws/likes/")
+            await socket.connect()
+            await socket.send_to(text_data=json.dumps({"subscribe": [str(post.id)]}))
+            sockets.append(socket)
+        await asyncio.sleep(0.1)
+
+        reads = publisher.stats["reads"]
+        started = time.perf_counter()
+        for user in likers:
+            await sync_to_async(like_post)(user, post)
+        await asyncio.sleep(interval * 3)
+
+        received = 0
+        for socket in sockets:
+            while not await socket.receive_nothing(timeout=0.01):
+                await socket.receive_from()
+                received += 1
+            await socket.disconnect()
+
+        self.stdout.write(
+            "{:>11} {:>6} {:>10} {:>16} {:>10.2f}".format(
+                connections,
+                len(likers),
+                publisher.stats["reads"] - reads,
+                received,
+                time.perf_counter() - started,
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from core.media import disk_usage
+
+
+def write_usage(stdout, title, usage):
+    stdout.write(title)
+    for area, (files, size) in usage["areas"].items():
+        stdout.write("  {:<12} {:>8} files {:>14,} bytes".format(area, files, size))
+    stdout.write(
+        "  {:<12} {:>8} files {:>14,} bytes".format(
+            "total", usage["files"], usage["bytes"]
+        )
+    )
+    stdout.write(
+        "  {:<12} {:>8} files {:>14,} bytes".format(
+            "duplicates", usage["duplicate_files"], usage["duplicate_bytes"]
+        )
+    )
+    stdout.write(
+        "  {} referenced blobs, {} awaiting collection".format(
+            usage["blobs"], usage["unreferenced_blobs"]
+        )
+    )
+
+
+class Command(BaseCommand):
+    """
+    Report disk usage of the media directory, including duplicated bytes.
+    """
+
+    help = "Report files and bytes per media directory and how much is duplicated."
+
+    def handle(self, *args, **options):
+        write_usage(self.stdout, "Media usage:", disk_usage())
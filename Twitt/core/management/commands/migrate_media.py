@@ -0,0 +1,30 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from core.media import collect_garbage, disk_usage, migrate_media
+
+from .media_usage import write_usage
+
+
+class Command(BaseCommand):
+    """
+    Move media uploaded before content addressing into deduplicated blobs.
+
+    Prints disk usage before and after. Moved images get their variants
+    rendered again, and variants of the legacy files are collected once
+    they are older than the garbage collection grace period.
+    """
+
+    help = "Move legacy uploads into content-addressed blobs and report disk usage."
+
+    def handle(self, *args, **options):
+        write_usage(self.stdout, "Before:", disk_usage())
+        stats = migrate_media()
+        self.stdout.write(
+            "Moved {moved} files used by {rows} rows; {missing} files were missing.".format(
+                **stats
+            )
+        )
+        call_command("render_image_variants", stdout=self.stdout)
+        collect_garbage()
+        write_usage(self.stdout, "After:", disk_usage())
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.images import processor, variants_field
+from core.models import Post, User
+
+
+class Command(BaseCommand):
+    """
+    Render missing or stale image variants for existing posts and profile pictures.
+
+    Images uploaded before the variant pipeline existed, or whose worker job
+    failed, are rendered on the processor's worker pool. --force renders
+    every image again, e.g. after POST_IMAGE_VARIANTS changes.
+    """
+
+    help = "Render WebP/JPEG variants of Post.image and User.profile_pic."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true")
+
+    def handle(self, *args, **options):
+        targets = [
+            (Post, "image", settings.POST_IMAGE_VARIANTS),
+            (User, "profile_pic", settings.PROFILE_PIC_VARIANTS),
+        ]
+        executor = processor._executor()
+        for model, field_name, specs in targets:
+            rows = (
+                model.objects.exclude(**{field_name: ""})
+                .exclude(**{field_name + "__isnull": True})
+                .values_list("pk", field_name, variants_field(field_name))
+            )
+            jobs = [
+                executor.submit(processor.process, model, pk, field_name, name, specs)
+                for pk, name, variants in rows.iterator()
+                if options["force"] or (variants or {}).get("source") != name
+            ]
+            rendered = sum(job.result() for job in jobs)
+            self.stdout.write(
+                "{}.{}: rendered {} of {} images.".format(
+                    model.__name__, field_name, rendered, len(jobs)
+                )
+            )
@@ -0,0 +1,33 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from utils.channel_layer import ChannelBroker
+
+
+class Command(BaseCommand):
+    """
+    Run the stand-in broker of utils.channel_layer in the foreground.
+
+    Lets several daphne workers share notifications on one machine without a
+    Redis server. It listens on the host and port of the default channel
+    layer unless told otherwise.
+    """
+
+    help = "Run a local publish/subscribe broker for BrokerChannelLayer."
+
+    def add_arguments(self, parser):
+        config = settings.CHANNEL_LAYERS["default"].get("CONFIG", {})
+        parser.add_argument("--host", default=config.get("host", "127.0.0.1"))
+        parser.add_argument("--port", type=int, default=config.get("port", 6379))
+
+    def handle(self, *args, **options):
+        broker = ChannelBroker(options["host"], options["port"])
+        self.stdout.write(
+            "Channel broker listening on {}:{}".format(broker.host, broker.port)
+        )
+        try:
+            asyncio.run(broker.serve_forever())
+        except KeyboardInterrupt:
+            pass
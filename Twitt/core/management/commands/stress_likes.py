@@ -0,0 +1,86 @@
+import random
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection
+
+from core.likes import fold_like_shards, like_count, like_post, unlike_post
+from core.models import Like, Post, User
+
+
+class Command(BaseCommand):
+    """
+    Hammer one post with concurrent likes and dislikes and check the counter.
+
+    Each worker thread uses its own database connection and randomly likes or
+    dislikes the post as one of the fixture users. At the end the counter
+    must equal the number of Like rows. Fixture rows are deleted afterwards.
+    """
+
+    help = "Check that the like counter matches Like rows under concurrency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--operations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username="stress_{}_{}".format(tag, i),
+                    email="stress_{}_{}@example.com".format(tag, i),
+                )
+                for i in range(options["users"] + 1)
+            ]
+        )
+        post = Post.objects.create(
+            user=users[0], image="posts/stress.jpg", caption="stress"
+        )
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(options["operations"]):
+                    user = random.choice(users[1:])
+                    action = random.choice((like_post, unlike_post))
+                    while True:
+                        try:
+                            action(user, post)
+                            break
+                        except OperationalError:
+                            time.sleep(0.01)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        close_old_connections()
+
+        counted = like_count(post)
+        fold_like_shards()
+        folded = Post.objects.get(id=post.id).no_of_likes
+        rows = Like.objects.filter(post=post).count()
+        User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        operations = options["threads"] * options["operations"]
+        self.stdout.write(
+            "{} operations in {:.2f}s ({:.0f} ops/s): counter={} folded={} rows={}".format(
+                operations, elapsed, operations / elapsed, counted, folded, rows
+            )
+        )
+        if errors:
+            raise CommandError("Workers failed: {}".format(errors[0]))
+        if not counted == folded == rows:
+            raise CommandError("Like counter drifted from Like rows.")
+        self.stdout.write(self.style.SUCCESS("Like counter matches Like rows."))
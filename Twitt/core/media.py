@@ -0,0 +1,334 @@
+"""
+Module containing reference counting and housekeeping of uploaded media.
+
+Post.image and User.profile_pic live in a content-addressed storage, so a
+blob may back any number of rows. Model signals call remember_names,
+update_references and release_references to keep MediaBlob.refcount in step
+with those rows, inside the transaction that changes them. Posts deleted
+through core.purge are only marked at first; their image is released, and
+cleared from the row, when the background purge runs, moments after the
+delete commits. Files are never
+deleted on the request path: collect_garbage removes blobs that stayed
+unreferenced for a grace period, files no row knows about and variants
+whose source is gone.
+"""
+
+import hashlib
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from utils.storage import blob_storage
+
+from .models import MediaBlob, Post, User
+
+MEDIA_FIELDS = {"core.Post": "image", "core.User": "profile_pic"}
+
+BATCH_SIZE = 500
+
+
+def _field(instance):
+    return MEDIA_FIELDS[instance._meta.label]
+
+
+def remember_names(instance):
+    """
+    Record the stored file name of an instance as loaded, to diff on save.
+
+    Parameters:
+    instance (Post | User): The instance being initialised.
+    """
+    value = instance.__dict__.get(_field(instance))
+    if isinstance(value, FieldFile):
+        value = value.name if value._committed else None
+    instance._media_name = value if isinstance(value, str) else None
+
+
+def update_references(instance, created):
+    """
+    Move references from the previously stored file of an instance to the current one.
+
+    Parameters:
+    instance (Post | User): The saved instance.
+    created (bool): Whether the row was just inserted.
+    """
+    previous = None if created else getattr(instance, "_media_name", None)
+    current = getattr(instance, _field(instance)).name or None
+    if current != previous:
+        if current:
+            acquire(current)
+        if previous:
+            release(previous)
+    instance._media_name = current
+
+
+def release_references(instance):
+    """
+    Release the stored file of a deleted instance.
+
+    Parameters:
+    instance (Post | User): The deleted instance.
+    """
+    name = getattr(instance, "_media_name", None)
+    if name:
+        release(name)
+
+
+def _size(name):
+    try:
+        return blob_storage.size(name)
+    except OSError:
+        return 0
+
+
+def _mtime(name):
+    try:
+        return os.path.getmtime(blob_storage.path(name))
+    except OSError:
+        return 0
+
+
+def acquire(name, count=1):
+    """
+    Add references to a blob, creating its MediaBlob row on first use.
+
+    Parameters:
+    name (str): The storage name of the blob.
+    count (int): The number of references to add.
+    """
+    changes = {"refcount": F("refcount") + count, "updated_at": timezone.now()}
+    if MediaBlob.objects.filter(name=name).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, size=_size(name), refcount=count)
+    except IntegrityError:
+        MediaBlob.objects.filter(name=name).update(**changes)
+
+
+def release(name, count=1):
+    """
+    Drop references to a blob. The file stays until collect_garbage runs.
+
+    Parameters:
+    name (str): The storage name of the blob.
+    count (int): The number of references to drop.
+    """
+    MediaBlob.objects.filter(name=name).update(
+        refcount=F("refcount") - count, updated_at=timezone.now()
+    )
+
+
+def reference_counts(names):
+    """
+    Count the rows referring to each of the given names.
+
+    Parameters:
+    names (Iterable[str]): Storage names.
+
+    Returns:
+    Counter: Name to the number of Post and User rows referring to it.
+    """
+    names = list(names)
+    counts = Counter(
+        Post.all_objects.filter(image__in=names).values_list("image", flat=True)
+    )
+    counts.update(
+        User.objects.filter(profile_pic__in=names).values_list("profile_pic", flat=True)
+    )
+    return counts
+
+
+def _batches(iterable):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _files(directory):
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            yield os.path.join(root, filename)
+
+
+def collect_garbage(grace_seconds=None):
+    """
+    Delete unreferenced blobs, unknown files under blobs/ and stale variants.
+
+    Only files untouched for grace_seconds are removed, so an upload whose
+    transaction has not committed yet is never collected. Blob rows that
+    reached zero but are still referenced (counts drifted through bulk
+    updates) get their refcount repaired instead.
+
+    Parameters:
+    grace_seconds (int): Minimum age of collected files, MEDIA_GC_GRACE_SECONDS by default.
+
+    Returns:
+    dict: Numbers of blobs, orphan files and variants deleted, bytes freed and rows repaired.
+    """
+    if grace_seconds is None:
+        grace_seconds = settings.MEDIA_GC_GRACE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=grace_seconds)
+    cutoff_mtime = time.time() - grace_seconds
+    stats = {"blobs": 0, "orphans": 0, "variants": 0, "bytes": 0, "repaired": 0}
+
+    candidates = MediaBlob.objects.filter(
+        refcount__lte=0, updated_at__lt=cutoff
+    ).values_list("name", flat=True)
+    for batch in _batches(list(candidates)):
+        counts = reference_counts(batch)
+        for name in batch:
+            if counts[name]:
+                MediaBlob.objects.filter(name=name).update(refcount=counts[name])
+                stats["repaired"] += 1
+                continue
+            if _mtime(name) >= cutoff_mtime:
+                # commit() reuses an existing file by touching it without
+                # updating the row; that upload has not acquired it yet.
+                continue
+            deleted, _ = MediaBlob.objects.filter(name=name, refcount__lte=0).delete()
+            if deleted:
+                stats["bytes"] += _size(name)
+                blob_storage.delete(name)
+                stats["blobs"] += 1
+
+    root = blob_storage.path("")
+    stale = (
+        path
+        for path in _files(blob_storage.path(blob_storage.prefix))
+        if os.path.getmtime(path) < cutoff_mtime
+    )
+    for batch in _batches(stale):
+        names = {
+            os.path.relpath(path, root).replace(os.sep, "/"): path for path in batch
+        }
+        known = set(
+            MediaBlob.objects.filter(name__in=names).values_list("name", flat=True)
+        )
+        counts = reference_counts(names)
+        for name, path in names.items():
+            if name in known:
+                continue
+            if counts[name]:
+                acquire(name, counts[name])
+                stats["repaired"] += 1
+                continue
+            stats["bytes"] += os.path.getsize(path)
+            os.remove(path)
+            stats["orphans"] += 1
+
+    sources = {}
+    variants = blob_storage.path("variants")
+    for path in _files(variants):
+        source = os.path.relpath(os.path.dirname(path), variants).replace(os.sep, "/")
+        if source not in sources:
+            sources[source] = blob_storage.exists(source)
+        if not sources[source] and os.path.getmtime(path) < cutoff_mtime:
+            stats["bytes"] += os.path.getsize(path)
+            os.remove(path)
+            stats["variants"] += 1
+
+    for directory in (blob_storage.path(blob_storage.prefix), variants):
+        for path, _, _ in os.walk(directory, topdown=False):
+            if path != directory and not os.listdir(path):
+                os.rmdir(path)
+    return stats
+
+
+def disk_usage():
+    """
+    Measure the media directory, including bytes taken by duplicate files.
+
+    Returns:
+    dict: Per top-level directory (files, bytes), totals, duplicate files and
+        bytes, and the number of MediaBlob rows with and without references.
+    """
+    root = blob_storage.path("")
+    areas = defaultdict(lambda: [0, 0])
+    by_size = defaultdict(list)
+    for path in _files(root):
+        size = os.path.getsize(path)
+        area = os.path.relpath(path, root).split(os.sep)[0]
+        areas[area][0] += 1
+        areas[area][1] += size
+        by_size[size].append(path)
+
+    duplicate_files = duplicate_bytes = 0
+    for size, paths in by_size.items():
+        if len(paths) < 2:
+            continue
+        digests = Counter()
+        for path in paths:
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 16), b""):
+                    digest.update(chunk)
+            digests[digest.hexdigest()] += 1
+        for count in digests.values():
+            duplicate_files += count - 1
+            duplicate_bytes += size * (count - 1)
+
+    return {
+        "areas": {area: tuple(totals) for area, totals in sorted(areas.items())},
+        "files": sum(files for files, _ in areas.values()),
+        "bytes": sum(size for _, size in areas.values()),
+        "duplicate_files": duplicate_files,
+        "duplicate_bytes": duplicate_bytes,
+        "blobs": MediaBlob.objects.filter(refcount__gt=0).count(),
+        "unreferenced_blobs": MediaBlob.objects.filter(refcount__lte=0).count(),
+    }
+
+
+def migrate_media():
+    """
+    Move files stored before content addressing into blobs/, merging duplicates.
+
+    Every distinct legacy name is hashed into its blob once, the rows using
+    it are repointed in one update with their variants cleared for
+    re-rendering, and the legacy file is deleted once nothing refers to it.
+
+    Returns:
+    dict: Numbers of files moved, rows updated and files missing on disk.
+    """
+    stats = {"moved": 0, "rows": 0, "missing": 0}
+    prefix = blob_storage.prefix + "/"
+    for model, field_name in ((Post, "image"), (User, "profile_pic")):
+        legacy = (
+            model.objects.exclude(**{field_name + "__startswith": prefix})
+            .exclude(**{field_name: ""})
+            .exclude(**{field_name + "__isnull": True})
+            .values_list(field_name, flat=True)
+            .distinct()
+        )
+        for name in list(legacy):
+            try:
+                with blob_storage.open(name) as file:
+                    blob = blob_storage.save(name, file)
+            except FileNotFoundError:
+                stats["missing"] += 1
+                continue
+
+            with transaction.atomic():
+                rows = model.objects.filter(**{field_name: name}).update(
+                    **{field_name: blob, field_name + "_variants": {}}
+                )
+                acquire(blob, rows)
+                release(name, rows)
+                MediaBlob.objects.filter(name=name, refcount__lte=0).delete()
+            if not reference_counts([name])[name]:
+                blob_storage.delete(name)
+            stats["moved"] += 1
+            stats["rows"] += rows
+    return stats
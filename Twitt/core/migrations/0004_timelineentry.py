@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_alter_post_user"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="fanout_on_read",
+            field=models.BooleanField(
+                default=False,
+                help_text="Set once the user has more followers than FEED_FANOUT_THRESHOLD. Their posts are pulled into feeds on read instead of being written to every follower timeline.",
+            ),
+        ),
+        migrations.CreateModel(
+            name="TimelineEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="core.post",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at", "-post"],
+                        name="timeline_user_recent_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "post"), name="unique_timeline_entry"
+                    )
+                ],
+            },
+        ),
+    ]
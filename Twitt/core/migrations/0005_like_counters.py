@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def dedupe_likes_and_recount(apps, schema_editor):
+    """
+    Drop duplicate likes so the unique constraint can be added, then reset
+    Post.no_of_likes from the Like rows, since dislikes never decremented it.
+    """
+    Like = apps.get_model("core", "Like")
+    Post = apps.get_model("core", "Post")
+
+    duplicates = (
+        Like.objects.values("user_id", "post_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        keep = (
+            Like.objects.filter(
+                user_id=duplicate["user_id"], post_id=duplicate["post_id"]
+            )
+            .order_by("created_at")
+            .values_list("id", flat=True)
+            .first()
+        )
+        Like.objects.filter(
+            user_id=duplicate["user_id"], post_id=duplicate["post_id"]
+        ).exclude(id=keep).delete()
+
+    likes = (
+        Like.objects.filter(post_id=OuterRef("id"))
+        .values("post_id")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Post.objects.update(no_of_likes=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_timelineentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_likes_and_recount, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="LikeCounterShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("count", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                fields=("user", "post"), name="unique_like"
+            ),
+        ),
+        migrations.AddField(
+            model_name="likecountershard",
+            name="post",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="like_counter_shards",
+                to="core.post",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="likecountershard",
+            constraint=models.UniqueConstraint(
+                fields=("post", "shard"), name="unique_like_counter_shard"
+            ),
+        ),
+    ]
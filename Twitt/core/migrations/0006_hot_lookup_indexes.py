@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_followings(apps, schema_editor):
+    """
+    Drop duplicate follow rows, keeping the oldest, so the unique constraint
+    can be added.
+    """
+    Following = apps.get_model("core", "Following")
+
+    duplicates = (
+        Following.objects.values("target_id", "follower_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = Following.objects.filter(
+            target_id=duplicate["target_id"], follower_id=duplicate["follower_id"]
+        )
+        keep = rows.order_by("created_at").values_list("id", flat=True).first()
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_like_counters"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_followings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "reply_to"], name="comment_post_reply_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(
+                fields=["follower", "target"], name="following_follower_target_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["user", "-created_at"], name="post_user_recent_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="following",
+            constraint=models.UniqueConstraint(
+                fields=("target", "follower"), name="unique_following"
+            ),
+        ),
+    ]
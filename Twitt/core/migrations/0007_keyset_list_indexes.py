@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_hot_lookup_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created_at", "-id"], name="comment_post_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(
+                fields=["target", "-created_at", "-id"],
+                name="following_target_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(
+                fields=["follower", "-created_at", "-id"],
+                name="following_follower_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["post", "-created_at", "-id"], name="like_post_recent_idx"
+            ),
+        ),
+    ]
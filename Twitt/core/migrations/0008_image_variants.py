@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_keyset_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="profile_pic_variants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
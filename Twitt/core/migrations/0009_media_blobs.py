@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:47
+
+import os
+
+import core.models
+import utils.storage
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_existing_media(apps, schema_editor):
+    """
+    Create a MediaBlob row for every file already referenced by a post or a
+    profile, so references to files uploaded before content addressing are
+    counted too. Moving those files into blobs/ is left to migrate_media.
+    """
+    MediaBlob = apps.get_model("core", "MediaBlob")
+    Post = apps.get_model("core", "Post")
+    User = apps.get_model("core", "User")
+
+    counts = {}
+    for model, field_name in ((Post, "image"), (User, "profile_pic")):
+        references = (
+            model.objects.exclude(**{field_name: ""})
+            .exclude(**{field_name + "__isnull": True})
+            .values(field_name)
+            .annotate(total=Count("pk"))
+        )
+        for reference in references:
+            name = reference[field_name]
+            counts[name] = counts.get(name, 0) + reference["total"]
+
+    blobs = []
+    for name, refcount in counts.items():
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        blobs.append(MediaBlob(name=name, size=size, refcount=refcount))
+    MediaBlob.objects.bulk_create(blobs, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                storage=utils.storage.get_blob_storage, upload_to=core.models.upload_to
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="profile_pic",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=utils.storage.get_blob_storage,
+                upload_to="profiles/",
+            ),
+        ),
+        migrations.CreateModel(
+            name="MediaBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255, unique=True)),
+                ("size", models.BigIntegerField(default=0)),
+                ("refcount", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["refcount", "updated_at"], name="mediablob_orphan_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(count_existing_media, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="token_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Raised on logout; tokens carrying an older version are refused.",
+            ),
+        ),
+    ]
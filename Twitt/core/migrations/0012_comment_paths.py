@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:19
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+SEGMENT_WIDTH = 6
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def encode_segment(ordinal):
+    digits = []
+    for _ in range(SEGMENT_WIDTH):
+        ordinal, digit = divmod(ordinal, len(DIGITS))
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits))
+
+
+def build_comment_paths(apps, schema_editor):
+    """
+    Give existing comments their path, depth and counters, numbering the
+    replies of each comment, and the top-level comments of each post, in
+    creation order. A reply whose parent is on another post is treated as
+    top-level on its own post.
+    """
+    Comment = apps.get_model("core", "Comment")
+    Post = apps.get_model("core", "Post")
+    fields = ["path", "depth", "reply_count", "descendant_count", "reply_sequence"]
+
+    post_ids = Comment.objects.values_list("post_id", flat=True).distinct()
+    for post_id in post_ids.iterator():
+        comments = list(
+            Comment.objects.filter(post_id=post_id)
+            .only("id", "reply_to_id")
+            .order_by("created_at", "id")
+        )
+        ids = {comment.id for comment in comments}
+        children = defaultdict(list)
+        for comment in comments:
+            parent = comment.reply_to_id if comment.reply_to_id in ids else None
+            children[parent].append(comment)
+
+        order = []
+        stack = [("", -1, None)]
+        while stack:
+            path, depth, parent = stack.pop()
+            replies = children[parent.id if parent else None]
+            for ordinal, comment in enumerate(replies, 1):
+                comment.path = path + encode_segment(ordinal)
+                comment.depth = depth + 1
+                comment.reply_count = comment.reply_sequence = len(children[comment.id])
+                comment.descendant_count = 0
+                order.append(comment)
+                stack.append((comment.path, comment.depth, comment))
+
+        by_path = {comment.path: comment for comment in order}
+        for comment in order:
+            path = comment.path[:-SEGMENT_WIDTH]
+            while path:
+                by_path[path].descendant_count += 1
+                path = path[:-SEGMENT_WIDTH]
+
+        Comment.objects.bulk_update(order, fields, batch_size=1000)
+        Post.objects.filter(pk=post_id).update(comment_sequence=len(children[None]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_user_token_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="descendant_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.TextField(default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="reply_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="reply_sequence",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="comment_sequence",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Ordinal of the latest top-level comment, see core.comments.",
+            ),
+        ),
+        migrations.RunPython(build_comment_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["post", "path"], name="comment_post_path_idx"),
+        ),
+    ]
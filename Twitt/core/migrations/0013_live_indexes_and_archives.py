@@ -0,0 +1,178 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:28
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_comment_paths"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedComment",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedFollowing",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedLike",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedPost",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_post_reply_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_post_recent_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="following",
+            name="following_follower_target_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="following",
+            name="following_target_recent_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="following",
+            name="following_follower_recent_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="like",
+            name="like_post_recent_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_user_recent_idx",
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["post", "reply_to"],
+                name="comment_post_reply_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["post", "-created_at", "-id"],
+                name="comment_post_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["follower", "target"],
+                name="following_follower_target_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["target", "-created_at", "-id"],
+                name="following_target_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["follower", "-created_at", "-id"],
+                name="following_follower_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["post", "-created_at", "-id"],
+                name="like_post_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("mark_as_deleted", False)),
+                fields=["user", "-created_at"],
+                name="post_user_recent_idx",
+            ),
+        ),
+    ]
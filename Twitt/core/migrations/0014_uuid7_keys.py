@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:30
+
+import utils.uuids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_live_indexes_and_archives"),
+    ]
+
+    # The default is applied in Python, so only the state changes; altering
+    # the column would rebuild every table on SQLite.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="comment",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="following",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="like",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="notification",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="post",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="user",
+                    name="id",
+                    field=models.UUIDField(
+                        default=utils.uuids.uuid7,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+            ]
+        )
+    ]
@@ -1,20 +1,26 @@
 import json
-import uuid
-from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from utils.storage import get_blob_storage
+from utils.uuids import uuid7
 
 
 class Activity(models.Model):
     """
     This module will contain activity records of each module.
+
+    Primary keys are time-ordered UUIDv7 (see utils.uuids), so ordering by
+    id follows creation order for rows created since they became the default
+    or rekeyed with rekey_uuid7.
     """
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     mark_as_deleted = models.BooleanField(default=False)
@@ -23,6 +29,24 @@ class Activity(models.Model):
         abstract = True
 
 
+class LiveManager(models.Manager):
+    """
+    Manager hiding the rows marked as deleted.
+
+    Used as the default manager of Post, Like, Comment and Following, so
+    every query and reverse relation skips rows waiting for core.archive to
+    move them out, and can use the indexes restricted to live rows. The
+    `all_objects` manager of these models still sees them.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(mark_as_deleted=False)
+
+
+# Rows of the indexes over Activity tables that reads go through.
+LIVE = models.Q(mark_as_deleted=False)
+
+
 class UserManager(BaseUserManager):
     """
     This Following module is used to create a Custom user
@@ -39,6 +63,21 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def import_users(self, rows, batch_size=None, workers=None):
+        """
+        Create users from an iterable of row dicts in batches.
+
+        See core.user_import.UserImporter.
+
+        Returns:
+        UserImporter: The importer, holding the stats and the rejected rows.
+        """
+        from .user_import import UserImporter
+
+        importer = UserImporter(batch_size, workers)
+        importer.run(rows)
+        return importer
+
     def create_superuser(self, email, password):
         user = self.create_user(email=email, password=password)
         user.is_superuser = True
@@ -55,12 +94,28 @@ class User(AbstractUser, Activity):
     Inheritance from Abstract User
     """
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
     email = models.EmailField("email address", unique=True)
     is_admin = models.BooleanField(default=False)
-    profile_pic = models.ImageField(upload_to="profiles/", blank=True, null=True)
+    profile_pic = models.ImageField(
+        upload_to="profiles/", storage=get_blob_storage, blank=True, null=True
+    )
+    profile_pic_variants = models.JSONField(default=dict, blank=True, editable=False)
     dob = models.DateField(blank=True, null=True)
     bio_data = models.TextField(blank=True, null=True)
+    fanout_on_read = models.BooleanField(
+        default=False,
+        help_text=(
+            "Set once the user has more followers than FEED_FANOUT_THRESHOLD. "
+            "Their posts are pulled into feeds on read instead of being "
+            "written to every follower timeline."
+        ),
+    )
+    token_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Raised on logout; tokens carrying an older version are refused.",
+    )
     is_active = models.BooleanField(
         "active",
         default=True,
@@ -94,6 +149,7 @@ class Post(Activity):
     Attributes:
         user (User): The user who created the post.
         image (ImageField): The image associated with the post.
+        image_variants (JSONField): Resized WebP/JPEG copies of the image, see core.images.
         caption (TextField): The caption or description of the post.
         no_of_likes (IntegerField): The number of likes the post has received.
 
@@ -107,13 +163,31 @@ class Post(Activity):
         on_delete=models.CASCADE,
         related_name="posts",
     )
-    image = models.ImageField(upload_to=upload_to)
+    image = models.ImageField(upload_to=upload_to, storage=get_blob_storage)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.TextField()
     no_of_likes = models.IntegerField(default=0)
+    comment_sequence = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Ordinal of the latest top-level comment, see core.comments.",
+    )
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.user.email
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="post_user_recent_idx",
+                condition=LIVE,
+            )
+        ]
+
 
 class Like(Activity):
     """
@@ -135,9 +209,53 @@ class Like(Activity):
     )
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="total_likes")
 
+    objects = LiveManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return self.user.email
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["post", "-created_at", "-id"],
+                name="like_post_recent_idx",
+                condition=LIVE,
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"], name="unique_like")
+        ]
+
+
+class LikeCounterShard(models.Model):
+    """
+    A class to represent one slice of the like counter of a post.
+
+    Used when settings.LIKE_COUNTER_SHARDS is above 1: likes and dislikes
+    update a random shard instead of the post row, so concurrent likes on a
+    hot post do not queue on a single row lock. The true count is
+    Post.no_of_likes plus the sum of the shards of the post.
+
+    Attributes:
+        post (Post): The post being counted.
+        shard (PositiveSmallIntegerField): The shard number.
+        count (IntegerField): The like delta accumulated in this shard.
+    """
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="like_counter_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "shard"], name="unique_like_counter_shard"
+            )
+        ]
+
 
 class Comment(Activity):
     """
@@ -148,6 +266,12 @@ class Comment(Activity):
         post (Post): The post on which the comment is made.
         reply_to (Comment): The comment to which this comment is a reply to.
         comment_text (CharField): The text content of the comment.
+        path (TextField): The sibling ordinals from the top-level comment down
+            to this one, SEGMENT_WIDTH characters each (see core.comments).
+        depth (int): 0 for top-level comments.
+        reply_count (int): Direct replies.
+        descendant_count (int): Replies at every depth below this comment.
+        reply_sequence (int): Ordinal of the latest direct reply.
 
     Methods:
         None
@@ -170,6 +294,30 @@ class Comment(Activity):
         related_name="all_replies",
     )
     comment_text = models.CharField(max_length=255)
+    path = models.TextField(default="", editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    descendant_count = models.PositiveIntegerField(default=0, editable=False)
+    reply_sequence = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["post", "reply_to"],
+                name="comment_post_reply_idx",
+                condition=LIVE,
+            ),
+            # Over every row: purges delete subtrees, marked comments included.
+            models.Index(fields=["post", "path"], name="comment_post_path_idx"),
+            models.Index(
+                fields=["post", "-created_at", "-id"],
+                name="comment_post_recent_idx",
+                condition=LIVE,
+            ),
+        ]
 
 
 class Following(Activity):
@@ -187,33 +335,303 @@ class Following(Activity):
     target = models.ForeignKey(User, related_name="followers", on_delete=models.CASCADE)
     follower = models.ForeignKey(User, related_name="targets", on_delete=models.CASCADE)
 
+    objects = LiveManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return self.target.email
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["follower", "target"],
+                name="following_follower_target_idx",
+                condition=LIVE,
+            ),
+            models.Index(
+                fields=["target", "-created_at", "-id"],
+                name="following_target_recent_idx",
+                condition=LIVE,
+            ),
+            models.Index(
+                fields=["follower", "-created_at", "-id"],
+                name="following_follower_recent_idx",
+                condition=LIVE,
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["target", "follower"], name="unique_following"
+            )
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    A class to represent one post materialized into the home timeline of a follower.
+
+    Attributes:
+        user (User): The user owning the timeline.
+        post (Post): The post shown in the timeline.
+        created_at (DateTimeField): A copy of the post creation time, so a page
+            of the timeline is a range scan over (user, created_at).
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timeline")
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-post"], name="timeline_user_recent_idx"
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            )
+        ]
+
+
+class MediaBlob(models.Model):
+    """
+    A class to represent one stored upload and the number of rows referring to it.
+
+    Uploads are content addressed (see utils.storage), so identical files
+    share one blob. core.media keeps refcount in step with Post.image and
+    User.profile_pic; blobs left at zero are removed by collect_media_garbage.
+
+    Attributes:
+        name (CharField): The storage name of the blob.
+        size (BigIntegerField): The size of the blob in bytes.
+        refcount (IntegerField): The number of image fields referring to the blob.
+        updated_at (DateTimeField): When refcount last changed.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["refcount", "updated_at"], name="mediablob_orphan_idx")
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Notification(Activity):
+    """
+    A class to represent a notification stored for a user.
+
+    Notifications are written before they are pushed, so a user who was
+    offline receives them when NotificationConsumer replays unread items on
+    reconnect. Likes on a post are merged into one row per digest window
+    (see core.notifications.LikeDigest), with count holding the number of
+    likes it stands for.
+
+    Attributes:
+        recipient (User): The user being notified.
+        actor (User): The user who caused the notification, the latest one for a digest.
+        post (Post): The post the notification is about.
+        kind (CharField): What happened, one of Notification.LIKE or Notification.POST.
+        message (TextField): The rendered notification text.
+        count (IntegerField): The number of events merged into this notification.
+        read_at (DateTimeField): When the recipient marked it as seen, null while unread.
+    """
+
+    LIKE = "like"
+    POST = "post"
+    KINDS = [(LIKE, "Like"), (POST, "New post")]
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="notifications"
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="caused_notifications",
+        blank=True,
+        null=True,
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="notifications",
+        blank=True,
+        null=True,
+    )
+    kind = models.CharField(max_length=16, choices=KINDS)
+    message = models.TextField()
+    count = models.IntegerField(default=1)
+    read_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipient", "created_at", "id"],
+                condition=models.Q(read_at__isnull=True),
+                name="notification_unread_idx",
+            )
+        ]
+
+
+class ArchivedActivity(models.Model):
+    """
+    An abstract class for a row moved out of its table after being marked as deleted.
+
+    Cold tables have no foreign keys and no index but the primary key, so
+    they cost nothing to the queries on live rows. See core.archive.
+
+    Attributes:
+        id (UUIDField): The primary key the row had.
+        created_at (DateTimeField): When the row was created.
+        archived_at (DateTimeField): When the row was moved here.
+        data (JSONField): Every column of the row, by attribute name.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+
+    class Meta:
+        abstract = True
+
+
+class ArchivedPost(ArchivedActivity):
+    """
+    A class to represent a deleted Post kept in cold storage.
+    """
+
+
+class ArchivedLike(ArchivedActivity):
+    """
+    A class to represent a deleted Like kept in cold storage.
+    """
+
+
+class ArchivedComment(ArchivedActivity):
+    """
+    A class to represent a deleted Comment kept in cold storage.
+    """
+
+
+class ArchivedFollowing(ArchivedActivity):
+    """
+    A class to represent a deleted Following kept in cold storage.
+    """
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            connection.connection.execute("PRAGMA {}={}".format(name, value))
+
 
 @receiver(post_save, sender=Like)
 def send_like_notification(sender, instance, created, **kwargs):
     if created:
-        user = instance.post.user
-        channel_layer = get_channel_layer()
-        notification = {
-            "type": "send_notification",
-            "notification": f"{instance.user.email} liked your post.",
-        }
-        async_to_sync(channel_layer.group_send)(f"user_{user.id}", notification)
+        from .notifications import like_digest
+
+        recipient_id = instance.post.user_id
+        post_id = instance.post_id
+        actor = instance.user
+        transaction.on_commit(
+            lambda: like_digest.like_added(recipient_id, post_id, actor)
+        )
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def publish_like_count(sender, instance, **kwargs):
+    if kwargs.get("created", True):
+        from .notifications import publisher
+
+        post_id = instance.post_id
+        transaction.on_commit(lambda: publisher.like_changed(post_id))
 
 
 @receiver(post_save, sender=Post)
 def send_post_notification(sender, instance, created, **kwargs):
     if created:
+        if settings.FEED_FANOUT_ON_WRITE:
+            from .timeline import fan_out_post
+
+            fan_out_post(instance)
+
+        from .notifications import dispatcher
+
         user = instance.user
-        followers = Following.objects.filter(target=user)
-        channel_layer = get_channel_layer()
-        notification = {
-            "type": "send_notification",
-            "notification": f"{user.email} created a new post.",
-        }
-        for follower in followers:
-            async_to_sync(channel_layer.group_send)(
-                f"user_{follower.follower.id}", notification
-            )
+        dispatcher.notify_followers(user, instance, f"{user.email} created a new post.")
+
+
+@receiver(post_save, sender=Post)
+def render_post_image_variants(sender, instance, **kwargs):
+    from .images import processor
+
+    processor.schedule(instance, "image", settings.POST_IMAGE_VARIANTS)
+
+
+@receiver(post_save, sender=User)
+def render_profile_pic_variants(sender, instance, **kwargs):
+    from .images import processor
+
+    processor.schedule(instance, "profile_pic", settings.PROFILE_PIC_VARIANTS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    from utils.authentication import user_cache
+
+    user_id = instance.pk
+    user_cache.invalidate(user_id)
+    # Also after commit, in case a request cached the old row meanwhile.
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=User)
+def remember_media_names(sender, instance, **kwargs):
+    from .media import remember_names
+
+    remember_names(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=User)
+def count_media_references(sender, instance, created, **kwargs):
+    from .media import update_references
+
+    update_references(instance, created)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=User)
+def release_media(sender, instance, **kwargs):
+    from .media import release_references
+
+    release_references(instance)
+
+
+@receiver(post_save, sender=Following)
+def add_follow_to_timeline(sender, instance, created, **kwargs):
+    if created and settings.FEED_FANOUT_ON_WRITE:
+        from .timeline import add_follow
+
+        add_follow(instance)
+
+
+@receiver(post_delete, sender=Following)
+def remove_follow_from_timeline(sender, instance, **kwargs):
+    if settings.FEED_FANOUT_ON_WRITE:
+        from .timeline import remove_follow
+
+        remove_follow(instance)
@@ -0,0 +1,494 @@
+"""
+Module containing the background dispatchers for real-time notifications.
+
+Creating a post must not wait for every follower to be notified. The request
+thread only hands a job to the dispatcher once the transaction commits. A
+worker thread then pages through follower ids, writes a Notification row for
+each batch with one bulk insert, and sends the batch with concurrent
+group_send calls on one event loop. Stored rows are what NotificationConsumer
+replays to users who were offline.
+
+Like notifications are merged per post: LikeDigest collects the likes of a
+NOTIFICATION_LIKE_DIGEST_WINDOW and writes one "X and N others liked your
+post." notification for them, so a popular post sends one frame per window
+instead of one per like.
+
+Live like counts follow the same rule: likes only mark a post as changed,
+and one coalesced update per interval is pushed to the sockets subscribed
+to that post.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync, sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.keyset import decode_cursor, encode_cursor, paginate
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def event_loop():
+    """
+    Return the event loop the channel layer should be driven from.
+
+    Under an ASGI server this is the server loop, which asgiref records in a
+    thread-local for the threads running sync views and signal handlers.
+    Elsewhere (shell, management commands) a private loop thread is started.
+
+    Returns:
+    AbstractEventLoop: A running event loop.
+    """
+    global _loop
+
+    loop = getattr(SyncToAsync.threadlocal, "main_event_loop", None)
+    if loop is not None and loop.is_running():
+        return loop
+
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="notification-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def notification_group(user_id):
+    """Return the channel layer group of the notification sockets of a user."""
+    return f"user_{user_id}"
+
+
+def serialize_notification(notification):
+    """
+    Return the JSON representation of a notification sent to sockets.
+
+    Parameters:
+    notification (Notification): A stored notification.
+
+    Returns:
+    dict: id, kind, notification (the text), count, post_id, created_at and
+        the replay cursor positioned after this notification.
+    """
+    return {
+        "id": str(notification.id),
+        "kind": notification.kind,
+        "notification": notification.message,
+        "count": notification.count,
+        "post_id": str(notification.post_id) if notification.post_id else None,
+        "created_at": notification.created_at.isoformat(),
+        "cursor": encode_cursor(notification.created_at, notification.id),
+    }
+
+
+async def send_all(notifications):
+    """
+    Push stored notifications to the sockets of their recipients.
+
+    Parameters:
+    notifications (list[Notification]): Notifications already written to the database.
+
+    Returns:
+    int: The number of notifications sent.
+    """
+    channel_layer = get_channel_layer()
+    await asyncio.gather(
+        *(
+            channel_layer.group_send(
+                notification_group(notification.recipient_id),
+                {
+                    "type": "send_notification",
+                    "notification": serialize_notification(notification),
+                },
+            )
+            for notification in notifications
+        )
+    )
+    return len(notifications)
+
+
+def unread_notifications(user_id, cursor=None, limit=50):
+    """
+    Fetch one page of the unread notifications of a user, oldest first.
+
+    Parameters:
+    user_id (UUID): The recipient.
+    cursor (str): The cursor of the last notification the client has.
+    limit (int): The maximum number of notifications in the page.
+
+    Returns:
+    tuple: A (notifications, next_cursor) pair of serialized notifications.
+        next_cursor is None on the last page.
+    """
+    from .models import Notification
+
+    rows, next_cursor = paginate(
+        Notification.objects.filter(recipient_id=user_id, read_at__isnull=True),
+        cursor,
+        limit,
+        descending=False,
+    )
+    return [serialize_notification(row) for row in rows], next_cursor
+
+
+def mark_seen(user_id, cursor):
+    """
+    Mark the notifications of a user up to and including a cursor as read.
+
+    Parameters:
+    user_id (UUID): The recipient.
+    cursor (str): The cursor of the last notification seen.
+
+    Returns:
+    int: The number of notifications marked.
+    """
+    from .models import Notification
+
+    created_at, pk = decode_cursor(cursor)
+    return (
+        Notification.objects.filter(
+            recipient_id=user_id, read_at__isnull=True, created_at__lte=created_at
+        )
+        .filter(Q(created_at__lt=created_at) | Q(id__lte=pk))
+        .update(read_at=timezone.now())
+    )
+
+
+class NotificationDispatcher:
+    """
+    NotificationDispatcher fans notifications out to the followers of a user off the request path.
+
+    Attributes:
+        executor (ThreadPoolExecutor): Worker threads reading follower ids.
+        stats (dict): Running totals of jobs, messages and seconds spent.
+
+    Methods:
+        - notify_followers(user, post, message): Queue a notification for every follower of user after commit.
+        - fan_out(user_id, post_id, message): Store and send the notification to every follower, blocking.
+        - metrics(): Return fan-out throughput metrics.
+
+    Note:
+        Batches are sent on the loop returned by event_loop(), the same loop
+        the channel layer and the consumers run on under an ASGI server.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.stats = {"jobs": 0, "messages": 0, "seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.NOTIFICATION_FANOUT_WORKERS,
+                    thread_name_prefix="notification-fanout",
+                )
+            return self.executor
+
+    def notify_followers(self, user, post, message):
+        """
+        Queue a notification for every follower of a user once the current transaction commits.
+
+        Parameters:
+        user (User): The user whose followers are notified.
+        post (Post): The post the notification is about.
+        message (str): The notification text.
+        """
+        loop = event_loop()
+        transaction.on_commit(
+            lambda: self._executor().submit(
+                self.fan_out, user.id, post.id, message, loop
+            )
+        )
+
+    def fan_out(self, user_id, post_id, message, loop=None):
+        """
+        Store a notification for every follower of a user and send them in concurrent batches.
+
+        Follower ids are read a batch at a time in follower_id order, so no
+        cursor stays open on the followings table while notifications are
+        inserted.
+
+        Parameters:
+        user_id (UUID): The user whose followers are notified.
+        post_id (UUID): The post the notification is about.
+        message (str): The notification text.
+        loop (AbstractEventLoop): The loop running the channel layer.
+
+        Returns:
+        int: The number of notifications sent.
+        """
+        from .models import Following, Notification
+
+        loop = loop or event_loop()
+        batch_size = settings.NOTIFICATION_FANOUT_BATCH_SIZE
+        started = time.perf_counter()
+        sent = 0
+        try:
+            followers = Following.objects.filter(target_id=user_id).order_by(
+                "follower_id"
+            )
+            batch = list(followers.values_list("follower_id", flat=True)[:batch_size])
+            while batch:
+                notifications = Notification.objects.bulk_create(
+                    [
+                        Notification(
+                            recipient_id=follower_id,
+                            actor_id=user_id,
+                            post_id=post_id,
+                            kind=Notification.POST,
+                            message=message,
+                        )
+                        for follower_id in batch
+                    ]
+                )
+                sent += self._send(loop, notifications)
+                if len(batch) < batch_size:
+                    break
+                batch = list(
+                    followers.filter(follower_id__gt=batch[-1]).values_list(
+                        "follower_id", flat=True
+                    )[:batch_size]
+                )
+        except Exception:
+            logger.exception("Notification fan-out for user %s failed", user_id)
+        finally:
+            close_old_connections()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.stats["jobs"] += 1
+            self.stats["messages"] += sent
+            self.stats["seconds"] += elapsed
+        logger.info(
+            "Notified %d followers of user %s in %.3fs (%.0f msg/s)",
+            sent,
+            user_id,
+            elapsed,
+            sent / elapsed if elapsed else 0,
+        )
+        return sent
+
+    def _send(self, loop, notifications):
+        future = asyncio.run_coroutine_threadsafe(send_all(notifications), loop)
+        return future.result()
+
+    def metrics(self):
+        """
+        Return fan-out throughput metrics since the process started.
+
+        Returns:
+        dict: jobs, messages, seconds and messages_per_second.
+        """
+        with self._lock:
+            metrics = dict(self.stats)
+        metrics["messages_per_second"] = (
+            metrics["messages"] / metrics["seconds"] if metrics["seconds"] else 0.0
+        )
+        return metrics
+
+
+dispatcher = NotificationDispatcher()
+
+
+def like_count_group(post_id):
+    """Return the channel layer group streaming the like count of a post."""
+    return f"post_likes_{post_id}"
+
+
+class LikeCountPublisher:
+    """
+    LikeCountPublisher pushes like counts to subscribed sockets when likes change.
+
+    Bursts of likes on a post are coalesced: the first change schedules one
+    read of the count LIKE_COUNT_STREAM_INTERVAL seconds later, and changes
+    arriving before that read are folded into it. Database load therefore
+    depends on how many posts change, not on how many sockets are listening.
+
+    Attributes:
+        pending (set): Ids of posts with a scheduled update.
+        stats (dict): Running totals of like events, count reads and updates sent.
+
+    Methods:
+        - like_changed(post_id): Record a like or dislike on a post.
+    """
+
+    def __init__(self):
+        self.pending = set()
+        self.stats = {"events": 0, "reads": 0, "messages": 0}
+        self._lock = threading.Lock()
+
+    def like_changed(self, post_id):
+        """
+        Record a like or dislike on a post and schedule a coalesced update.
+
+        Parameters:
+        post_id (UUID): The post whose likes changed.
+        """
+        with self._lock:
+            self.stats["events"] += 1
+            if post_id in self.pending:
+                return
+            self.pending.add(post_id)
+
+        loop = event_loop()
+        loop.call_soon_threadsafe(self._schedule, loop, post_id)
+
+    def _schedule(self, loop, post_id):
+        loop.call_later(
+            settings.LIKE_COUNT_STREAM_INTERVAL,
+            lambda: loop.create_task(self._publish(post_id)),
+        )
+
+    async def _publish(self, post_id):
+        with self._lock:
+            self.pending.discard(post_id)
+        try:
+            count = await sync_to_async(self._read_count)(post_id)
+        except ObjectDoesNotExist:
+            return
+
+        await get_channel_layer().group_send(
+            like_count_group(post_id),
+            {"type": "like_count", "post_id": str(post_id), "count": count},
+        )
+        with self._lock:
+            self.stats["messages"] += 1
+
+    def _read_count(self, post_id):
+        from .likes import like_count
+        from .models import Post
+
+        with self._lock:
+            self.stats["reads"] += 1
+        return like_count(Post(id=post_id))
+
+
+publisher = LikeCountPublisher()
+
+
+def digest_message(actor_email, count):
+    """Return the text of a like notification standing for count likes."""
+    if count == 1:
+        return "{} liked your post.".format(actor_email)
+    return "{} and {} others liked your post.".format(actor_email, count - 1)
+
+
+class LikeDigest:
+    """
+    LikeDigest merges the like notifications of a post into one per window.
+
+    The first like on a post schedules a flush NOTIFICATION_LIKE_DIGEST_WINDOW
+    seconds later; likes arriving before it only add their actor to the set
+    of the post, so someone liking it again counts once. A flush
+    writes the notifications of every post that collected likes with one
+    bulk insert, then sends them. Likes still waiting for a flush are lost
+    if the process exits.
+
+    Attributes:
+        pending (dict): (recipient id, post id) to the actor ids and latest actor of the likes collected.
+        stats (dict): Running totals of likes seen and notifications written.
+
+    Methods:
+        - like_added(recipient_id, post_id, actor): Record a like to notify the post author about.
+        - flush(): Write and send the collected notifications, blocking.
+    """
+
+    def __init__(self):
+        self.pending = {}
+        self.stats = {"likes": 0, "notifications": 0}
+        self._lock = threading.Lock()
+
+    def like_added(self, recipient_id, post_id, actor):
+        """
+        Record a like and schedule the digest of its post.
+
+        Parameters:
+        recipient_id (UUID): The author of the liked post.
+        post_id (UUID): The liked post.
+        actor (User): The user who liked it.
+        """
+        with self._lock:
+            self.stats["likes"] += 1
+            schedule = not self.pending
+            entry = self.pending.setdefault((recipient_id, post_id), {"actors": set()})
+            entry["actors"].add(actor.id)
+            entry["actor_id"] = actor.id
+            entry["actor_email"] = actor.email
+        if schedule:
+            loop = event_loop()
+            loop.call_soon_threadsafe(self._schedule, loop)
+
+    def _schedule(self, loop):
+        loop.call_later(
+            settings.NOTIFICATION_LIKE_DIGEST_WINDOW,
+            lambda: loop.create_task(self._flush()),
+        )
+
+    async def _flush(self):
+        try:
+            notifications = await sync_to_async(self._write)()
+            return await send_all(notifications)
+        except Exception:
+            logger.exception("Like notification digest failed")
+            return 0
+
+    def flush(self):
+        """
+        Write the collected like notifications and send them, blocking.
+
+        Returns:
+        int: The number of notifications sent.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._flush(), event_loop())
+        return future.result()
+
+    def _write(self):
+        from .models import Notification, Post
+
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        try:
+            # Posts deleted during the window are skipped.
+            existing = set(
+                Post.objects.filter(
+                    id__in=[post_id for _, post_id in pending]
+                ).values_list("id", flat=True)
+            )
+            notifications = Notification.objects.bulk_create(
+                [
+                    Notification(
+                        recipient_id=recipient_id,
+                        actor_id=entry["actor_id"],
+                        post_id=post_id,
+                        kind=Notification.LIKE,
+                        message=digest_message(
+                            entry["actor_email"], len(entry["actors"])
+                        ),
+                        count=len(entry["actors"]),
+                    )
+                    for (recipient_id, post_id), entry in pending.items()
+                    if post_id in existing
+                ]
+            )
+        finally:
+            close_old_connections()
+        with self._lock:
+            self.stats["notifications"] += len(notifications)
+        return notifications
+
+
+like_digest = LikeDigest()
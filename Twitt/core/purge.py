@@ -0,0 +1,212 @@
+"""
+Module containing the deletion of posts and comments off the request path.
+
+Deleting a post through the ORM collects and deletes every like, comment,
+timeline entry and notification pointing at it, and sends a signal per
+like, all inside the request; the response time grows with the post's
+popularity. delete_post and delete_comment only set mark_as_deleted on the
+row, which hides it from reads, and leave the rest to a worker thread once
+the transaction commits. The worker deletes the dependent rows in batches
+of plain DELETE statements, each batch its own transaction, and releases
+the image of a post (see core.media). The marked row itself stays, hidden
+by the default manager, until core.archive moves it to a cold table;
+archiving purges again first, so purges lost to a restart are finished
+there.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, PositiveIntegerField, When
+
+from .comments import PATH_END, ancestor_paths
+from .media import release
+from .models import Comment, Like, LikeCounterShard, Notification, Post, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+# Rows of these models pointing at a post are deleted before its comments.
+POST_DEPENDENTS = (Like, LikeCounterShard, TimelineEntry, Notification)
+
+
+def delete_post(post):
+    """
+    Hide a post and queue the deletion of everything pointing at it.
+
+    Parameters:
+    post (Post): The post to delete.
+    """
+    with transaction.atomic():
+        Post.objects.filter(pk=post.pk).update(mark_as_deleted=True)
+        purger.schedule(Post, post.pk)
+
+
+def delete_comment(comment):
+    """
+    Hide a comment with its replies, update the counters above it, and queue its purge.
+
+    Parameters:
+    comment (Comment): The comment to delete.
+    """
+    with transaction.atomic():
+        removed = comment.descendant_count + 1
+        if comment.reply_to_id:
+            ancestors = ancestor_paths(comment.path)[:-1]
+            Comment.objects.filter(post_id=comment.post_id, path__in=ancestors).update(
+                descendant_count=F("descendant_count") - removed,
+                reply_count=Case(
+                    When(pk=comment.reply_to_id, then=F("reply_count") - 1),
+                    default=F("reply_count"),
+                    output_field=PositiveIntegerField(),
+                ),
+            )
+        Comment.objects.filter(pk=comment.pk).update(mark_as_deleted=True)
+        purger.schedule(Comment, comment.pk)
+
+
+def _delete_batches(queryset, batch_size, order_by=()):
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                queryset.order_by(*order_by).values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            # One DELETE per batch: no collector, no per-row signals. Callers
+            # delete rows other rows point at only after those.
+            rows = queryset.model._base_manager.filter(pk__in=ids)
+            deleted += rows._raw_delete(rows.db)
+
+
+def _release_image(post_id):
+    posts = Post.all_objects.filter(pk=post_id, mark_as_deleted=True)
+    with transaction.atomic():
+        name = posts.values_list("image", flat=True).first()
+        # Cleared with the release, so a second purge or the archive's
+        # delete does not release it again.
+        if name and posts.filter(image=name).update(image="", image_variants={}):
+            release(name)
+
+
+def purge_post(post_id, batch_size=None):
+    """
+    Delete the likes, comments, timeline entries and notifications of a post marked as deleted, and release its image.
+
+    Parameters:
+    post_id (UUID): The post.
+    batch_size (int): Rows per batch, DELETION_PURGE_BATCH_SIZE by default.
+
+    Returns:
+    int: The number of rows deleted, or 0 if the post is not marked as deleted.
+    """
+    batch_size = batch_size or settings.DELETION_PURGE_BATCH_SIZE
+    if not Post.all_objects.filter(pk=post_id, mark_as_deleted=True).exists():
+        return 0
+    _release_image(post_id)
+    deleted = 0
+    for model in POST_DEPENDENTS:
+        deleted += _delete_batches(
+            model._base_manager.filter(post_id=post_id), batch_size
+        )
+    # Descending paths put every reply before the comment it replies to.
+    return deleted + _delete_batches(
+        Comment._base_manager.filter(post_id=post_id), batch_size, ("-path",)
+    )
+
+
+def purge_comment(comment_id, batch_size=None):
+    """
+    Delete the replies of a comment marked as deleted.
+
+    Parameters:
+    comment_id (UUID): The comment.
+    batch_size (int): Rows per batch, DELETION_PURGE_BATCH_SIZE by default.
+
+    Returns:
+    int: The number of rows deleted, or 0 if the comment is not marked as deleted.
+    """
+    batch_size = batch_size or settings.DELETION_PURGE_BATCH_SIZE
+    comment = Comment.all_objects.filter(pk=comment_id, mark_as_deleted=True).first()
+    if comment is None:
+        return 0
+    replies = Comment._base_manager.filter(
+        post_id=comment.post_id,
+        path__gt=comment.path,
+        path__lt=comment.path + PATH_END,
+    )
+    return _delete_batches(replies, batch_size, ("-path",))
+
+
+PURGES = {Post: purge_post, Comment: purge_comment}
+
+
+class DeletionPurger:
+    """
+    DeletionPurger deletes marked posts and comments on a worker thread off the request path.
+
+    Attributes:
+        executor (ThreadPoolExecutor): Worker threads running purges.
+        stats (dict): Running totals of jobs, rows deleted, failures and seconds spent.
+
+    Methods:
+        - schedule(model, pk): Purge a marked row after the current transaction commits.
+        - process(model, pk): Purge a marked row, blocking.
+    """
+
+    def __init__(self):
+        self.executor = None
+        self.stats = {"jobs": 0, "rows": 0, "failed": 0, "seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        with self._lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=settings.DELETION_PURGE_WORKERS,
+                    thread_name_prefix="deletion-purge",
+                )
+            return self.executor
+
+    def schedule(self, model, pk):
+        """
+        Queue the purge of a marked row once the current transaction commits.
+
+        Parameters:
+        model (type): Post or Comment.
+        pk (UUID): The primary key of the row.
+        """
+        transaction.on_commit(lambda: self._executor().submit(self.process, model, pk))
+
+    def process(self, model, pk):
+        """
+        Delete the rows pointing at a row marked as deleted.
+
+        Parameters:
+        model (type): Post or Comment.
+        pk (UUID): The primary key of the row.
+
+        Returns:
+        int: The number of rows deleted.
+        """
+        started = time.perf_counter()
+        deleted = 0
+        try:
+            deleted = PURGES[model](pk)
+        except Exception:
+            self.stats["failed"] += 1
+            logger.exception("Purging %s %s failed", model.__name__, pk)
+        finally:
+            close_old_connections()
+
+        self.stats["jobs"] += 1
+        self.stats["rows"] += deleted
+        self.stats["seconds"] += time.perf_counter() - started
+        return deleted
+
+
+purger = DeletionPurger()
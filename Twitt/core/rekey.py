@@ -0,0 +1,91 @@
+"""
+Module containing the rewrite of uuid4 primary keys into time-ordered UUIDv7.
+
+New rows get UUIDv7 keys by default (see utils.uuids); rows created before
+keep their random uuid4 keys until rekey_model rewrites them. Each row gets
+a UUIDv7 built from its created_at, and every foreign key column pointing at
+it, including many-to-many tables, is rewritten in the same transaction.
+Foreign key constraints are checked at commit, so the batch is consistent
+again by then. Rekeyed users must log in again: issued tokens carry the old
+id.
+"""
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Value, When
+
+from utils.uuids import uuid7
+
+
+def referring_fields(model):
+    """
+    Return the foreign keys pointing at the primary key of a model.
+
+    Parameters:
+    model (type): The model.
+
+    Returns:
+    list: ForeignKey and OneToOneField fields, of any model, including the
+        tables behind many-to-many fields.
+    """
+    return [
+        relation.field
+        for relation in model._meta.get_fields(include_hidden=True)
+        if relation.auto_created
+        and not relation.concrete
+        and (relation.one_to_many or relation.one_to_one)
+        and relation.field.target_field.primary_key
+    ]
+
+
+def _remap(field_name, mapping):
+    return Case(
+        *[When(**{field_name: old}, then=Value(new)) for old, new in mapping.items()],
+        output_field=models.UUIDField(),
+    )
+
+
+def rekey_batch(model, mapping):
+    """
+    Give rows new primary keys and point every foreign key at them.
+
+    Parameters:
+    model (type): The model.
+    mapping (dict): Old primary key to new primary key.
+
+    Returns:
+    int: The number of rows rekeyed.
+    """
+    with transaction.atomic():
+        for field in referring_fields(model):
+            field.model._base_manager.filter(
+                **{"{}__in".format(field.attname): list(mapping)}
+            ).update(**{field.attname: _remap(field.attname, mapping)})
+        pk = model._meta.pk.attname
+        return model._base_manager.filter(pk__in=list(mapping)).update(
+            **{pk: _remap(pk, mapping)}
+        )
+
+
+def rekey_model(model, batch_size=None):
+    """
+    Rewrite every primary key of a model that is not a UUIDv7.
+
+    Parameters:
+    model (type): A model with a UUID primary key and a created_at field.
+    batch_size (int): Rows per transaction, UUID_REKEY_BATCH_SIZE by default.
+
+    Returns:
+    int: The number of rows rekeyed.
+    """
+    batch_size = batch_size or settings.UUID_REKEY_BATCH_SIZE
+    rows = model._base_manager.order_by("pk").values_list("pk", "created_at")
+    rekeyed, last = 0, None
+    while True:
+        batch = list((rows.filter(pk__gt=last) if last else rows)[:batch_size])
+        if not batch:
+            return rekeyed
+        last = batch[-1][0]
+        mapping = {pk: uuid7(created_at) for pk, created_at in batch if pk.version != 7}
+        if mapping:
+            rekeyed += rekey_batch(model, mapping)
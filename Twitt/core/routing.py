@@ -4,4 +4,5 @@ from . import consumers
 
 ws_urlpatterns = [
     re_path(r"ws/notifications/$", consumers.NotificationConsumer.as_asgi()),
+    re_path(r"ws/likes/$", consumers.LikeCountConsumer.as_asgi()),
 ]
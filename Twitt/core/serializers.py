@@ -1,5 +1,8 @@
+from django.db.models import Q
 from rest_framework import serializers
-from .models import Following, User, Post, Comment, Like
+from .comments import add_comment
+from .images import variant_urls
+from .models import Following, User, UserManager, Post, Comment, Like
 from utils.exceptions.exceptions import (
     CommentDoesNotExists,
     EmailAlreadyExistsException,
@@ -46,16 +49,29 @@ class SignUpSerializer(serializers.ModelSerializer):
             "password",
             "password2",
         ]
+        # Uniqueness is checked by validate() in one query.
+        extra_kwargs = {
+            "email": {"validators": []},
+            "username": {"validators": [User.username_validator]},
+        }
 
     def validate(self, data):
+        # As create_user stores it, so differently cased domains collide here.
+        data["email"] = UserManager.normalize_email(data["email"])
+        # Emails of at most the two users holding the email or the username.
+        taken = list(
+            User.objects.filter(
+                Q(email=data["email"]) | Q(username=data["username"])
+            ).values_list("email", flat=True)[:2]
+        )
 
-        if User.objects.filter(email=data["email"]).exists():
+        if data["email"] in taken:
 
             raise EmailAlreadyExistsException(
                 item="Email", message="Email Already Exists!"
             )
 
-        if User.objects.filter(username=data["username"]).exists():
+        if taken:
             raise UsernameAlreadyExistsException(
                 item="Username", message="Username Already Exists!"
             )
@@ -69,11 +85,8 @@ class SignUpSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, data, *args, **kwargs):
-        password = data.pop("password2")
-        user = User.objects.create(**data)
-        user.set_password(password)
-        user.save()
-        return user
+        data.pop("password2")
+        return User.objects.create_user(**data)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -113,11 +126,17 @@ class PostSerializer(serializers.ModelSerializer):
     Attributes:
         model: The model class to be serialized (Post).
         fields: The fields to be included in the serialized data (image, caption).
+        image_variants: URLs and sizes of the resized copies of the image, empty until they are rendered.
     """
 
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Post
-        fields = ["id", "image", "caption"]
+        fields = ["id", "image", "image_variants", "caption"]
+
+    def get_image_variants(self, post):
+        return variant_urls(post.image_variants)
 
 
 class PostUpdateSerializer(serializers.ModelSerializer):
@@ -213,10 +232,7 @@ class CommentSerializer(serializers.ModelSerializer):
         post = Post.objects.filter(id=post_id).first()
         if not post:
             raise PostDoesNotExists(item="Post", message="Post does not exists")
-        comment = Comment.objects.create(
-            post=post, user=self.context.get("user"), **data
-        )
-        return comment
+        return add_comment(self.context.get("user"), post, data["comment_text"])
 
 
 class ReplyCommentSerializer(serializers.ModelSerializer):
@@ -246,14 +262,12 @@ class ReplyCommentSerializer(serializers.ModelSerializer):
         try:
 
             parent_comment = data.get("reply_to")
-            post = parent_comment.post
-            reply_comment = Comment.objects.create(
+            return add_comment(
+                self.context.get("user"),
+                parent_comment.post,
+                data.get("comment_text"),
                 reply_to=parent_comment,
-                post=post,
-                user=self.context.get("user"),
-                comment_text=data.get("comment_text"),
             )
-            return reply_comment
         except Comment.DoesNotExist as ce:
             raise CommentDoesNotExists(
                 item="Comment", message="comment does not exists"
@@ -280,3 +294,77 @@ class FollowingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Following
         fields = ["target", "follower"]
+
+
+class CommentListSerializer(serializers.ModelSerializer):
+    """
+    Serializer class for listing the comments of a post.
+
+    Attributes:
+        user (ReadOnlyField): A read-only field representing the username of the commenter.
+
+    Meta:
+        model (Comment): The model class that the serializer is based on.
+        fields (list): The fields to include in the serialized output.
+    """
+
+    user = serializers.ReadOnlyField(source="user.username")
+
+    class Meta:
+        model = Comment
+        fields = ["id", "user", "comment_text", "reply_to", "created_at"]
+
+
+class CommentThreadSerializer(serializers.ModelSerializer):
+    """
+    Serializer class for a comment of a thread, with its replies nested.
+
+    Attributes:
+        user (ReadOnlyField): A read-only field representing the username of the commenter.
+        replies (SerializerMethodField): The replies loaded under the comment, serialized the same way.
+        replies_cursor (ReadOnlyField): The cursor of the next page of replies, or None.
+
+    Meta:
+        model (Comment): The model class that the serializer is based on.
+        fields (list): The fields to include in the serialized output.
+    """
+
+    user = serializers.ReadOnlyField(source="user.username")
+    replies = serializers.SerializerMethodField()
+    replies_cursor = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Comment
+        fields = [
+            "id",
+            "user",
+            "comment_text",
+            "created_at",
+            "depth",
+            "reply_count",
+            "descendant_count",
+            "replies",
+            "replies_cursor",
+        ]
+
+    def get_replies(self, comment):
+        return CommentThreadSerializer(comment.replies, many=True).data
+
+
+class LikerSerializer(serializers.ModelSerializer):
+    """
+    Serializer class for listing the users who liked a post.
+
+    Attributes:
+        user (ReadOnlyField): A read-only field representing the username of the liker.
+
+    Meta:
+        model (Like): The model class that the serializer is based on.
+        fields (list): The fields to include in the serialized output.
+    """
+
+    user = serializers.ReadOnlyField(source="user.username")
+
+    class Meta:
+        model = Like
+        fields = ["id", "user", "created_at"]
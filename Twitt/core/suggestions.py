@@ -0,0 +1,104 @@
+"""
+Module containing the "who to follow" suggestion service.
+
+Candidates are the active users the reader does not follow yet, excluded in
+the database through a Following subquery. A sample is taken with a random
+offset into that set, so only `count` rows are ever loaded and the number of
+queries does not depend on how many users exist.
+"""
+
+import random
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Following, User
+
+RANDOM = "random"
+FRIENDS_OF_FRIENDS = "friends_of_friends"
+
+
+def candidates(user):
+    """
+    Build the queryset of users that can be suggested to a user.
+
+    Parameters:
+    user (User): The user the suggestions are for.
+
+    Returns:
+    QuerySet: Active users other than `user` that `user` does not follow.
+    """
+    followed = Following.objects.filter(follower=user).values("target_id")
+    return (
+        User.objects.filter(is_active=True).exclude(id=user.id).exclude(id__in=followed)
+    )
+
+
+def sample_users(queryset, count):
+    """
+    Take a random window of `count` users from a queryset.
+
+    Costs one COUNT and one LIMIT/OFFSET query.
+
+    Parameters:
+    queryset (QuerySet): The users to sample from.
+    count (int): The number of users to return.
+
+    Returns:
+    list: Up to `count` users in random order.
+    """
+    total = queryset.count()
+    if not total:
+        return []
+
+    offset = random.randint(0, max(total - count, 0))
+    sample = list(queryset.order_by("id")[offset : offset + count])
+    random.shuffle(sample)
+    return sample
+
+
+def friends_of_friends(user, count):
+    """
+    Rank candidates by how many of the accounts `user` follows also follow them.
+
+    Parameters:
+    user (User): The user the suggestions are for.
+    count (int): The number of users to return.
+
+    Returns:
+    list: Up to `count` users, most shared connections first.
+    """
+    followed = Following.objects.filter(follower=user).values("target_id")
+    return list(
+        candidates(user)
+        .filter(followers__follower_id__in=followed)
+        .annotate(mutuals=Count("followers"))
+        .order_by("-mutuals", "id")[:count]
+    )
+
+
+def suggest_users(user, count=None, mode=None):
+    """
+    Suggest users for `user` to follow.
+
+    Parameters:
+    user (User): The user the suggestions are for.
+    count (int): The number of users, defaults to settings.SUGGESTION_COUNT.
+    mode (str): RANDOM or FRIENDS_OF_FRIENDS, defaults to settings.SUGGESTION_MODE.
+        Friends-of-friends results are topped up with a random sample when
+        there are not enough of them.
+
+    Returns:
+    list: Up to `count` users.
+    """
+    count = count or settings.SUGGESTION_COUNT
+    mode = mode or settings.SUGGESTION_MODE
+
+    suggestions = []
+    if mode == FRIENDS_OF_FRIENDS:
+        suggestions = friends_of_friends(user, count)
+
+    if len(suggestions) < count:
+        pool = candidates(user).exclude(id__in=[x.id for x in suggestions])
+        suggestions += sample_users(pool, count - len(suggestions))
+    return suggestions
@@ -0,0 +1,44 @@
+"""
+Template filters choosing resized variants of image fields, see core.images.
+
+Usage:
+    {% load image_variants %}
+    <img src="{{ post.image|variant:'medium' }}" srcset="{{ post.image|srcset:'jpeg' }}">
+"""
+
+from django import template
+from django.core.files.storage import default_storage
+
+from core.images import variants_field
+
+register = template.Library()
+
+
+def _sizes(fieldfile):
+    variants = getattr(fieldfile.instance, variants_field(fieldfile.field.name))
+    if not variants or variants.get("source") != fieldfile.name:
+        return {}
+    return variants.get("sizes", {})
+
+
+@register.filter
+def variant(fieldfile, label):
+    """
+    Return the JPEG URL of one variant of an image, or the original URL while it is missing.
+    """
+    size = _sizes(fieldfile).get(label)
+    if not size:
+        return fieldfile.url
+    return default_storage.url(size["jpeg"])
+
+
+@register.filter
+def srcset(fieldfile, extension):
+    """
+    Return a srcset of the uncropped variants of an image in one format.
+    """
+    return ", ".join(
+        "{} {}w".format(default_storage.url(size[extension]), size["width"])
+        for size in sorted(_sizes(fieldfile).values(), key=lambda size: size["width"])
+        if not size["cropped"]
+    )
@@ -0,0 +1,241 @@
+"""
+Module containing the materialized (fan-out-on-write) home timeline.
+
+When settings.FEED_FANOUT_ON_WRITE is enabled, every new post is copied into
+a TimelineEntry row per follower of its author, so reading a feed is a single
+range scan over (user, created_at). Authors with more followers than
+settings.FEED_FANOUT_THRESHOLD are switched to fan-out-on-read: their posts
+are not copied, and are merged into the page from the posts table instead.
+"""
+
+from django.conf import settings
+from django.db.models import Count
+
+from utils.keyset import cut_page, seek
+from .models import Following, Post, TimelineEntry, User
+
+
+def _entries_for(post, follower_ids):
+    return [
+        TimelineEntry(user_id=follower_id, post=post, created_at=post.created_at)
+        for follower_id in follower_ids
+    ]
+
+
+def _bulk_write(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=settings.FEED_FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def switch_to_fanout_on_read(user):
+    """
+    Flag an author as fan-out-on-read once their follower count crosses the threshold.
+
+    Only threshold + 1 follower rows are counted, so the check stays cheap
+    however large the audience is.
+
+    Parameters:
+    user (User): The author of a new post.
+
+    Returns:
+    bool: True if the user's posts must be pulled on read.
+    """
+    if user.fanout_on_read:
+        return True
+
+    threshold = settings.FEED_FANOUT_THRESHOLD
+    if Following.objects.filter(target=user)[: threshold + 1].count() > threshold:
+        User.objects.filter(id=user.id).update(fanout_on_read=True)
+        user.fanout_on_read = True
+    return user.fanout_on_read
+
+
+def refresh_fanout_flags():
+    """
+    Recompute the fan-out-on-read flag of every user from their follower count.
+
+    Returns:
+    int: The number of users flagged as fan-out-on-read.
+    """
+    heavy = (
+        Following.objects.values("target_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=settings.FEED_FANOUT_THRESHOLD)
+        .values("target_id")
+    )
+    User.objects.filter(fanout_on_read=True).exclude(id__in=heavy).update(
+        fanout_on_read=False
+    )
+    return User.objects.filter(id__in=heavy).update(fanout_on_read=True)
+
+
+def fan_out_post(post):
+    """
+    Copy a new post into the timeline of every follower of its author.
+
+    Follower ids are streamed from the database and written in batches of
+    settings.FEED_FANOUT_BATCH_SIZE, so memory stays bounded.
+
+    Parameters:
+    post (Post): The post that was just created.
+    """
+    if switch_to_fanout_on_read(post.user):
+        return
+
+    follower_ids = (
+        Following.objects.filter(target_id=post.user_id)
+        .values_list("follower_id", flat=True)
+        .iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+    )
+    batch = []
+    for follower_id in follower_ids:
+        batch.append(follower_id)
+        if len(batch) >= settings.FEED_FANOUT_BATCH_SIZE:
+            _bulk_write(_entries_for(post, batch))
+            batch = []
+    if batch:
+        _bulk_write(_entries_for(post, batch))
+
+
+def add_follow(following):
+    """
+    Copy the existing posts of a newly followed author into the follower's timeline.
+
+    Posts are streamed and written in batches of settings.FEED_FANOUT_BATCH_SIZE,
+    so memory stays bounded however many posts the author has.
+
+    Parameters:
+    following (Following): The follow relationship that was just created.
+    """
+    if following.target.fanout_on_read:
+        return
+
+    posts = (
+        Post.objects.filter(user_id=following.target_id)
+        .values_list("id", "created_at")
+        .iterator(chunk_size=settings.FEED_FANOUT_BATCH_SIZE)
+    )
+    batch = []
+    for post_id, created_at in posts:
+        batch.append(
+            TimelineEntry(
+                user_id=following.follower_id, post_id=post_id, created_at=created_at
+            )
+        )
+        if len(batch) >= settings.FEED_FANOUT_BATCH_SIZE:
+            _bulk_write(batch)
+            batch = []
+    if batch:
+        _bulk_write(batch)
+
+
+def remove_follow(following):
+    """
+    Drop the posts of an unfollowed author from the follower's timeline.
+
+    Parameters:
+    following (Following): The follow relationship that was just deleted.
+    """
+    TimelineEntry.objects.filter(
+        user_id=following.follower_id, post__user_id=following.target_id
+    ).delete()
+
+
+def get_timeline(user, cursor=None, limit=None):
+    """
+    Fetch one page of the materialized home timeline of a user.
+
+    The page is built from one range scan over the user's TimelineEntry rows
+    and one query for posts of followed fan-out-on-read authors, merged on
+    (created_at, id).
+
+    Parameters:
+    user (User): The user reading the feed.
+    cursor (str): An optional cursor returned with the previous page.
+    limit (int): The page size, defaults to settings.FEED_PAGE_SIZE.
+
+    Returns:
+    tuple: A (posts, next_cursor) pair. next_cursor is None on the last page.
+    """
+    limit = limit or settings.FEED_PAGE_SIZE
+
+    entries = seek(
+        TimelineEntry.objects.filter(user=user, post__mark_as_deleted=False),
+        cursor,
+        id_field="post_id",
+    ).select_related("post__user")[: limit + 1]
+
+    targets = Following.objects.filter(
+        follower=user, target__fanout_on_read=True
+    ).values("target_id")
+    pulled = seek(
+        Post.objects.filter(user_id__in=targets).select_related("user"), cursor
+    )[: limit + 1]
+
+    posts = {entry.post.id: entry.post for entry in entries}
+    posts.update((post.id, post) for post in pulled)
+    rows = sorted(
+        posts.values(), key=lambda post: (post.created_at, post.id), reverse=True
+    )
+    return cut_page(rows[: limit + 1], limit)
+
+
+def rebuild_timelines(user_ids=None, batch_size=None):
+    """
+    Rebuild materialized timelines from Following and Post.
+
+    Users are processed in batches: their entries are deleted with one
+    statement, then recreated from a single join streamed into bulk inserts.
+
+    Parameters:
+    user_ids (list): Optional ids of the users to rebuild, defaults to all users.
+    batch_size (int): Users and rows per batch, defaults to
+        settings.FEED_FANOUT_BATCH_SIZE.
+
+    Returns:
+    int: The number of timeline rows written.
+    """
+    batch_size = batch_size or settings.FEED_FANOUT_BATCH_SIZE
+    users = User.objects.order_by("id").values_list("id", flat=True)
+    if user_ids is not None:
+        users = users.filter(id__in=user_ids)
+
+    written = 0
+    user_batch = []
+    for user_id in users.iterator(chunk_size=batch_size):
+        user_batch.append(user_id)
+        if len(user_batch) >= batch_size:
+            written += _rebuild_batch(user_batch, batch_size)
+            user_batch = []
+    if user_batch:
+        written += _rebuild_batch(user_batch, batch_size)
+    return written
+
+
+def _rebuild_batch(user_ids, batch_size):
+    TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+
+    rows = (
+        Following.objects.filter(
+            follower_id__in=user_ids,
+            target__fanout_on_read=False,
+            target__posts__isnull=False,
+        )
+        .values_list("follower_id", "target__posts__id", "target__posts__created_at")
+        .iterator(chunk_size=batch_size)
+    )
+    written = 0
+    entries = []
+    for follower_id, post_id, created_at in rows:
+        entries.append(
+            TimelineEntry(user_id=follower_id, post_id=post_id, created_at=created_at)
+        )
+        if len(entries) >= batch_size:
+            _bulk_write(entries)
+            written += len(entries)
+            entries = []
+    if entries:
+        _bulk_write(entries)
+        written += len(entries)
+    return written
@@ -1,11 +1,19 @@
 from django.urls import path
 from .views import (
+    FollowerListAPIView,
+    FollowingListAPIView,
+    PostCommentListAPIView,
+    PostCommentThreadAPIView,
+    PostLikerListAPIView,
+    UserPostListAPIView,
     CreateReplyCommentAPIView,
     PostRetrieveAPIView,
     RemoveFollowerAPIView,
     UserLoginAPIView,
     UserSignUpAPIView,
     UserLogoutAPIView,
+    UserTokenRefreshAPIView,
+    UserImportAPIView,
     PostCreateAPIView,
     PostUpdateAPIView,
     PostDeleteAPIView,
@@ -15,8 +23,6 @@ from .views import (
     DeleteCommentAPIView,
     CreateFollowerAPIView,
 )
-from django.conf import settings
-from django.conf.urls.static import static
 
 app_name = "core"
 
@@ -24,6 +30,10 @@ urlpatterns = [
     path("user/sign-up/", UserSignUpAPIView.as_view(), name="sign_up"),
     path("user/login/", UserLoginAPIView.as_view(), name="login"),
     path("user/logout/", UserLogoutAPIView.as_view(), name="logout"),
+    path(
+        "user/token/refresh/", UserTokenRefreshAPIView.as_view(), name="token_refresh"
+    ),
+    path("user/import/", UserImportAPIView.as_view(), name="import_users"),
 ]
 
 # Posts url
@@ -62,7 +72,7 @@ urlpatterns += [
         CreateReplyCommentAPIView.as_view(),
         name="create_reply_comment",
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
 
 
 urlpatterns += [
@@ -77,3 +87,23 @@ urlpatterns += [
         name="remove_follower",
     ),
 ]
+
+
+# List urls
+
+urlpatterns += [
+    path("user/posts/", UserPostListAPIView.as_view(), name="list_posts"),
+    path(
+        "user/post/comments/",
+        PostCommentListAPIView.as_view(),
+        name="list_comments",
+    ),
+    path(
+        "user/post/comments/thread/",
+        PostCommentThreadAPIView.as_view(),
+        name="comment_thread",
+    ),
+    path("user/post/likes/", PostLikerListAPIView.as_view(), name="list_likers"),
+    path("user/followers/", FollowerListAPIView.as_view(), name="list_followers"),
+    path("user/following/", FollowingListAPIView.as_view(), name="list_following"),
+]
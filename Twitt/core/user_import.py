@@ -0,0 +1,218 @@
+"""
+Module containing the bulk user import behind import_users and UserImportAPIView.
+
+Creating migrated users through SignUpSerializer costs two existence queries,
+an insert and an update per user, with passwords hashed one after another.
+UserImporter streams CSV or JSONL rows in batches of USER_IMPORT_BATCH_SIZE:
+each batch is checked for duplicates with two `__in` queries and set
+lookups, its passwords are hashed in a process pool while the previous batch
+is inserted, and users are inserted with bulk_create. Memory stays bounded
+by two batches whatever the size of the input.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from utils.hashers import hash_password, init_hashing_worker
+
+from .models import User, UserManager
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Request content types accepted by UserImportAPIView.
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/jsonl": "jsonl",
+    "application/x-ndjson": "jsonl",
+}
+
+NAME_FIELDS = ("first_name", "last_name")
+
+
+def read_rows(lines, format):
+    """
+    Yield the rows of a CSV or JSONL input as dicts, without reading it all.
+
+    Parameters:
+    lines (iterable): The input as str lines. A CSV input starts with a header.
+    format (str): "csv" or "jsonl".
+
+    Returns:
+    generator: dicts, or None for a JSONL line that is not a JSON object.
+    """
+    if format == "csv":
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield row if isinstance(row, dict) else None
+
+
+def _text(row, name):
+    value = row.get(name)
+    return "" if value is None else str(value).strip()
+
+
+def _clean(row):
+    if row is None:
+        raise ValidationError("Not a JSON object.")
+    email = UserManager.normalize_email(_text(row, "email"))
+    validate_email(email)
+    fields = {"email": email}
+    for name in ("username",) + NAME_FIELDS:
+        fields[name] = _text(row, name)
+        if len(fields[name]) > 150:
+            raise ValidationError("{} is longer than 150 characters.".format(name))
+    if not fields["username"]:
+        raise ValidationError("Username is required.")
+    User.username_validator(fields["username"])
+    password = row.get("password")
+    return fields, str(password) if password not in (None, "") else None
+
+
+class UserImporter:
+    """
+    UserImporter creates users from rows in batches.
+
+    Attributes:
+        batch_size (int): Rows per batch, and per bulk_create.
+        workers (int): Hashing processes; 0 hashes in this process.
+        stats (dict): Numbers of rows read, users created, duplicate and invalid rows and batches.
+        errors (list): Up to USER_IMPORT_MAX_ERRORS {"row", "message"} dicts for rejected rows.
+
+    Methods:
+        - run(rows): Import an iterable of row dicts and return the stats.
+    """
+
+    def __init__(self, batch_size=None, workers=None):
+        self.batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+        if workers is None:
+            workers = settings.USER_IMPORT_WORKERS
+        if workers is None:
+            workers = os.cpu_count()
+        self.workers = workers
+        self.stats = {
+            "rows": 0,
+            "created": 0,
+            "duplicates": 0,
+            "invalid": 0,
+            "batches": 0,
+        }
+        self.errors = []
+
+    def run(self, rows):
+        """
+        Import rows, hashing one batch while inserting the one before.
+
+        Parameters:
+        rows (iterable): Row dicts with email, username and optionally
+            first_name, last_name and password. None counts as an invalid row.
+
+        Returns:
+        dict: The stats.
+        """
+        pool = None
+        if self.workers:
+            # spawn, since forking a threaded server process is unsafe.
+            pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_hashing_worker,
+                initargs=(
+                    settings.PASSWORD_HASHERS,
+                    settings.PASSWORD_PBKDF2_ITERATIONS,
+                ),
+            )
+        try:
+            pending = None
+            for batch in self._batches(rows):
+                users, passwords = self._prepare(batch, pending)
+                if pool:
+                    chunksize = max(1, len(passwords) // (self.workers * 4))
+                    hashes = pool.map(hash_password, passwords, chunksize=chunksize)
+                else:
+                    hashes = map(hash_password, passwords)
+                if pending:
+                    self._insert(*pending)
+                pending = (users, hashes)
+            if pending:
+                self._insert(*pending)
+        finally:
+            if pool:
+                # After a failure this waits for at most the one batch still
+                # hashing; cancel_futures needs Python 3.9.
+                pool.shutdown()
+        return self.stats
+
+    def _batches(self, rows):
+        batch = []
+        for number, row in enumerate(rows, 1):
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _reject(self, number, message, key="invalid"):
+        self.stats[key] += 1
+        if len(self.errors) < settings.USER_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": number, "message": message})
+
+    def _prepare(self, batch, pending):
+        self.stats["rows"] += len(batch)
+        cleaned = []
+        for number, row in batch:
+            try:
+                cleaned.append((number,) + _clean(row))
+            except ValidationError as error:
+                self._reject(number, " ".join(error.messages))
+
+        emails = {fields["email"] for _, fields, _ in cleaned}
+        usernames = {fields["username"] for _, fields, _ in cleaned}
+        # The pending batch is not inserted yet, so it is checked in memory.
+        taken_emails = set(
+            User.objects.filter(email__in=emails).values_list("email", flat=True)
+        )
+        taken_usernames = set(
+            User.objects.filter(username__in=usernames).values_list(
+                "username", flat=True
+            )
+        )
+        for user in pending[0] if pending else ():
+            taken_emails.add(user.email)
+            taken_usernames.add(user.username)
+
+        users, passwords = [], []
+        for number, fields, password in cleaned:
+            if fields["email"] in taken_emails:
+                self._reject(number, "Email Already Exists!", "duplicates")
+            elif fields["username"] in taken_usernames:
+                self._reject(number, "Username Already Exists!", "duplicates")
+            else:
+                taken_emails.add(fields["email"])
+                taken_usernames.add(fields["username"])
+                users.append(User(**fields))
+                passwords.append(password)
+        return users, passwords
+
+    def _insert(self, users, hashes):
+        for user, encoded in zip(users, hashes):
+            user.password = encoded
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.stats["created"] += len(users)
+        self.stats["batches"] += 1
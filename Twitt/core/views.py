@@ -1,21 +1,41 @@
+import codecs
+
 from django.conf import settings
-from django.contrib.auth import authenticate
 from utils.validators import is_valid_uuid
 from utils.exceptions.exceptions import (
+    CommentDoesNotExists,
+    InvalidImportFormatException,
+    InvalidRefreshTokenException,
     InvalidUUIDException,
     MissingFollowerIdException,
     MissingPostIdException,
-    UserDoesNotExists,
-    UserNotAuthenticated,
     PostDoesNotExists,
 )
+from utils.authentication import (
+    CachedJWTAuthentication,
+    VersionedRefreshToken,
+    revoke_tokens,
+)
 from utils.custom_response import APIResponse
+from utils.login import check_login_rate, login_user
+from utils.uploads import limit_concurrent_uploads, stream_image_uploads
+from utils.write_queue import write_queue
 from utils.custom_permissions import (
     CanDeleteComment,
+    CanListPostActivity,
+    CanListUserActivity,
     CanPerformRetrieveOrUpdateOrDelete,
+    IsAdmin,
 )
+from .comments import comment_thread
+from .likes import like_post, unlike_post
+from .purge import delete_comment, delete_post
+from .user_import import IMPORT_CONTENT_TYPES, read_rows
 from .models import Post, User, Like, Comment, Following
 from .serializers import (
+    CommentListSerializer,
+    CommentThreadSerializer,
+    LikerSerializer,
     FollowingSerializer,
     LoginSerializer,
     PostUpdateSerializer,
@@ -31,10 +51,34 @@ from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.settings import api_settings
+
+
+def _refresh_token(request):
+    """
+    Return the refresh token sent in the `refresh` field of a request body.
+
+    A missing token is refused here: given None, simplejwt mints a new,
+    validly signed token instead of decoding one.
+
+    Raises:
+        InvalidRefreshTokenException: If the field is missing, empty, not a string,
+            or the token is malformed or expired.
+    """
+    refresh = request.data.get("refresh")
+    if not refresh or not isinstance(refresh, str):
+        raise InvalidRefreshTokenException(
+            item="Refresh token", message="Refresh token is required."
+        )
+    try:
+        return VersionedRefreshToken(refresh)
+    except TokenError:
+        raise InvalidRefreshTokenException(
+            item="Refresh token", message="Refresh token is invalid or expired."
+        )
 
 
 class UserSignUpAPIView(APIView):
@@ -49,46 +93,28 @@ class UserSignUpAPIView(APIView):
 
     Note:
         The class utilizes the SignUpSerializer for user sign-up data handling and validation.
-        It catches specific exceptions for custom error responses and handles unknown errors with a generic message.
+        Raised exceptions are turned into error responses by utils.exception_handler.api_exception_handler.
     """
 
     serializer_class = SignUpSerializer
 
     def post(self, request):
-        try:
-
-            serializer_obj = self.serializer_class(data=request.data)
-
-            if serializer_obj.is_valid():
-                serializer_obj.save()
-
-                return APIResponse(
-                    data=serializer_obj.data,
-                    message="User created successfully",
-                    status_code=status.HTTP_201_CREATED,
-                )
-            return APIResponse(
-                errors=serializer_obj.errors,
-                status_code=status.HTTP_400_BAD_REQUEST,
-                for_error=True,
-                message="data validation error",
-            )
-        except settings.LAZY_EXCEPTIONS as ce:
+        serializer_obj = self.serializer_class(data=request.data)
 
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
+        if serializer_obj.is_valid():
+            serializer_obj.save()
 
             return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=f"Unknown error occurred in User signup: {ce}",
+                data=serializer_obj.data,
+                message="User created successfully",
+                status_code=status.HTTP_201_CREATED,
             )
+        return APIResponse(
+            errors=serializer_obj.errors,
+            status_code=status.HTTP_400_BAD_REQUEST,
+            for_error=True,
+            message="data validation error",
+        )
 
 
 class UserLoginAPIView(TokenObtainPairView):
@@ -103,6 +129,7 @@ class UserLoginAPIView(TokenObtainPairView):
             It validates the user credentials, authenticates the user, generates a token, and returns a response.
 
     Raises:
+        TooManyLoginAttemptsException: If the email or client made too many recent attempts.
         UserDoesNotExists: If the user with the provided email does not exist.
         UserNotAuthenticated: If the provided email or password is incorrect.
         Exception: If an unknown error occurs during the user login process.
@@ -111,59 +138,23 @@ class UserLoginAPIView(TokenObtainPairView):
     serializer_class = LoginSerializer
 
     def post(self, request, *args, **kwargs):
-        try:
+        serializer_obj = self.serializer_class(data=request.data)
+        if serializer_obj.is_valid():
+            email = serializer_obj.validated_data["email"]
+            password = serializer_obj.validated_data["password"]
 
-            serializer_obj = self.serializer_class(data=request.data)
-            if serializer_obj.is_valid():
-                email = request.data["email"]
-                password = request.data["password"]
-
-                user = User.objects.filter(email=email).first()
-                if not user:
-                    raise UserDoesNotExists(
-                        item="User not Exists",
-                        message=f"User does not exists",
-                    )
-
-                user = authenticate(
-                    request,
-                    username=email,
-                    password=password,
-                )
-
-                if user is None:
-                    raise UserNotAuthenticated(
-                        item="Authentication",
-                        message="Email or password is incorrect.",
-                    )
-                if user:
-                    token = RefreshToken.for_user(user)
-                    token_data = {
-                        "refresh": str(token),
-                        "access": str(token.access_token),
-                    }
-
-                    return APIResponse(
-                        data=token_data,
-                        status_code=status.HTTP_200_OK,
-                        message="User Successfully Logged In",
-                    )
-
-        except settings.LAZY_EXCEPTIONS as ce:
+            check_login_rate(request, email)
+            user = login_user(email, password)
+            token = VersionedRefreshToken.for_user(user)
+            token_data = {
+                "refresh": str(token),
+                "access": str(token.access_token),
+            }
 
             return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
-
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=f"Unknown error occurred in User Login: {ce}",
+                data=token_data,
+                status_code=status.HTTP_200_OK,
+                message="User Successfully Logged In",
             )
 
 
@@ -179,37 +170,84 @@ class UserLogoutAPIView(APIView):
         post(self, request: Request, *args, **kwargs) -> Response: Method to handle POST requests for user logout.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [
         IsAuthenticated,
     ]
 
     def post(self, request: Request, *args, **kwargs) -> Response:
 
-        try:
+        token = _refresh_token(request)
+        token.blacklist()
+        revoke_tokens(request.user)
+        return APIResponse(
+            status_code=status.HTTP_200_OK,
+            message="User Successfully Logged out",
+        )
 
-            refresh_token = request.data.get("refresh")
-            token = RefreshToken(refresh_token)
-            token.blacklist()
-            return APIResponse(
-                status_code=status.HTTP_200_OK,
-                message="User Successfully Logged out",
-            )
 
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
+class UserTokenRefreshAPIView(APIView):
+    """
+    Class representing an API view exchanging a refresh token for a new access token.
 
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
-            )
+    Attributes:
+        authentication_classes (list): Empty, the refresh token in the body is the credential.
+
+    Methods:
+        post(self, request, *args, **kwargs): Returns a new access token for the `refresh`
+            token in the body. Blacklisted tokens are refused; the blacklist is only
+            queried for tokens the in-process filter of utils.blacklist cannot rule out.
+
+    Raises:
+        InvalidRefreshTokenException: If the token is missing, malformed, expired or blacklisted.
+    """
+
+    authentication_classes = []
+
+    def post(self, request, *args, **kwargs):
+        token = _refresh_token(request)
+        return APIResponse(
+            data={"access": str(token.access_token)},
+            status_code=status.HTTP_200_OK,
+            message="Token refreshed",
+        )
+
+
+class UserImportAPIView(APIView):
+    """
+    Class representing an API view for importing users in bulk, for admins.
+
+    Attributes:
+        authentication_classes (list): A list of authentication classes required for this view.
+        permission_classes (list): A list of permission classes required for this view.
+
+    Methods:
+        post(self, request, *args, **kwargs): Streams a `text/csv` (with a header row) or
+            `application/jsonl` body of users through core.user_import and returns
+            the import stats with the rejected rows.
+
+    Raises:
+        InvalidImportFormatException: If the body is neither CSV nor JSONL.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def post(self, request, *args, **kwargs):
+        format = IMPORT_CONTENT_TYPES.get(request.content_type.split(";")[0].strip())
+        if format is None:
+            raise InvalidImportFormatException(
+                item="Import",
+                message="Send users as text/csv or application/jsonl.",
+            )
+        # request.data is never read, so the body streams instead of being parsed.
+        lines = codecs.iterdecode(request.stream or (), "utf-8")
+        importer = User.objects.import_users(read_rows(lines, format))
+        return APIResponse(
+            data={**importer.stats, "errors": importer.errors},
+            status_code=status.HTTP_201_CREATED,
+            message="Users imported",
+        )
 
 
 class PostCreateAPIView(APIView):
@@ -217,59 +255,49 @@ class PostCreateAPIView(APIView):
     PostCreateAPIView class handles the creation of a new Post instance through a POST request.
 
     Attributes:
-        authentication_classes (list): List of authentication classes required for the view (JWTAuthentication).
+        authentication_classes (list): List of authentication classes required for the view (CachedJWTAuthentication).
         permission_classes (list): List of permission classes required for the view (IsAuthenticated).
         serializer_class: The serializer class used for serializing and deserializing Post data (PostSerializer).
         parser_classes (tuple): Tuple of parser classes used for parsing the request data (MultiPartParser, FormParser).
 
     Methods:
+        initial(self, request, *args, **kwargs): Streams the uploaded image into the blob storage.
         post(self, request, *args, **kwargs): Handles POST requests to create a new Post instance.
             - Validates the incoming data using the serializer_class.
             - If data is valid, saves the Post instance with the authenticated user.
             - Returns a success response with the serialized data if successful.
             - Returns an error response with validation errors if data is invalid.
-            - Catches specific exceptions and returns appropriate error responses.
 
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = PostSerializer
     parser_classes = (MultiPartParser, FormParser)
 
+    def initial(self, request, *args, **kwargs):
+        stream_image_uploads(request)
+        super().initial(request, *args, **kwargs)
+
+    @limit_concurrent_uploads
     def post(self, request, *args, **kwargs):
-        try:
-            data = request.data
-            user = request.user
-
-            serializer_obj = self.serializer_class(data=data)
-
-            if serializer_obj.is_valid():
-                serializer_obj.save(user=user)
-                return APIResponse(
-                    data=serializer_obj.data,
-                    message="Post created successfully",
-                    status_code=status.HTTP_201_CREATED,
-                )
-            return APIResponse(
-                errors=serializer_obj.errors,
-                for_error=True,
-                status_code=status.HTTP_406_NOT_ACCEPTABLE,
-            )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
+        data = request.data
+        user = request.user
 
-        except Exception as ce:
+        serializer_obj = self.serializer_class(data=data)
+
+        if serializer_obj.is_valid():
+            serializer_obj.save(user=user)
             return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+                data=serializer_obj.data,
+                message="Post created successfully",
+                status_code=status.HTTP_201_CREATED,
             )
+        return APIResponse(
+            errors=serializer_obj.errors,
+            for_error=True,
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        )
 
 
 class PostUpdateAPIView(APIView):
@@ -283,54 +311,44 @@ class PostUpdateAPIView(APIView):
         parser_classes (tuple): Tuple of parser classes used for parsing the request data.
 
     Methods:
+        initial(request, *args, **kwargs): Streams the uploaded image into the blob storage.
         post(request, *args, **kwargs): Method to handle POST requests for updating a post.
 
     Raises:
         PostDoesNotExists: If the requested post does not exist.
-        settings.LAZY_EXCEPTIONS: If a lazy exception is raised.
         Exception: If any other exception is raised during the request processing.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = PostUpdateSerializer
     parser_classes = (MultiPartParser, FormParser)
 
-    def post(self, request, *args, **kwargs):
-        try:
-            data = request.data
-            post_id = data.get("post_id")
-            post = Post.objects.filter(id=post_id).first()
-            if not post:
-                raise PostDoesNotExists(item="Post", message="Post does not exists.")
-            serializer_obj = self.serializer_class(data=data, instance=post)
-            if serializer_obj.is_valid():
-                serializer_obj.save()
-                return APIResponse(
-                    data=serializer_obj.data,
-                    message="Post updated successfully",
-                    status_code=status.HTTP_200_OK,
-                )
+    def initial(self, request, *args, **kwargs):
+        stream_image_uploads(request)
+        super().initial(request, *args, **kwargs)
 
-            return APIResponse(
-                errors=serializer_obj.errors,
-                for_error=True,
-                status_code=status.HTTP_406_NOT_ACCEPTABLE,
-            )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
+    @limit_concurrent_uploads
+    def post(self, request, *args, **kwargs):
+        data = request.data
+        post_id = data.get("post_id")
+        post = Post.objects.filter(id=post_id).first()
+        if not post:
+            raise PostDoesNotExists(item="Post", message="Post does not exists.")
+        serializer_obj = self.serializer_class(data=data, instance=post)
+        if serializer_obj.is_valid():
+            serializer_obj.save()
+            return APIResponse(
+                data=serializer_obj.data,
+                message="Post updated successfully",
+                status_code=status.HTTP_200_OK,
             )
 
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
-            )
+        return APIResponse(
+            errors=serializer_obj.errors,
+            for_error=True,
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        )
 
 
 class PostRetrieveAPIView(APIView):
@@ -342,7 +360,7 @@ class PostRetrieveAPIView(APIView):
     The serializer used for serializing the Post model data is PostSerializer.
 
     Attributes:
-        authentication_classes (list): A list containing JWTAuthentication class for authentication.
+        authentication_classes (list): A list containing CachedJWTAuthentication class for authentication.
         permission_classes (list): A list containing IsAuthenticated and CanPerformRetrieveOrUpdateOrDelete classes for permission.
         serializer_class (class): The serializer class used for serializing Post model data.
 
@@ -351,46 +369,30 @@ class PostRetrieveAPIView(APIView):
             It retrieves the post_id from query parameters, fetches the post object from the database, and serializes the data.
             If the post does not exist, it raises a PostDoesNotExists exception.
             Returns an APIResponse with the serialized data and a success message if successful.
-            If any exception is raised, it returns an appropriate APIResponse with error details.
+            Raised exceptions are turned into error responses by the project exception handler.
 
     Exceptions:
         PostDoesNotExists: Raised when the requested post does not exist in the database.
 
     Raises:
-        Any exception that occurs during the GET request handling process will be caught and appropriate error response will be returned.
+        Any exception raised while handling the GET request is turned into an error response by the project exception handler.
 
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, CanPerformRetrieveOrUpdateOrDelete]
     serializer_class = PostSerializer
 
     def get(self, request, *args, **kwargs):
-        try:
-            post_id = request.query_params.get("post_id")
-            post = Post.objects.filter(id=post_id).first()
-            if not post:
-                raise PostDoesNotExists(item="Post", message="Post does not exists.")
+        post_id = request.query_params.get("post_id")
+        post = Post.objects.filter(id=post_id).first()
+        if not post:
+            raise PostDoesNotExists(item="Post", message="Post does not exists.")
 
-            serializer = self.serializer_class(post)
-            return APIResponse(
-                data=serializer.data, message="success", status_code=status.HTTP_200_OK
-            )
-
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
-            )
+        serializer = self.serializer_class(post)
+        return APIResponse(
+            data=serializer.data, message="success", status_code=status.HTTP_200_OK
+        )
 
 
 class PostDeleteAPIView(APIView):
@@ -400,7 +402,7 @@ class PostDeleteAPIView(APIView):
     This class defines an API view for deleting a post. It requires JWT authentication for access and permission from the user to retrieve, update, or delete the post. The 'delete' method handles the deletion process by first checking the validity of the post ID and then deleting the post if it exists. It raises specific exceptions for missing post ID, invalid post ID, and non-existing post. It returns a custom API response indicating the success or failure of the deletion operation.
 
     Attributes:
-        authentication_classes (list): A list of authentication classes, in this case, JWTAuthentication.
+        authentication_classes (list): A list of authentication classes, in this case, CachedJWTAuthentication.
         permission_classes (list): A list of permission classes, including IsAuthenticated and CanPerformRetrieveOrUpdateOrDelete.
 
     Methods:
@@ -415,43 +417,27 @@ class PostDeleteAPIView(APIView):
         APIResponse: A custom response indicating the success or failure of the post deletion operation.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, CanPerformRetrieveOrUpdateOrDelete]
 
     def delete(self, request):
-        try:
-            post_id = request.query_params.get("post_id")
-            if not post_id:
-                raise MissingPostIdException(
-                    item="Post Id", message="Please enter post id."
-                )
-            if not is_valid_uuid(post_id):
-                raise InvalidUUIDException(
-                    item="Invalid Post Id", message="Post Id is not a valid UUID"
-                )
-            post = Post.objects.filter(id=post_id).first()
-            if not post:
-                raise PostDoesNotExists(item="Post", message="Post does not exists.")
-            post.delete()
-            return APIResponse(
-                message="Post Deleted Successfully",
-                status_code=status.HTTP_200_OK,
+        post_id = request.query_params.get("post_id")
+        if not post_id:
+            raise MissingPostIdException(
+                item="Post Id", message="Please enter post id."
             )
-
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+        if not is_valid_uuid(post_id):
+            raise InvalidUUIDException(
+                item="Invalid Post Id", message="Post Id is not a valid UUID"
             )
+        post = Post.objects.filter(id=post_id).first()
+        if not post:
+            raise PostDoesNotExists(item="Post", message="Post does not exists.")
+        delete_post(post)
+        return APIResponse(
+            message="Post Deleted Successfully",
+            status_code=status.HTTP_200_OK,
+        )
 
 
 class LikeAPIView(APIView):
@@ -472,57 +458,38 @@ class LikeAPIView(APIView):
         PostDoesNotExists: If the post with the given post_id does not exist.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = LikeSerializer
 
     def post(self, request):
 
-        try:
-            post_id = request.data.get("post_id")
-            if not post_id:
-                raise MissingPostIdException(
-                    item="Post Id", message="Please enter post id."
-                )
-            if not is_valid_uuid(post_id):
-                raise InvalidUUIDException(
-                    item="Invalid Post Id", message="Post Id is not a valid UUID"
-                )
-            post = Post.objects.filter(id=post_id).first()
-
-            if not post:
-                raise PostDoesNotExists(item="Post", message="Post does not exists.")
-
-            already_liked = Like.objects.filter(user=request.user, post=post).exists()
-            if not already_liked:
-                like = Like.objects.create(user=request.user, post=post)
-                post.no_of_likes += 1
-                post.save()
-                serializer = self.serializer_class(like)
-                return APIResponse(
-                    data=serializer.data,
-                    message="Liked Post Successfully",
-                    status_code=status.HTTP_201_CREATED,
-                )
-            return APIResponse(
-                message="Already Liked Post",
-                status_code=status.HTTP_200_OK,
+        post_id = request.data.get("post_id")
+        if not post_id:
+            raise MissingPostIdException(
+                item="Post Id", message="Please enter post id."
             )
-
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
+        if not is_valid_uuid(post_id):
+            raise InvalidUUIDException(
+                item="Invalid Post Id", message="Post Id is not a valid UUID"
             )
+        post = Post.objects.filter(id=post_id).first()
+
+        if not post:
+            raise PostDoesNotExists(item="Post", message="Post does not exists.")
 
-        except Exception as ce:
+        like = write_queue.run(like_post, request.user, post)
+        if like:
+            serializer = self.serializer_class(like)
             return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+                data=serializer.data,
+                message="Liked Post Successfully",
+                status_code=status.HTTP_201_CREATED,
             )
+        return APIResponse(
+            message="Already Liked Post",
+            status_code=status.HTTP_200_OK,
+        )
 
 
 class DisLikeAPIView(APIView):
@@ -534,7 +501,7 @@ class DisLikeAPIView(APIView):
         permission_classes (list): List of permission classes required for this view.
 
     Methods:
-        post(self, request, *args, **kwargs): Method to handle POST requests for disliking a post. It checks for valid post_id, if the post exists, and if the user has already liked the post. It then removes the like and returns a success response. Handles exceptions and returns appropriate APIResponse.
+        post(self, request, *args, **kwargs): Method to handle POST requests for disliking a post. It checks for valid post_id, if the post exists, and if the user has already liked the post. It then removes the like and returns a success response.
 
     Raises:
         MissingPostIdException: If the post_id is missing in the request data.
@@ -542,51 +509,33 @@ class DisLikeAPIView(APIView):
         PostDoesNotExists: If the post with the given post_id does not exist.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        try:
-            post_id = request.data.get("post_id")
-            if not post_id:
-                raise MissingPostIdException(
-                    item="Post Id", message="Please enter post id."
-                )
-            if not is_valid_uuid(post_id):
-                raise InvalidUUIDException(
-                    item="Invalid Post Id", message="Post Id is not a valid UUID"
-                )
-            post = Post.objects.filter(id=post_id).first()
-
-            if not post:
-                raise PostDoesNotExists(item="Post", message="Post does not exists.")
-
-            like = Like.objects.filter(user=request.user, post=post).first()
-
-            if not like:
-                return APIResponse(
-                    message="you have not liked post earlier or already disliked the post.",
-                    status_code=status.HTTP_200_OK,
-                )
-            like.delete()
-            return APIResponse(
-                message="Disliked Post Successfully",
-                status_code=status.HTTP_200_OK,
+        post_id = request.data.get("post_id")
+        if not post_id:
+            raise MissingPostIdException(
+                item="Post Id", message="Please enter post id."
             )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
+        if not is_valid_uuid(post_id):
+            raise InvalidUUIDException(
+                item="Invalid Post Id", message="Post Id is not a valid UUID"
             )
+        post = Post.objects.filter(id=post_id).first()
+
+        if not post:
+            raise PostDoesNotExists(item="Post", message="Post does not exists.")
 
-        except Exception as ce:
+        if not write_queue.run(unlike_post, request.user, post):
             return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+                message="you have not liked post earlier or already disliked the post.",
+                status_code=status.HTTP_200_OK,
             )
+        return APIResponse(
+            message="Disliked Post Successfully",
+            status_code=status.HTTP_200_OK,
+        )
 
 
 class CreateCommentAPIView(APIView):
@@ -606,49 +555,34 @@ class CreateCommentAPIView(APIView):
         Exception: If an unexpected exception occurs during the request processing.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = CommentSerializer
 
     def post(self, request):
-        try:
-            serializer_obj = self.serializer_class(
-                data=request.data, context={"user": request.user}
-            )
+        serializer_obj = self.serializer_class(
+            data=request.data, context={"user": request.user}
+        )
 
-            if serializer_obj.is_valid():
-                serializer_obj.save()
-                return APIResponse(
-                    data=serializer_obj.data,
-                    status_code=status.HTTP_201_CREATED,
-                    message="Comment created successfully",
-                )
+        if serializer_obj.is_valid():
+            write_queue.run(serializer_obj.save)
             return APIResponse(
-                errors=serializer_obj.errors,
-                for_error=True,
-                status_code=status.HTTP_406_NOT_ACCEPTABLE,
-            )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+                data=serializer_obj.data,
+                status_code=status.HTTP_201_CREATED,
+                message="Comment created successfully",
             )
+        return APIResponse(
+            errors=serializer_obj.errors,
+            for_error=True,
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        )
 
 
 class DeleteCommentAPIView(APIView):
     """
     This class defines an API view for deleting a comment. It inherits from the APIView class provided by Django REST framework.
     The class has the following attributes:
-        - authentication_classes: List containing JWTAuthentication for authenticating the user.
+        - authentication_classes: List containing CachedJWTAuthentication for authenticating the user.
         - permission_classes: List containing IsAuthenticated and CanDeleteComment for permission control.
 
     The class has a delete method that handles the DELETE request to delete a comment. It performs the following actions:
@@ -656,43 +590,27 @@ class DeleteCommentAPIView(APIView):
         - Queries the Comment model to find the comment with the given comment_id.
         - If the comment exists, deletes the comment and returns a success response using the APIResponse class.
         - If the comment does not exist, returns an error response indicating that the comment was not found.
-        - Handles exceptions by returning appropriate error responses.
 
     This class provides functionality to delete a comment based on the comment_id provided in the request data.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated, CanDeleteComment]
 
     def delete(self, request):
-        try:
-            comment_id = request.data.get("comment_id")
-            comment = Comment.objects.filter(id=comment_id).first()
-            if comment:
-                comment.delete()
-                return APIResponse(
-                    message="Comment deleted successfully",
-                    status_code=status.HTTP_200_OK,
-                )
+        comment_id = request.data.get("comment_id")
+        comment = Comment.objects.filter(id=comment_id).first()
+        if comment:
+            delete_comment(comment)
             return APIResponse(
-                for_error=True,
-                message="Comment not found.",
+                message="Comment deleted successfully",
                 status_code=status.HTTP_200_OK,
             )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
-            )
+        return APIResponse(
+            for_error=True,
+            message="Comment not found.",
+            status_code=status.HTTP_200_OK,
+        )
 
 
 class CreateReplyCommentAPIView(APIView):
@@ -708,41 +626,26 @@ class CreateReplyCommentAPIView(APIView):
         post(self, request): Method to handle POST requests for creating a reply comment.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = ReplyCommentSerializer
 
     def post(self, request):
-        try:
-            serializer_obj = self.serializer_class(
-                data=request.data, context={"user": request.user}
-            )
-            if serializer_obj.is_valid():
-                serializer_obj.save()
-                return APIResponse(
-                    data=serializer_obj.data,
-                    message="Reply comment created successfully",
-                    status_code=status.HTTP_201_CREATED,
-                )
-            return APIResponse(
-                errors=serializer_obj.errors,
-                for_error=True,
-                status_code=status.HTTP_406_NOT_ACCEPTABLE,
-            )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
-
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+        serializer_obj = self.serializer_class(
+            data=request.data, context={"user": request.user}
+        )
+        if serializer_obj.is_valid():
+            write_queue.run(serializer_obj.save)
+            return APIResponse(
+                data=serializer_obj.data,
+                message="Reply comment created successfully",
+                status_code=status.HTTP_201_CREATED,
             )
+        return APIResponse(
+            errors=serializer_obj.errors,
+            for_error=True,
+            status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        )
 
 
 class CreateFollowerAPIView(APIView):
@@ -752,7 +655,7 @@ class CreateFollowerAPIView(APIView):
     This class defines an API view for creating a follower relationship between users. It handles the POST method to create a new follower relationship. The user must be authenticated using JWT authentication to access this view.
 
     Attributes:
-        authentication_classes (list): List of authentication classes, JWTAuthentication in this case.
+        authentication_classes (list): List of authentication classes, CachedJWTAuthentication in this case.
         permission_classes (list): List of permission classes, IsAuthenticated in this case.
         serializer_class: The serializer class used for serializing the data, FollowingSerializer in this case.
 
@@ -762,7 +665,6 @@ class CreateFollowerAPIView(APIView):
     Exceptions:
         - MissingFollowerIdException: Raised when the follower_id is missing in the request data.
         - InvalidUUIDException: Raised when the follower_id is not a valid UUID.
-        - settings.LAZY_EXCEPTIONS: Lazy exception handling for custom exceptions defined in settings.
         - Exception: Generic exception handling for internal server errors.
 
     Note:
@@ -774,7 +676,7 @@ class CreateFollowerAPIView(APIView):
     Dependencies:
         - Django: Django framework for web development.
         - Django REST framework: Django REST framework for building APIs.
-        - JWTAuthentication: Token-based authentication using JSON Web Tokens.
+        - CachedJWTAuthentication: Token-based authentication using JSON Web Tokens.
         - FollowingSerializer: Serializer class for the Following model.
 
     Usage:
@@ -782,55 +684,41 @@ class CreateFollowerAPIView(APIView):
 
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = FollowingSerializer
 
     def post(self, request):
 
-        try:
-            follower_id = request.data.get("follower_id")
-            if not follower_id:
-                raise MissingFollowerIdException(
-                    item="Follower Id", message="Please enter follower id."
-                )
-            if not is_valid_uuid(follower_id):
-                raise InvalidUUIDException(
-                    item="Invalid follower Id",
-                    message="follower Id is not a valid UUID",
-                )
-            already_followed = Following.objects.filter(
-                target=request.user, follower__id=follower_id
-            ).exists()
-
-            if already_followed:
-                return APIResponse(
-                    message="Already followed", status_code=status.HTTP_200_OK
-                )
-            follower = User.objects.get(id=follower_id)
-
-            following = Following.objects.create(target=request.user, follower=follower)
-            serializer = self.serializer_class(following)
-            return APIResponse(
-                data=serializer.data,
-                message=f"Successfully followed {follower.username}",
-                status_code=status.HTTP_201_CREATED,
+        follower_id = request.data.get("follower_id")
+        if not follower_id:
+            raise MissingFollowerIdException(
+                item="Follower Id", message="Please enter follower id."
             )
-
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
+        if not is_valid_uuid(follower_id):
+            raise InvalidUUIDException(
+                item="Invalid follower Id",
+                message="follower Id is not a valid UUID",
             )
+        already_followed = Following.objects.filter(
+            target=request.user, follower__id=follower_id
+        ).exists()
 
-        except Exception as ce:
+        if already_followed:
             return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
+                message="Already followed", status_code=status.HTTP_200_OK
             )
+        follower = User.objects.get(id=follower_id)
+
+        following, _ = write_queue.run(
+            Following.objects.get_or_create, target=request.user, follower=follower
+        )
+        serializer = self.serializer_class(following)
+        return APIResponse(
+            data=serializer.data,
+            message=f"Successfully followed {follower.username}",
+            status_code=status.HTTP_201_CREATED,
+        )
 
 
 class RemoveFollowerAPIView(APIView):
@@ -852,75 +740,268 @@ class RemoveFollowerAPIView(APIView):
     Raises:
         MissingFollowerIdException: When both follower_id and following_id are missing in the request data.
         InvalidUUIDException: When the provided follower_id or following_id is not a valid UUID.
-        Any other exception: Handles any other unexpected exceptions and returns a generic error response.
+        Any other exception: Turned into a generic error response by the project exception handler.
 
     Note:
         This view requires the user to be authenticated and provides a custom response format for success and failure events.
     """
 
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = FollowingSerializer
 
     def post(self, request):
 
-        try:
-            follower_id = request.data.get("follower_id")
-            following_id = request.data.get("following_id")
-            if not (follower_id or following_id):
-                raise MissingFollowerIdException(
-                    item="Follower Id",
-                    message="Please Provide follower id or Following id",
-                )
-            if follower_id and not is_valid_uuid(follower_id):
-                raise InvalidUUIDException(
-                    item="Invalid follower Id", message="Post Id is not a valid UUID"
-                )
-
-            if following_id and not is_valid_uuid(following_id):
-                raise InvalidUUIDException(
-                    item="Invalid following Id",
-                    message="following Id is not a valid UUID",
-                )
-            follower_name = None
-            serializer = None
-            data = None
-            if following_id:
-                following = Following.objects.get(id=following_id)
+        follower_id = request.data.get("follower_id")
+        following_id = request.data.get("following_id")
+        if not (follower_id or following_id):
+            raise MissingFollowerIdException(
+                item="Follower Id",
+                message="Please Provide follower id or Following id",
+            )
+        if follower_id and not is_valid_uuid(follower_id):
+            raise InvalidUUIDException(
+                item="Invalid follower Id", message="Post Id is not a valid UUID"
+            )
+
+        if following_id and not is_valid_uuid(following_id):
+            raise InvalidUUIDException(
+                item="Invalid following Id",
+                message="following Id is not a valid UUID",
+            )
+        follower_name = None
+        serializer = None
+        data = None
+        if following_id:
+            following = Following.objects.get(id=following_id)
+            follower_name = following.follower.username
+            serializer = self.serializer_class(following)
+            write_queue.run(following.delete)
+
+        if follower_id:
+            following = Following.objects.filter(
+                target=request.user, follower__id=follower_id
+            ).first()
+            if following:
                 follower_name = following.follower.username
                 serializer = self.serializer_class(following)
-                following.delete()
-
-            if follower_id:
-                following = Following.objects.filter(
-                    target=request.user, follower__id=follower_id
-                ).first()
-                if following:
-                    follower_name = following.follower.username
-                    serializer = self.serializer_class(following)
-                    following.delete()
-            if serializer is not None:
-                data = serializer.data
-                return APIResponse(
-                    data=data,
-                    message=f"Successfully unfollowed { follower_name }",
-                    status_code=status.HTTP_200_OK,
-                )
+                write_queue.run(following.delete)
+        if serializer is not None:
+            data = serializer.data
             return APIResponse(
-                message="Already unfollowed.",
+                data=data,
+                message=f"Successfully unfollowed { follower_name }",
                 status_code=status.HTTP_200_OK,
             )
-        except settings.LAZY_EXCEPTIONS as ce:
-            return APIResponse(
-                status_code=ce.status_code,
-                errors=ce.error_data(),
-                message=ce.message,
-                for_error=True,
-            )
+        return APIResponse(
+            message="Already unfollowed.",
+            status_code=status.HTTP_200_OK,
+        )
 
-        except Exception as ce:
-            return APIResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                for_error=True,
-                message=str(ce),
-            )
+
+class KeysetListAPIView(APIView):
+    """
+    Base class for list endpoints paged with opaque (created_at, id) cursors.
+
+    Attributes:
+        authentication_classes (list): List of authentication classes required for this view.
+        permission_classes (list): List of permission classes required for this view.
+        skip_user_lookup (bool): Authenticate GET requests from the token alone, see
+            CachedJWTAuthentication; set by the lists of a post's comments and likes.
+        pagination_class (class): The keyset pagination class from REST_FRAMEWORK settings.
+        queryset (QuerySet): The rows subclasses list, filtered by get_queryset.
+        serializer_class (Serializer): Serializer class used for each row of the page.
+
+    Methods:
+        get_queryset(request): Returns the unordered queryset to list, `queryset` by default.
+        get(request): Returns one page and the cursor of the next one, read with the
+            `cursor` and `page_size` query parameters.
+    """
+
+    authentication_classes = [CachedJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    skip_user_lookup = False
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    queryset = None
+    serializer_class = None
+
+    def get_queryset(self, request):
+        assert self.queryset is not None, (
+            "'%s' should either include a `queryset` attribute, "
+            "or override the `get_queryset()` method." % self.__class__.__name__
+        )
+        return self.queryset.all()
+
+    def get(self, request):
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(self.get_queryset(request), request, self)
+        serializer = self.serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def get_uuid_param(self, request, name, exception):
+        value = request.query_params.get(name)
+        if not value:
+            raise exception(item=name, message=f"Please enter {name}.")
+        if not is_valid_uuid(value):
+            raise InvalidUUIDException(item=name, message=f"{name} is not a valid UUID")
+        return value
+
+    def get_user_id(self, request):
+        user_id = request.query_params.get("user_id")
+        if not user_id:
+            return request.user.id
+        if not is_valid_uuid(user_id):
+            raise InvalidUUIDException(
+                item="Invalid User Id", message="User Id is not a valid UUID"
+            )
+        return user_id
+
+
+class UserPostListAPIView(KeysetListAPIView):
+    """
+    Lists the posts of a user, newest first.
+
+    Query parameters:
+        user_id (UUID): The author, defaults to the authenticated user; other
+            users are for admins only.
+        cursor (str): The cursor returned with the previous page.
+    """
+
+    permission_classes = [IsAuthenticated, CanListUserActivity]
+    queryset = Post.objects.all()
+    serializer_class = PostSerializer
+
+    def get_queryset(self, request):
+        user_id = self.get_user_id(request)
+        return super().get_queryset(request).filter(user_id=user_id)
+
+
+class PostCommentListAPIView(KeysetListAPIView):
+    """
+    Lists the comments of a post, newest first.
+
+    Query parameters:
+        post_id (UUID): The post, of the authenticated user unless they are an admin.
+        cursor (str): The cursor returned with the previous page.
+    """
+
+    permission_classes = [IsAuthenticated, CanListPostActivity]
+    skip_user_lookup = True
+    queryset = Comment.objects.select_related("user")
+    serializer_class = CommentListSerializer
+
+    def get_queryset(self, request):
+        post_id = self.get_uuid_param(request, "post_id", MissingPostIdException)
+        return super().get_queryset(request).filter(post_id=post_id)
+
+
+class PostCommentThreadAPIView(KeysetListAPIView):
+    """
+    Lists the comments of a post as a tree, in creation order, in one query.
+
+    A page holds `page_size` comments of one level with `depth` levels of
+    replies nested below each, at most `replies` per comment. Every comment
+    carries its depth and reply counts, and `replies_cursor` when more
+    replies follow; pass its id as `root` with that cursor to page them.
+
+    Query parameters:
+        post_id (UUID): The post, of the authenticated user unless they are an admin.
+        root (UUID): A comment whose replies are paged; it is returned with
+            the page nested under it. Top-level comments are paged without it.
+        cursor (str): The cursor returned with the previous page of the level.
+        page_size (int): Comments on the paged level.
+        depth (int): Levels of replies nested below them.
+        replies (int): Replies per comment below them.
+    """
+
+    permission_classes = [IsAuthenticated, CanListPostActivity]
+    skip_user_lookup = True
+    serializer_class = CommentThreadSerializer
+
+    def get(self, request):
+        post_id = self.get_uuid_param(request, "post_id", MissingPostIdException)
+        root_id = request.query_params.get("root")
+        if root_id and not is_valid_uuid(root_id):
+            raise InvalidUUIDException(item="root", message="root is not a valid UUID")
+        comments, next_cursor = comment_thread(
+            post_id,
+            root_id=root_id,
+            cursor=request.query_params.get("cursor"),
+            limit=self.get_int_param(request, "page_size", 1, 100),
+            depth=self.get_int_param(
+                request, "depth", 0, settings.COMMENT_THREAD_MAX_DEPTH
+            ),
+            replies=self.get_int_param(request, "replies", 1, 100),
+        )
+        if root_id and not comments:
+            raise CommentDoesNotExists(
+                item="Comment", message="comment does not exists"
+            )
+        serializer = self.serializer_class(comments, many=True)
+        return APIResponse(
+            data={"results": serializer.data, "next_cursor": next_cursor}
+        )
+
+    def get_int_param(self, request, name, minimum, maximum):
+        try:
+            value = int(request.query_params[name])
+        except (KeyError, ValueError):
+            return None
+        return max(minimum, min(value, maximum))
+
+
+class PostLikerListAPIView(KeysetListAPIView):
+    """
+    Lists the users who liked a post, most recent like first.
+
+    Query parameters:
+        post_id (UUID): The post, of the authenticated user unless they are an admin.
+        cursor (str): The cursor returned with the previous page.
+    """
+
+    permission_classes = [IsAuthenticated, CanListPostActivity]
+    skip_user_lookup = True
+    queryset = Like.objects.select_related("user")
+    serializer_class = LikerSerializer
+
+    def get_queryset(self, request):
+        post_id = self.get_uuid_param(request, "post_id", MissingPostIdException)
+        return super().get_queryset(request).filter(post_id=post_id)
+
+
+class FollowerListAPIView(KeysetListAPIView):
+    """
+    Lists the followers of a user, most recent first.
+
+    Query parameters:
+        user_id (UUID): The followed user, defaults to the authenticated user;
+            other users are for admins only.
+        cursor (str): The cursor returned with the previous page.
+    """
+
+    permission_classes = [IsAuthenticated, CanListUserActivity]
+    queryset = Following.objects.select_related("target", "follower")
+    serializer_class = FollowingSerializer
+
+    def get_queryset(self, request):
+        user_id = self.get_user_id(request)
+        return super().get_queryset(request).filter(target_id=user_id)
+
+
+class FollowingListAPIView(KeysetListAPIView):
+    """
+    Lists the accounts a user follows, most recent first.
+
+    Query parameters:
+        user_id (UUID): The following user, defaults to the authenticated user;
+            other users are for admins only.
+        cursor (str): The cursor returned with the previous page.
+    """
+
+    permission_classes = [IsAuthenticated, CanListUserActivity]
+    queryset = Following.objects.select_related("target", "follower")
+    serializer_class = FollowingSerializer
+
+    def get_queryset(self, request):
+        user_id = self.get_user_id(request)
+        return super().get_queryset(request).filter(follower_id=user_id)
@@ -0,0 +1,222 @@
+"""
+Module containing the cached JWT authentication used by the API views.
+
+simplejwt's JWTAuthentication loads the User row on every request, which is
+most of the database work of feed and like traffic. CachedJWTAuthentication
+keeps recently authenticated users in a per-process LRU cache keyed by user
+id and token version, so a cache hit costs no query. Saving or deleting a
+user evicts their entry (see the receivers in core.models), and logging out
+bumps User.token_version so tokens issued before are refused. Other
+processes notice such changes within AUTH_USER_CACHE_TTL seconds. The new
+version is also kept in the default cache until older access tokens
+expire, for views authenticating without loading the user. Only a shared
+cache (Redis, Memcached, database) carries it to other processes, so those
+views load the user as usual while the default cache is process-local.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+    TokenError,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from utils.blacklist import blacklist_filter
+
+TOKEN_VERSION_CLAIM = "ver"
+TOKEN_VERSION_CACHE_KEY = "token_version:{}"
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+class VersionedRefreshToken(RefreshToken):
+    """
+    VersionedRefreshToken is a refresh token carrying the token version of its user.
+
+    The claim is copied into the access tokens made from it. Blacklist checks
+    go through utils.blacklist, which only queries for tokens that may be
+    blacklisted.
+
+    Methods:
+        - for_user(user): Return a token for user with the version claim set.
+        - check_blacklist(): Raise TokenError if the token is blacklisted.
+        - blacklist(): Blacklist the token and record it in the filter.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+    def check_blacklist(self):
+        if blacklist_filter.is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
+
+
+class UserCache:
+    """
+    UserCache is a thread-safe LRU cache of users with a time to live.
+
+    One entry is kept per user, holding the token version it was loaded for.
+    A lookup only hits when the version matches.
+
+    Attributes:
+        entries (OrderedDict): User id to (version, user, expiry), least recently used first.
+        generation (int): Incremented on every invalidation, so loads racing one are not stored.
+        stats (dict): Running totals of hits, misses and evictions.
+
+    Methods:
+        - get(user_id, version): Return the cached user, or None.
+        - set(user_id, version, user, generation): Store a user loaded at the given generation.
+        - invalidate(user_id): Drop the entry of a user.
+        - clear(): Drop every entry.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[0] != version or entry[2] < now:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry[1]
+
+    def set(self, user_id, version, user, generation):
+        expiry = time.monotonic() + settings.AUTH_USER_CACHE_TTL
+        with self._lock:
+            if generation != self.generation:
+                return
+            self.entries[user_id] = (version, user, expiry)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > settings.AUTH_USER_CACHE_SIZE:
+                self.entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self.generation += 1
+            self.entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+def revocations_shared():
+    """
+    Return whether the default cache carries revoke_tokens to every process.
+
+    Returns:
+    bool: False for the process-local LocMemCache (Django's default) and DummyCache.
+    """
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+def revoke_tokens(user):
+    """
+    Refuse every token issued to a user so far and evict them from the cache.
+
+    Parameters:
+    user (User): The user logging out.
+    """
+    users = get_user_model().objects.filter(pk=user.pk)
+    users.update(token_version=F("token_version") + 1)
+    user_cache.invalidate(user.pk)
+    cache.set(
+        TOKEN_VERSION_CACHE_KEY.format(user.pk),
+        users.values_list("token_version", flat=True).first(),
+        api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(),
+    )
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    CachedJWTAuthentication authenticates JWTs against the per-process user cache.
+
+    Views setting `skip_user_lookup = True` accept, for GET, HEAD and
+    OPTIONS requests missing the cache, a TokenUser built from the token
+    claims instead of loading the user. Such views may only use
+    request.user.id. Tokens older than the version revoke_tokens left in
+    the default cache are refused there; deactivation only reaches such
+    views once the token expires. The shortcut is off unless the default
+    cache is shared between processes (see revocations_shared), since a
+    logout in one process would not reach the others.
+
+    Methods:
+        - authenticate(request): Return (user, token) for a request carrying a valid token.
+        - get_user(validated_token): Return the user of a token from the cache or the database.
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        stateless = (
+            getattr(view, "skip_user_lookup", False)
+            and request.method in SAFE_METHODS
+            and revocations_shared()
+        )
+        return self.get_user(validated_token, stateless), validated_token
+
+    def get_user(self, validated_token, stateless=False):
+        try:
+            user_id = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+
+        user = user_cache.get(user_id, version)
+        if user is not None:
+            return copy.copy(user)
+        if stateless:
+            revoked = cache.get(TOKEN_VERSION_CACHE_KEY.format(user_id))
+            if revoked is not None and version < revoked:
+                raise AuthenticationFailed(
+                    "Token has been revoked.", code="token_revoked"
+                )
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        generation = user_cache.generation
+        user = super().get_user(validated_token)
+        if user.token_version != version:
+            raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+        user_cache.set(user_id, version, user, generation)
+        return copy.copy(user)
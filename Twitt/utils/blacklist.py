@@ -0,0 +1,274 @@
+"""
+Module containing the in-process accelerator of the refresh token blacklist.
+
+simplejwt checks every refresh token against BlacklistedToken with a query,
+although nearly all tokens presented were never blacklisted. BlacklistFilter
+mirrors the blacklisted token ids in a bloom filter: a miss means "definitely
+not revoked" and skips the query, a hit is confirmed against the database.
+New rows are loaded incrementally by primary key, at most every
+TOKEN_BLACKLIST_FILTER_REFRESH seconds, so a token blacklisted by another
+process may be accepted here for that long. compact_expired_tokens removes
+expired rows, which no longer verify anyway, in batches.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+BATCH_SIZE = 5000
+
+
+class BloomFilter:
+    """
+    BloomFilter is a fixed-size set of strings answering "no" or "probably".
+
+    Attributes:
+        capacity (int): The number of items the filter was sized for.
+        size (int): The number of bits.
+        hashes (int): The number of bits set per item.
+        count (int): The number of items added.
+
+    Methods:
+        - add(item): Add a string.
+        - __contains__(item): Return False if item was never added, True if it probably was.
+        - error_rate(): Return the expected false positive rate at the current count.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = self.capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def error_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class BlacklistFilter:
+    """
+    BlacklistFilter answers whether a refresh token may be blacklisted without querying.
+
+    Attributes:
+        bloom (BloomFilter): The blacklisted token ids loaded so far.
+        last_id (int): The highest BlacklistedToken id loaded.
+        stats (dict): Running totals of lookups, lookups answered without a
+            query, false positives and rows loaded.
+
+    Methods:
+        - might_contain(jti): Return False when jti is certainly not blacklisted.
+        - is_blacklisted(jti): Return whether jti is blacklisted, querying only on a filter hit.
+        - add(jti): Record a token this process just blacklisted.
+        - rebuild(): Reload every blacklisted token id into a new filter.
+        - metrics(): Return the stats with the filter size and expected error rate.
+    """
+
+    def __init__(self):
+        self.bloom = None
+        self.last_id = 0
+        self.synced_at = 0.0
+        self.stats = {"lookups": 0, "skipped": 0, "false_positives": 0, "loaded": 0}
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        if self.bloom is None:
+            with self._lock:
+                # Threads that queued on the lock behind the first rebuild
+                # find the filter already built.
+                if self.bloom is None:
+                    self._rebuild()
+            return
+        if time.monotonic() - self.synced_at < settings.TOKEN_BLACKLIST_FILTER_REFRESH:
+            return
+        with self._lock:
+            self.synced_at = time.monotonic()
+            rows = BlacklistedToken.objects.filter(id__gt=self.last_id).order_by("id")
+            self.last_id = self._load(
+                self.bloom, rows.values_list("id", "token__jti"), self.last_id
+            )
+            if self.bloom.count > self.bloom.capacity:
+                # Past its capacity the error rate climbs; compaction has
+                # usually removed enough rows to start over.
+                self._rebuild()
+
+    def _load(self, bloom, rows, last_id):
+        for pk, jti in rows.iterator(chunk_size=BATCH_SIZE):
+            bloom.add(jti)
+            last_id = max(last_id, pk)
+            self.stats["loaded"] += 1
+        return last_id
+
+    def _rebuild(self):
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        bloom = BloomFilter(
+            max(
+                settings.TOKEN_BLACKLIST_FILTER_CAPACITY,
+                BlacklistedToken.objects.count() * 2,
+            ),
+            settings.TOKEN_BLACKLIST_FILTER_ERROR_RATE,
+        )
+        last_id = self._load(
+            bloom, BlacklistedToken.objects.values_list("id", "token__jti"), 0
+        )
+        # Readers keep using the old filter until the new one is complete;
+        # a partial filter would pass revoked tokens.
+        self.bloom, self.last_id = bloom, last_id
+        self.synced_at = time.monotonic()
+
+    def rebuild(self):
+        """
+        Reload every blacklisted token id into a new filter.
+        """
+        with self._lock:
+            self._rebuild()
+
+    def might_contain(self, jti):
+        """
+        Return False when a token is certainly not blacklisted.
+
+        Parameters:
+        jti (str): The id claim of the token.
+
+        Returns:
+        bool: True when the database has to be asked.
+        """
+        self._sync()
+        self.stats["lookups"] += 1
+        if jti in self.bloom:
+            return True
+        self.stats["skipped"] += 1
+        return False
+
+    def is_blacklisted(self, jti):
+        """
+        Return whether a token is blacklisted, querying only when the filter says it may be.
+
+        Parameters:
+        jti (str): The id claim of the token.
+
+        Returns:
+        bool: Whether the token is blacklisted.
+        """
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        if not self.might_contain(jti):
+            return False
+        if BlacklistedToken.objects.filter(token__jti=jti).exists():
+            return True
+        self.stats["false_positives"] += 1
+        return False
+
+    def add(self, jti):
+        """
+        Record a token this process just blacklisted, without waiting for the next sync.
+
+        Parameters:
+        jti (str): The id claim of the token.
+        """
+        if self.bloom is not None:
+            self.bloom.add(jti)
+
+    def metrics(self):
+        """
+        Return filter metrics since the process started.
+
+        Returns:
+        dict: The stats plus items, bytes and the expected error_rate of the filter.
+        """
+        metrics = dict(self.stats)
+        bloom = self.bloom
+        metrics["items"] = bloom.count if bloom else 0
+        metrics["bytes"] = len(bloom.bits) if bloom else 0
+        metrics["error_rate"] = bloom.error_rate() if bloom else 0.0
+        return metrics
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def compact_expired_tokens(batch_size=None):
+    """
+    Delete expired outstanding tokens, and their blacklist entries, in batches.
+
+    Each batch is its own transaction, so the tables are never locked for the
+    whole purge.
+
+    Parameters:
+    batch_size (int): Rows per batch, TOKEN_BLACKLIST_COMPACT_BATCH_SIZE by default.
+
+    Returns:
+    dict: Numbers of outstanding and blacklisted rows deleted and batches run.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import (
+        BlacklistedToken,
+        OutstandingToken,
+    )
+
+    batch_size = batch_size or settings.TOKEN_BLACKLIST_COMPACT_BATCH_SIZE
+    stats = {"outstanding": 0, "blacklisted": 0, "batches": 0}
+    now = timezone.now()
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            stats["blacklisted"] += BlacklistedToken.objects.filter(
+                token_id__in=ids
+            ).delete()[0]
+            stats["outstanding"] += OutstandingToken.objects.filter(
+                id__in=ids
+            ).delete()[0]
+            stats["batches"] += 1
+    return stats
+
+
+def table_sizes():
+    """
+    Count the rows of the token blacklist tables.
+
+    Returns:
+    dict: outstanding, blacklisted and expired row counts.
+    """
+    from rest_framework_simplejwt.token_blacklist.models import (
+        BlacklistedToken,
+        OutstandingToken,
+    )
+
+    return {
+        "outstanding": OutstandingToken.objects.count(),
+        "blacklisted": BlacklistedToken.objects.count(),
+        "expired": OutstandingToken.objects.filter(
+            expires_at__lte=timezone.now()
+        ).count(),
+    }
@@ -0,0 +1,626 @@
+"""
+Module containing a cross-process channel layer and a local broker for it.
+
+InMemoryChannelLayer only reaches consumers in its own process, so with
+several daphne workers a notification reached only the sockets of the worker
+that sent it. BrokerChannelLayer relays messages through a publish/subscribe
+broker speaking the Redis protocol: a Redis server, or ChannelBroker from
+this module (`manage.py run_channel_broker`) where Redis is not available.
+
+Each process subscribes once per group that has local members and once to an
+inbox topic for its specific channels. group_send and send calls made while
+a flush is pending are merged into one pipelined write, with all messages
+for the same topic in one PUBLISH. Pending messages per group and queued
+messages per channel are capped; excess messages are dropped and counted in
+`stats`. While the broker is unreachable, messages only reach channels of
+the sending process. Messages must be JSON serialisable.
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+logger = logging.getLogger(__name__)
+
+# Unsent bytes allowed per connection before messages to it are dropped.
+OUTPUT_LIMIT = 64 * 1024 * 1024
+
+
+def encode_command(*parts):
+    """
+    Encode a command as a RESP array of bulk strings.
+
+    Parameters:
+    parts (str | bytes | int): The command name and its arguments.
+
+    Returns:
+    bytes: The encoded command.
+    """
+    encoded = [b"*%d\r\n" % len(parts)]
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif isinstance(part, int):
+            part = b"%d" % part
+        encoded.append(b"$%d\r\n%s\r\n" % (len(part), part))
+    return b"".join(encoded)
+
+
+async def read_reply(reader):
+    """
+    Read one RESP value from a stream.
+
+    Parameters:
+    reader (StreamReader): The connection to read from.
+
+    Returns:
+    bytes | int | list | None: The decoded value. Errors are returned as
+        ConnectionError instances rather than raised.
+    """
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Connection closed by the broker.")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        return [await read_reply(reader) for _ in range(int(body))]
+    if kind == b":":
+        return int(body)
+    if kind == b"+":
+        return body
+    if kind == b"-":
+        return ConnectionError(body.decode())
+    raise ConnectionError("Unexpected reply from the broker: {!r}".format(line))
+
+
+class BrokerChannelLayer(BaseChannelLayer):
+    """
+    BrokerChannelLayer delivers channel messages across processes through a Redis-compatible broker.
+
+    Network I/O runs on one background thread per process, so the layer can
+    be used from any event loop: the server loop, async_to_sync calls from
+    signal handlers, and the loops of management commands.
+
+    Attributes:
+        host (str): The broker host.
+        port (int): The broker port.
+        prefix (str): The prefix of every topic the layer publishes to.
+        group_capacity (int): The most messages per group waiting for a flush.
+        batch (bool): Whether concurrent sends share one write; off for comparison only.
+        stats (dict): Running totals of messages published, writes, deliveries and drops.
+
+    Methods:
+        - send(channel, message): Send a message to a channel.
+        - receive(channel): Wait for the next message on a channel of this process.
+        - new_channel(prefix): Create a process-specific channel.
+        - group_add(group, channel): Add a channel to a group.
+        - group_discard(group, channel): Remove a channel from a group.
+        - group_send(group, message): Send a message to every channel of a group.
+        - flush(): Forget all local channels and groups.
+        - close(): Stop the background thread.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=6379,
+        prefix="asgi",
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        group_capacity=1000,
+        batch=True,
+        subscribe_timeout=1.0,
+    ):
+        super().__init__(
+            expiry=expiry, capacity=capacity, channel_capacity=channel_capacity
+        )
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.group_expiry = group_expiry
+        self.group_capacity = group_capacity
+        self.batch = batch
+        self.subscribe_timeout = subscribe_timeout
+        self._reset()
+
+    def _reset(self):
+        self.client_prefix = uuid.uuid4().hex
+        self.channels = {}
+        self.groups = {}
+        self.topics = set()
+        self.pending = {}
+        self.flushed = {}
+        self.stats = {"published": 0, "writes": 0, "delivered": 0, "dropped": 0}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._loop = None
+        self._replies = None
+        self._flush_scheduled = False
+        self._publisher = None
+        self._subscriber = None
+        self._acks = defaultdict(list)
+
+    # Topics
+
+    def _inbox_topic(self, client_prefix=None):
+        return "{}:inbox:{}".format(self.prefix, client_prefix or self.client_prefix)
+
+    def _group_topic(self, group):
+        return "{}:group:{}".format(self.prefix, group)
+
+    def _channel_topic(self, channel):
+        if "!" in channel:
+            return self._inbox_topic(channel.split("!", 1)[0].rsplit(".", 1)[-1])
+        return "{}:channel:{}".format(self.prefix, channel)
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        """
+        Send a message onto a (general or specific) channel.
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        entry = self.channels.get(channel)
+        if entry is not None and entry[0] is asyncio.get_running_loop():
+            try:
+                entry[1].put_nowait(message)
+            except asyncio.QueueFull:
+                raise ChannelFull(channel)
+            return
+        await self._publish(self._channel_topic(channel), {"c": channel, "m": message})
+
+    async def receive(self, channel):
+        """
+        Receive the first message that arrives on the channel.
+        """
+        self.require_valid_channel_name(channel)
+        entry = self.channels.get(channel)
+        if entry is None:
+            entry = self._register(channel)
+            if "!" not in channel:
+                await self._subscribe(self._channel_topic(channel))
+        queue = entry[1]
+        try:
+            return await queue.get()
+        except asyncio.CancelledError:
+            if queue.empty():
+                with self._lock:
+                    self.channels.pop(channel, None)
+            raise
+
+    async def new_channel(self, prefix="specific"):
+        """
+        Return a new channel name that can be used by something in our process.
+        """
+        channel = "{}.{}!{}".format(prefix, self.client_prefix, uuid.uuid4().hex)
+        self._register(channel)
+        return channel
+
+    def _register(self, channel):
+        self._io()
+        entry = (
+            asyncio.get_running_loop(),
+            asyncio.Queue(maxsize=self.get_capacity(channel)),
+        )
+        with self._lock:
+            self.channels[channel] = entry
+        return entry
+
+    async def flush(self):
+        """
+        Forget every local channel and group.
+        """
+        with self._lock:
+            topics = [topic for topic in self.topics if topic != self._inbox_topic()]
+            self.topics.difference_update(topics)
+            self.channels.clear()
+            self.groups.clear()
+        for topic in topics:
+            self._io().call_soon_threadsafe(self._io_unsubscribe, topic)
+
+    async def close(self):
+        """
+        Stop the background thread and close the broker connections.
+        """
+        loop = self._take_loop()
+        if loop is not None:
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop)
+            )
+            loop.call_soon_threadsafe(loop.stop)
+
+    def _take_loop(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                return None
+            loop, self._loop = self._loop, None
+        return loop
+
+    def _close_at_exit(self):
+        loop = self._take_loop()
+        if loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(5)
+            except Exception:
+                pass
+            loop.call_soon_threadsafe(loop.stop)
+
+    # Groups extension
+
+    async def group_add(self, group, channel):
+        """
+        Add the channel to a group, subscribing to the group if it is new to this process.
+        """
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        with self._lock:
+            members = self.groups.setdefault(group, {})
+            members[channel] = time.time()
+        await self._subscribe(self._group_topic(group))
+
+    async def group_discard(self, group, channel):
+        """
+        Remove the channel from a group, unsubscribing once no local member is left.
+        """
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        topic = None
+        with self._lock:
+            members = self.groups.get(group)
+            if members is None:
+                return
+            members.pop(channel, None)
+            if not members:
+                del self.groups[group]
+                topic = self._group_topic(group)
+                self.topics.discard(topic)
+        if topic:
+            self._io().call_soon_threadsafe(self._io_unsubscribe, topic)
+
+    async def group_send(self, group, message):
+        """
+        Send a message to every channel of a group, in every process.
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_group_name(group)
+        await self._publish(self._group_topic(group), {"g": group, "m": message})
+
+    # Publishing
+
+    async def _subscribe(self, topic):
+        with self._lock:
+            if topic in self.topics:
+                return
+            self.topics.add(topic)
+        acknowledged = Future()
+        self._io().call_soon_threadsafe(self._io_subscribe, topic, acknowledged)
+        try:
+            await asyncio.wait_for(
+                asyncio.wrap_future(acknowledged), self.subscribe_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Subscribing to %s is not acknowledged yet", topic)
+
+    async def _publish(self, topic, envelope):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            queue = self.pending.setdefault(topic, deque())
+            if len(queue) >= self.group_capacity:
+                queue.popleft()
+                self.stats["dropped"] += 1
+            queue.append(envelope)
+            # Every caller on a loop waits for the same flush.
+            flushed = self.flushed.get(loop)
+            if flushed is None:
+                flushed = self.flushed[loop] = asyncio.Event()
+            schedule = not self._flush_scheduled
+            self._flush_scheduled = True
+        if schedule:
+            self._io().call_soon_threadsafe(self._flush)
+        await flushed.wait()
+
+    # Background thread, everything below runs on self._loop
+
+    def _io(self):
+        if self._pid != os.getpid():
+            # Forked after use: the I/O thread did not survive the fork.
+            self._reset()
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="channel-layer", daemon=True
+                ).start()
+                asyncio.run_coroutine_threadsafe(self._connect_forever(), self._loop)
+                atexit.register(self._close_at_exit)
+            return self._loop
+
+    async def _shutdown(self):
+        publisher, subscriber = self._publisher, self._subscriber
+        if publisher is not None:
+            # Closing with replies unread resets the connection, losing
+            # commands the broker has not read yet: half-close and wait.
+            publisher.write_eof()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._replies), 5)
+            except asyncio.TimeoutError:
+                pass
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for writer in (publisher, subscriber):
+            if writer is not None:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except ConnectionError:
+                    pass
+
+    async def _connect_forever(self):
+        delay = 0.1
+        while True:
+            try:
+                await self._connect()
+                delay = 0.1
+            except (OSError, ConnectionError, asyncio.IncompleteReadError) as error:
+                logger.warning(
+                    "Channel broker %s:%s unavailable: %s", self.host, self.port, error
+                )
+            for writer in (self._publisher, self._subscriber):
+                if writer is not None:
+                    writer.close()
+            self._publisher = self._subscriber = None
+            for futures in self._acks.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(False)
+            self._acks.clear()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+    async def _connect(self):
+        publisher_reader, publisher = await asyncio.open_connection(
+            self.host, self.port
+        )
+        subscriber_reader, subscriber = await asyncio.open_connection(
+            self.host, self.port
+        )
+        with self._lock:
+            topics = {self._inbox_topic()} | self.topics
+        subscriber.write(encode_command("SUBSCRIBE", *topics))
+        self._publisher, self._subscriber = publisher, subscriber
+        logger.info("Connected to channel broker %s:%s", self.host, self.port)
+        self._flush()
+
+        replies = self._replies = asyncio.ensure_future(
+            self._read_replies(publisher_reader)
+        )
+        try:
+            while True:
+                frame = await read_reply(subscriber_reader)
+                if isinstance(frame, list) and frame[0] == b"message":
+                    self._dispatch(frame[2])
+                elif isinstance(frame, list) and frame[0] == b"subscribe":
+                    for future in self._acks.pop(frame[1].decode(), []):
+                        if not future.done():
+                            future.set_result(True)
+        finally:
+            replies.cancel()
+            await asyncio.gather(replies, return_exceptions=True)
+
+    async def _read_replies(self, reader):
+        while True:
+            try:
+                reply = await read_reply(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                return
+            if isinstance(reply, ConnectionError):
+                logger.warning("Channel broker error: %s", reply)
+
+    def _io_subscribe(self, topic, acknowledged):
+        # While disconnected the topic is subscribed on connect, which
+        # acknowledges it too.
+        self._acks[topic].append(acknowledged)
+        if self._subscriber is not None:
+            self._subscriber.write(encode_command("SUBSCRIBE", topic))
+
+    def _io_unsubscribe(self, topic):
+        with self._lock:
+            if topic in self.topics:
+                return
+        if self._subscriber is not None:
+            self._subscriber.write(encode_command("UNSUBSCRIBE", topic))
+
+    def _flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            flushed, self.flushed = self.flushed, {}
+            self._flush_scheduled = False
+        count = sum(len(queue) for queue in pending.values())
+        publisher = self._publisher
+        if (
+            publisher is None
+            or publisher.transport.get_write_buffer_size() > OUTPUT_LIMIT
+        ):
+            # The broker cannot take them: other processes miss them, but
+            # channels of this process still get them.
+            self.stats["dropped"] += count
+            for queue in pending.values():
+                self._dispatch(json.dumps(list(queue)))
+        elif self.batch:
+            publisher.write(
+                b"".join(
+                    encode_command("PUBLISH", topic, json.dumps(list(queue)))
+                    for topic, queue in pending.items()
+                )
+            )
+            self.stats["writes"] += 1
+            self.stats["published"] += count
+        else:
+            for topic, queue in pending.items():
+                for envelope in queue:
+                    publisher.write(
+                        encode_command("PUBLISH", topic, json.dumps([envelope]))
+                    )
+                    self.stats["writes"] += 1
+            self.stats["published"] += count
+        for loop, event in flushed.items():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The sending loop was closed.
+                pass
+
+    def _dispatch(self, payload):
+        now = time.time()
+        deliveries = defaultdict(list)
+        with self._lock:
+            for envelope in json.loads(payload):
+                if "g" in envelope:
+                    members = self.groups.get(envelope["g"], {})
+                    channels = [
+                        channel
+                        for channel, added in members.items()
+                        if now - added < self.group_expiry
+                    ]
+                else:
+                    channels = [envelope["c"]]
+                for channel in channels:
+                    entry = self.channels.get(channel)
+                    if entry is not None:
+                        message = envelope["m"]
+                        if len(channels) > 1:
+                            message = dict(message)
+                        deliveries[entry[0]].append((entry[1], message))
+        for loop, items in deliveries.items():
+            try:
+                loop.call_soon_threadsafe(self._deliver, items)
+            except RuntimeError:
+                # The receiving loop was closed.
+                self.stats["dropped"] += len(items)
+
+    def _deliver(self, items):
+        for queue, message in items:
+            try:
+                queue.put_nowait(message)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+
+
+class ChannelBroker:
+    """
+    ChannelBroker is a small stand-in for Redis implementing the commands BrokerChannelLayer uses.
+
+    It supports SUBSCRIBE, UNSUBSCRIBE, PUBLISH and PING over RESP, enough to
+    run several workers against one machine-local broker in development and
+    tests. Like Redis, it does not queue messages for absent subscribers.
+    Messages to a subscriber whose socket buffer is over max_buffer bytes
+    are dropped.
+
+    Attributes:
+        host (str): The interface to listen on.
+        port (int): The port to listen on, 0 for any free port.
+        max_buffer (int): The most unsent bytes per subscriber.
+        stats (dict): Running totals of messages published, sent and dropped.
+
+    Methods:
+        - start(): Start listening and return the bound port.
+        - serve_forever(): Start listening and serve until cancelled.
+    """
+
+    def __init__(self, host="127.0.0.1", port=6379, max_buffer=OUTPUT_LIMIT):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer
+        self.subscribers = defaultdict(set)
+        self.stats = {"published": 0, "sent": 0, "dropped": 0}
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self._serve_client, self.host, self.port
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def _publish(self, topic, payload):
+        frame = encode_command("message", topic, payload)
+        receivers = 0
+        for writer in self.subscribers.get(topic, ()):
+            if writer.transport.get_write_buffer_size() > self.max_buffer:
+                self.stats["dropped"] += 1
+                continue
+            writer.write(frame)
+            receivers += 1
+        self.stats["published"] += 1
+        self.stats["sent"] += receivers
+        return receivers
+
+    async def _serve_client(self, reader, writer):
+        topics = set()
+        try:
+            while True:
+                command = await read_reply(reader)
+                if not isinstance(command, list) or not command:
+                    writer.write(b"-ERR expected a command array\r\n")
+                    continue
+                name = command[0].upper()
+                if name == b"PUBLISH" and len(command) == 3:
+                    writer.write(b":%d\r\n" % self._publish(command[1], command[2]))
+                elif name == b"SUBSCRIBE":
+                    for topic in command[1:]:
+                        self.subscribers[topic].add(writer)
+                        topics.add(topic)
+                        writer.write(encode_command("subscribe", topic, len(topics)))
+                elif name == b"UNSUBSCRIBE":
+                    for topic in command[1:] or list(topics):
+                        self.subscribers[topic].discard(writer)
+                        if not self.subscribers[topic]:
+                            del self.subscribers[topic]
+                        topics.discard(topic)
+                        writer.write(encode_command("unsubscribe", topic, len(topics)))
+                elif name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    writer.write(b"-ERR unknown command\r\n")
+                if not writer.is_closing():
+                    try:
+                        await writer.drain()
+                    except ConnectionError:
+                        # Keep executing what the client sent before it left.
+                        pass
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for topic in topics:
+                self.subscribers[topic].discard(writer)
+                if not self.subscribers[topic]:
+                    del self.subscribers[topic]
+            writer.close()
@@ -1,36 +1,98 @@
-from rest_framework.permissions import BasePermission
-
-
-class CanPerformRetrieveOrUpdateOrDelete(BasePermission):
-    """
-    Custom permission class to determine if a user has permission to retrieve, update, or delete a specific post.
-    Permission is granted if the user is an admin or if the post with the specified post_id belongs to the user.
-    """
-
-    def has_permission(self, request, view):
-        """
-        Return `True` if permission is granted, `False` otherwise.
-        """
-        post_id = request.query_params.get("post_id")
-        post = request.user.posts.filter(id=post_id).exists()
-
-        if request.user.is_admin or post:
-
-            return True
-
-
-class CanDeleteComment(BasePermission):
-    """
-    Custom permission class to determine if a user has permission to delete a specific comment.
-    Permission is granted if the comment with the specified comment_id belongs to the user.
-    """
-
-    def has_permission(self, request, view):
-        """
-        Return `True` if permission is granted, `False` otherwise.
-        """
-        comment_id = request.data.get("comment_id")
-        comment = request.user.all_posts_comment.filter(id=comment_id).exists()
-
-        if comment:
-            return True
+from django.contrib.auth import get_user_model
+from rest_framework.permissions import BasePermission
+
+from core.models import Post
+from utils.validators import is_valid_uuid
+
+
+def is_admin(user):
+    """
+    Return whether a user is an admin.
+
+    Views skipping the user lookup (see CachedJWTAuthentication) get a
+    TokenUser without the flag, which is then read from the database.
+    """
+    if hasattr(user, "is_admin"):
+        return user.is_admin
+    return get_user_model().objects.filter(pk=user.id, is_admin=True).exists()
+
+
+class CanPerformRetrieveOrUpdateOrDelete(BasePermission):
+    """
+    Custom permission class to determine if a user has permission to retrieve, update, or delete a specific post.
+    Permission is granted if the user is an admin or if the post with the specified post_id belongs to the user.
+    """
+
+    def has_permission(self, request, view):
+        """
+        Return `True` if permission is granted, `False` otherwise.
+        """
+        post_id = request.query_params.get("post_id")
+        post = request.user.posts.filter(id=post_id).exists()
+
+        if request.user.is_admin or post:
+
+            return True
+
+
+class CanListPostActivity(BasePermission):
+    """
+    Custom permission class to determine if a user may list the comments or likes of a specific post.
+    Permission is granted if the user is an admin or if the post with the specified post_id belongs to the user.
+    A missing or malformed post_id is left to the view, which rejects it.
+    """
+
+    def has_permission(self, request, view):
+        """
+        Return `True` if permission is granted, `False` otherwise.
+        """
+        post_id = request.query_params.get("post_id")
+        if not is_valid_uuid(post_id):
+            return True
+        owned = Post.objects.filter(id=post_id, user_id=request.user.id).exists()
+        return owned or is_admin(request.user)
+
+
+class CanListUserActivity(BasePermission):
+    """
+    Custom permission class to determine if a user may list the posts, followers or followings of a user.
+    Permission is granted if the user is an admin or if the user_id query parameter is missing or their own.
+    """
+
+    def has_permission(self, request, view):
+        """
+        Return `True` if permission is granted, `False` otherwise.
+        """
+        user_id = request.query_params.get("user_id")
+        if not user_id or user_id.lower() == str(request.user.id):
+            return True
+        return is_admin(request.user)
+
+
+class CanDeleteComment(BasePermission):
+    """
+    Custom permission class to determine if a user has permission to delete a specific comment.
+    Permission is granted if the comment with the specified comment_id belongs to the user.
+    """
+
+    def has_permission(self, request, view):
+        """
+        Return `True` if permission is granted, `False` otherwise.
+        """
+        comment_id = request.data.get("comment_id")
+        comment = request.user.all_posts_comment.filter(id=comment_id).exists()
+
+        if comment:
+            return True
+
+
+class IsAdmin(BasePermission):
+    """
+    Custom permission class granting access to admin users only.
+    """
+
+    def has_permission(self, request, view):
+        """
+        Return `True` if permission is granted, `False` otherwise.
+        """
+        return bool(request.user and getattr(request.user, "is_admin", False))
@@ -1,10 +1,32 @@
-import inspect
 from typing import Dict, Union
 from django.conf import settings
 from rest_framework import status
 from rest_framework.response import Response
 
 
+class EnvelopeResponse(Response):
+    """
+    Response carrying the {success, message, data, errors} envelope.
+
+    When no success message was given, it is generated at render time from
+    the handler that produced the response, e.g. "Post Successful." for a
+    POST handler. The handler is known from the view and request DRF put in
+    the renderer context, so no stack inspection is needed.
+    """
+
+    @property
+    def rendered_content(self):
+        if isinstance(self.data, dict) and self.data.get("message") is None:
+            self.data["message"] = self.success_message()
+        return super().rendered_content
+
+    def success_message(self) -> str:
+        context = getattr(self, "renderer_context", None) or {}
+        request = context.get("request")
+        handler = request.method.lower() if request is not None else "request"
+        return f'{handler.replace("_", "-").title()} Successful.'
+
+
 class APIResponse:
     """
     APIResponse class handles the creation of custom API responses for success and failure events.
@@ -20,7 +42,6 @@ class APIResponse:
     Methods:
         - response_builder_callback(): Determines whether to build a success or failure response.
         - struct_response(data: dict, success: bool, message: str, errors=None): Constructs the response structure.
-        - success_message(): Generates a success message based on the caller function.
         - success(): Creates a custom response for a success event with status code 200.
         - fail(): Creates a custom response for a failure event with a custom status code.
 
@@ -37,9 +58,9 @@ class APIResponse:
         message: Union[str, Dict[str, str]] = "",
         for_error: bool = False,
         general_error: bool = False,
-    ) -> "APIResponse":
-        cls.__init__(
-            cls,
+    ) -> Response:
+        instance = super().__new__(cls)
+        instance.__init__(
             message=message,
             errors=errors,
             status_code=status_code,
@@ -47,13 +68,6 @@ class APIResponse:
             for_error=for_error,
             general_error=general_error,
         )
-        instance = super().__new__(cls)
-        instance.message = message
-        instance.errors = errors
-        instance.status_code = status_code
-        instance.data = data
-        instance.for_error = for_error
-        instance.caller_function = inspect.stack()[1].function
         return instance.response_builder_callback()
 
     def __init__(
@@ -70,7 +84,6 @@ class APIResponse:
         self.status_code = status_code
         self.data = data
         self.for_error = for_error
-        self.caller_function = inspect.stack()[1].function
         self.general_error = general_error
 
     def response_builder_callback(self):
@@ -87,17 +100,13 @@ class APIResponse:
             response["errors"] = errors
         return response
 
-    def success_message(self):
-        return f'{self.caller_function.replace("_", "-").title()} Successful.'
-
     def success(self) -> Response:
         """This method will create custom response for success event with response status 200."""
-        success_message = self.message if self.message else self.success_message()
         response_data = self.struct_response(
-            data=self.data, success=True, message=success_message
+            data=self.data, success=True, message=self.message or None
         )
         success_status = self.status_code if self.status_code else status.HTTP_200_OK
-        return Response(response_data, status=success_status)
+        return EnvelopeResponse(response_data, status=success_status)
 
     def fail(self) -> Response:
         """This method will create custom response for failure event with custom response status."""
@@ -0,0 +1,51 @@
+"""
+Module containing the project-wide DRF exception handler.
+
+Views raise the exceptions of utils.exceptions.exceptions and let them
+propagate. This handler turns them into the same {success, message, data,
+errors} envelope APIResponse builds, so views no longer wrap every handler
+in try/except blocks.
+"""
+
+import logging
+
+from rest_framework import status
+from rest_framework.views import exception_handler, set_rollback
+
+from utils.custom_response import APIResponse
+from utils.exceptions.base_exceptions import APIBaseException
+
+logger = logging.getLogger(__name__)
+
+
+def api_exception_handler(exc, context):
+    """
+    Convert an exception raised by a view into an APIResponse.
+
+    Parameters:
+    exc (Exception): The exception raised by the view.
+    context (dict): The DRF exception context, holding the view and request.
+
+    Returns:
+    Response: The error response.
+    """
+    if isinstance(exc, APIBaseException):
+        set_rollback()
+        return APIResponse(
+            status_code=exc.status_code,
+            errors=exc.error_data(),
+            message=exc.message,
+            for_error=True,
+        )
+
+    response = exception_handler(exc, context)
+    if response is not None:
+        return response
+
+    set_rollback()
+    logger.exception("Unhandled error in %s", context["view"].__class__.__name__)
+    return APIResponse(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        for_error=True,
+        message=str(exc),
+    )
@@ -1,6 +1,6 @@
 """
 Module containing a base exception class with data attributes for item and message.
-This class is intended for use in situations where additional context 
+This class is intended for use in situations where additional context
 is needed when handling exceptions.
 
 Classes:
@@ -64,3 +64,15 @@ class Status500Exception(APIBaseException):
 class Status401Exception(APIBaseException):
     def __init__(self, item, message):
         super().__init__(item, message, status_code=status.HTTP_401_UNAUTHORIZED)
+
+
+class Status413Exception(APIBaseException):
+    def __init__(self, item, message):
+        super().__init__(
+            item, message, status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+
+class Status429Exception(APIBaseException):
+    def __init__(self, item, message):
+        super().__init__(item, message, status_code=status.HTTP_429_TOO_MANY_REQUESTS)
@@ -62,3 +62,31 @@ class MissingCommentException(base_exceptions.Status400Exception):
 
 class MissingFollowerIdException(base_exceptions.Status400Exception):
     pass
+
+
+class InvalidCursorException(base_exceptions.Status400Exception):
+    pass
+
+
+class UploadTooLargeException(base_exceptions.Status413Exception):
+    pass
+
+
+class InvalidImageUploadException(base_exceptions.Status400Exception):
+    pass
+
+
+class TooManyUploadsException(base_exceptions.Status429Exception):
+    pass
+
+
+class InvalidRefreshTokenException(base_exceptions.Status401Exception):
+    pass
+
+
+class TooManyLoginAttemptsException(base_exceptions.Status429Exception):
+    pass
+
+
+class InvalidImportFormatException(base_exceptions.Status400Exception):
+    pass
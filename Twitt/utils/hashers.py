@@ -0,0 +1,50 @@
+"""
+Module containing the password hasher whose work factor is set in settings.
+
+Django's PBKDF2PasswordHasher hard-codes its iteration count, which makes
+each login cost the same CPU time whatever the deployment needs. With
+TunablePBKDF2PasswordHasher first in PASSWORD_HASHERS, the count comes from
+PASSWORD_PBKDF2_ITERATIONS, and stored hashes made with another hasher or
+count are re-hashed the next time their user logs in.
+"""
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    TunablePBKDF2PasswordHasher is PBKDF2-SHA256 with PASSWORD_PBKDF2_ITERATIONS iterations.
+
+    It keeps the "pbkdf2_sha256" algorithm name, so it verifies the hashes of
+    Django's hasher, and it replaces that hasher in PASSWORD_HASHERS.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+def init_hashing_worker(hashers, iterations):
+    """
+    Apply the hasher settings of the parent process in a hashing worker.
+
+    Parameters:
+    hashers (list): The PASSWORD_HASHERS of the parent.
+    iterations (int): The PASSWORD_PBKDF2_ITERATIONS of the parent.
+    """
+    settings.PASSWORD_HASHERS = hashers
+    settings.PASSWORD_PBKDF2_ITERATIONS = iterations
+
+
+def hash_password(password):
+    """
+    Return make_password(password); a module-level function so process pools can run it.
+
+    Parameters:
+    password (str): The raw password, or None for an unusable one.
+
+    Returns:
+    str: The encoded hash.
+    """
+    return make_password(password)
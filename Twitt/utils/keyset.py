@@ -0,0 +1,126 @@
+"""
+Module containing helpers for keyset (seek) pagination.
+
+Keyset pagination filters on the sort key of the last row already returned
+instead of using an OFFSET, so the cost of fetching a page does not grow with
+how deep the client has paged. Cursors handed to clients are opaque
+url-safe base64 strings wrapping the (created_at, id) of that last row.
+"""
+
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from django.db.models import Q
+
+from utils.exceptions.exceptions import InvalidCursorException
+
+
+def encode_cursor(created_at, pk):
+    """
+    Build an opaque cursor from the sort key of a row.
+
+    Parameters:
+    created_at (datetime): The creation timestamp of the row.
+    pk (UUID): The primary key of the row, used as a tie breaker.
+
+    Returns:
+    str: A url-safe cursor string.
+    """
+    raw = "{}|{}".format(created_at.isoformat(), pk)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Parameters:
+    cursor (str): The cursor received from the client.
+
+    Returns:
+    tuple: A (created_at, id) pair.
+
+    Raises:
+    InvalidCursorException: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(pk)
+    except Exception:
+        raise InvalidCursorException(
+            item="Cursor", message="Cursor is not valid or has expired."
+        )
+
+
+def seek(queryset, cursor, descending=True, id_field="id"):
+    """
+    Order a queryset by (created_at, id) and position it after the cursor.
+
+    Parameters:
+    queryset (QuerySet): A queryset of a model with `created_at` and `id`.
+    cursor (str): An optional cursor returned with a previous page.
+    descending (bool): Whether newest rows come first.
+    id_field (str): The field used as a tie breaker, `id` by default.
+
+    Returns:
+    QuerySet: The ordered, filtered queryset.
+    """
+    if descending:
+        queryset = queryset.order_by("-created_at", "-" + id_field)
+    else:
+        queryset = queryset.order_by("created_at", id_field)
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        lookup = "lt" if descending else "gt"
+        # The inclusive bound lets the index range-scan from the cursor;
+        # the OR alone makes the planner walk every newer row first.
+        queryset = queryset.filter(
+            **{"created_at__" + lookup + "e": created_at}
+        ).filter(
+            Q(**{"created_at__" + lookup: created_at})
+            | Q(**{"created_at": created_at, id_field + "__" + lookup: pk})
+        )
+    return queryset
+
+
+def cut_page(rows, limit, id_field="id"):
+    """
+    Trim rows fetched with one extra look-ahead row into a page.
+
+    Parameters:
+    rows (list): Up to limit + 1 rows in page order.
+    limit (int): The maximum number of rows in the page.
+    id_field (str): The attribute used as a tie breaker, `id` by default.
+
+    Returns:
+    tuple: A (rows, next_cursor) pair. next_cursor is None on the last page.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, getattr(rows[-1], id_field))
+    return rows, next_cursor
+
+
+def paginate(queryset, cursor=None, limit=10, descending=True, id_field="id"):
+    """
+    Fetch one keyset page in a single query.
+
+    One extra row is fetched to learn whether another page exists, so no
+    COUNT query is needed.
+
+    Parameters:
+    queryset (QuerySet): The queryset to page through.
+    cursor (str): An optional cursor returned with a previous page.
+    limit (int): The maximum number of rows in the page.
+    descending (bool): Whether newest rows come first.
+    id_field (str): The field used as a tie breaker, `id` by default.
+
+    Returns:
+    tuple: A (rows, next_cursor) pair. next_cursor is None on the last page.
+    """
+    rows = list(seek(queryset, cursor, descending, id_field)[: limit + 1])
+    return cut_page(rows, limit, id_field)
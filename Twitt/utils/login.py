@@ -0,0 +1,98 @@
+"""
+Module containing the login path of UserLoginAPIView and its rate limits.
+
+django.contrib.auth.authenticate() looks the user up by email again after
+the view has checked they exist, and every failed attempt costs a full
+password hash. login_user fetches the user once and checks the password
+against that row, which re-hashes it when PASSWORD_HASHERS or the iteration
+count changed (see utils.hashers). check_login_rate runs before any of it,
+so bursts of attempts against one email or from one address are refused
+without hashing.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from utils.exceptions.exceptions import (
+    TooManyLoginAttemptsException,
+    UserDoesNotExists,
+    UserNotAuthenticated,
+)
+
+
+def _email_key(email):
+    return "login:email:{}".format(email.lower())
+
+
+def _count_attempt(key, limit):
+    if cache.add(key, 1, settings.LOGIN_RATE_LIMIT_WINDOW):
+        attempts = 1
+    else:
+        try:
+            attempts = cache.incr(key)
+        except ValueError:
+            attempts = 1
+            cache.set(key, attempts, settings.LOGIN_RATE_LIMIT_WINDOW)
+    return attempts > limit
+
+
+def check_login_rate(request, email):
+    """
+    Count a login attempt and refuse it when the email or address made too many.
+
+    Attempts are counted per email and per REMOTE_ADDR in windows of
+    LOGIN_RATE_LIMIT_WINDOW seconds, in the default cache, so the limits hold
+    across processes when that cache is shared. A successful login resets
+    the count of its email.
+
+    Parameters:
+    request (Request): The login request.
+    email (str): The email being logged in to.
+
+    Raises:
+    TooManyLoginAttemptsException: When either limit is exceeded.
+    """
+    address = request.META.get("REMOTE_ADDR") or "unknown"
+    limited = _count_attempt(
+        "login:addr:{}".format(address), settings.LOGIN_RATE_LIMIT_ADDRESS_ATTEMPTS
+    )
+    limited |= _count_attempt(_email_key(email), settings.LOGIN_RATE_LIMIT_ATTEMPTS)
+    if limited:
+        raise TooManyLoginAttemptsException(
+            item="Authentication",
+            message="Too many login attempts. Try again later.",
+        )
+
+
+def login_user(email, password):
+    """
+    Return the user with an email after checking their password, in one query.
+
+    A hash made with an outdated hasher or iteration count is replaced by
+    check_password, which takes one more query.
+
+    Parameters:
+    email (str): The email of the user.
+    password (str): The raw password.
+
+    Returns:
+    User: The authenticated user.
+
+    Raises:
+    UserDoesNotExists: If no user has the email.
+    UserNotAuthenticated: If the password is wrong or the user is inactive.
+    """
+    user = get_user_model().objects.filter(email=email).first()
+    if user is None:
+        raise UserDoesNotExists(
+            item="User not Exists",
+            message="User does not exists",
+        )
+    if not (user.check_password(password) and user.is_active):
+        raise UserNotAuthenticated(
+            item="Authentication",
+            message="Email or password is incorrect.",
+        )
+    cache.delete(_email_key(email))
+    return user
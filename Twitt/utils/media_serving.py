@@ -0,0 +1,180 @@
+"""
+Module containing the view serving files from MEDIA_ROOT.
+
+It replaces django.views.static.serve for uploads. Responses carry a strong
+ETag and Last-Modified so browsers and proxies revalidate with a 304, single
+byte ranges are answered with 206, and content-addressed blobs (see
+utils.storage) are marked immutable since their name changes with their
+content. With MEDIA_SENDFILE_HEADER set, the file itself is handed to the
+front web server through X-Accel-Redirect (nginx) or X-Sendfile (Apache,
+lighttpd) and no worker thread streams the bytes.
+"""
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from utils.storage import blob_storage
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def media_etag(path, stat):
+    """
+    Return a strong ETag for a media file.
+
+    Blobs are named after their SHA-256 digest, which is used as is. Other
+    files get one derived from their modification time and size.
+
+    Parameters:
+    path (str): The path below MEDIA_ROOT.
+    stat (os.stat_result): The stat of the file.
+
+    Returns:
+    str: The quoted ETag.
+    """
+    if path.startswith(blob_storage.prefix + "/"):
+        return quote_etag(os.path.splitext(os.path.basename(path))[0])
+    return quote_etag("{:x}-{:x}".format(stat.st_mtime_ns, stat.st_size))
+
+
+def byte_range(request, etag, stat):
+    """
+    Return the (start, end) of a satisfiable single-range request, inclusive.
+
+    Parameters:
+    request (HttpRequest): The request, possibly carrying Range and If-Range.
+    etag (str): The ETag of the file.
+    stat (os.stat_result): The stat of the file.
+
+    Returns:
+    tuple: (start, end), None to send the whole file, or False when the
+        range cannot be satisfied.
+    """
+    match = RANGE_RE.match(request.headers.get("Range", "").replace(" ", ""))
+    if not match or not stat.st_size:
+        return None
+
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        modified = parse_http_date_safe(if_range)
+        if modified is None or int(stat.st_mtime) > modified:
+            return None
+
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start = max(stat.st_size - int(last), 0)
+        end = stat.st_size - 1
+    else:
+        start = int(first)
+        end = min(int(last), stat.st_size - 1) if last else stat.st_size - 1
+    if start >= stat.st_size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_media(request, path):
+    """
+    Serve one file from MEDIA_ROOT with validators, ranges and cache headers.
+
+    Parameters:
+    request (HttpRequest): The GET or HEAD request.
+    path (str): The path below MEDIA_ROOT.
+
+    Returns:
+    HttpResponse: 200, 206, 304, 412 or 416, or Http404 when there is no such file.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError):
+        raise Http404("Media file not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found.")
+
+    etag = media_etag(path, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": (
+            IMMUTABLE
+            if path.startswith(blob_storage.prefix + "/")
+            else "public, max-age={}".format(settings.MEDIA_MAX_AGE)
+        ),
+        "Accept-Ranges": "bytes",
+        "X-Content-Type-Options": "nosniff",
+    }
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified.headers.setdefault(header, value)
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    sendfile = settings.MEDIA_SENDFILE_HEADER
+    if sendfile:
+        # The front server answers ranges and streams the file itself.
+        response = HttpResponse(content_type=content_type)
+        if sendfile == "X-Accel-Redirect":
+            response[sendfile] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + path
+        else:
+            response[sendfile] = full_path
+    else:
+        selected = byte_range(request, etag, stat)
+        if selected is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = "bytes */{}".format(stat.st_size)
+            return response
+        if selected:
+            start, end = selected
+            response = StreamingHttpResponse(
+                _read_range(open(full_path, "rb"), start, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Range"] = "bytes {}-{}/{}".format(
+                start, end, stat.st_size
+            )
+            response["Content-Length"] = end - start + 1
+        else:
+            response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    for header, value in headers.items():
+        response[header] = value
+    return response
@@ -0,0 +1,53 @@
+"""
+Module containing the DRF pagination class used by the list endpoints.
+
+Pages are fetched with keyset pagination on (created_at, id) through
+utils.keyset, so page 10,000 costs the same as page 1 and rows inserted
+while a client is paging do not shift the pages it has not read yet.
+"""
+
+from django.conf import settings
+from rest_framework.pagination import BasePagination
+
+from utils.custom_response import APIResponse
+from utils.keyset import paginate
+
+
+class KeysetPagination(BasePagination):
+    """
+    KeysetPagination pages a queryset newest first with opaque cursors.
+
+    Attributes:
+        cursor_query_param (str): The query parameter carrying the cursor.
+        page_size_query_param (str): The query parameter overriding the page size.
+        max_page_size (int): The largest page size a client may ask for.
+
+    Methods:
+        - paginate_queryset(queryset, request, view): Return the rows of the requested page.
+        - get_paginated_data(data): Wrap serialized rows with the next cursor.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return settings.REST_FRAMEWORK["PAGE_SIZE"]
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        rows, self.next_cursor = paginate(
+            queryset,
+            cursor=request.query_params.get(self.cursor_query_param),
+            limit=self.get_page_size(request),
+        )
+        return rows
+
+    def get_paginated_data(self, data):
+        return {"results": data, "next_cursor": self.next_cursor}
+
+    def get_paginated_response(self, data):
+        return APIResponse(data=self.get_paginated_data(data))
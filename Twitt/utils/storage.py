@@ -0,0 +1,111 @@
+"""
+Module containing the content-addressed file storage used for uploads.
+
+Files are named after the SHA-256 digest of their content, which is
+computed while the upload is streamed to disk. Uploading the same bytes
+twice yields the same name, so each blob is stored once however many rows
+refer to it; core.media counts those references.
+"""
+
+import hashlib
+import os
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    ContentAddressedStorage stores files as blobs/<aa>/<bb>/<sha256><ext>.
+
+    Attributes:
+        prefix (str): The directory below the storage location holding blobs.
+
+    Methods:
+        - blob_name(digest, extension): Return the storage name of a blob.
+        - get_available_name(name, max_length): Return name unchanged, content decides the final name.
+        - temporary_path(): Return a fresh path to stream a new blob to.
+        - commit(temporary, digest, extension): Move a streamed file into place under its blob name.
+        - _save(name, content): Stream content to a temporary file while hashing it, then commit it.
+    """
+
+    prefix = "blobs"
+
+    def blob_name(self, digest, extension):
+        return "{}/{}/{}/{}{}".format(
+            self.prefix, digest[:2], digest[2:4], digest, extension.lower()
+        )
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def temporary_path(self):
+        """
+        Return a fresh path for streaming a new blob to, next to its final place.
+        """
+        directory = self.path(self.prefix)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, "{}.part".format(uuid.uuid4().hex))
+
+    def commit(self, temporary, digest, extension):
+        """
+        Move a fully written temporary file to its blob name, or drop it if the blob exists.
+
+        Parameters:
+        temporary (str): The path returned by temporary_path.
+        digest (str): The SHA-256 hex digest of the file.
+        extension (str): The file extension, including the dot.
+
+        Returns:
+        str: The storage name of the blob.
+        """
+        name = self.blob_name(digest, extension)
+        path = self.path(name)
+        if os.path.exists(path):
+            # Refresh the mtime so the garbage collector's grace period
+            # covers a blob that is being referenced again.
+            os.utime(path)
+            os.remove(temporary)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        return name
+
+    def _save(self, name, content):
+        blob_name = getattr(content, "blob_name", None)
+        if blob_name:
+            # Already streamed into this storage by utils.uploads.
+            return blob_name
+
+        temporary = self.temporary_path()
+        digest = hashlib.sha256()
+        try:
+            fd = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            with os.fdopen(fd, "wb") as output:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            return self.commit(temporary, digest.hexdigest(), os.path.splitext(name)[1])
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+
+blob_storage = ContentAddressedStorage()
+
+
+def get_blob_storage():
+    """
+    Return the storage of uploaded images, for use as a field `storage` callable.
+
+    Returns:
+    ContentAddressedStorage: The shared storage instance.
+    """
+    return blob_storage
@@ -0,0 +1,213 @@
+"""
+Module containing the streaming upload handler and per-user upload limits.
+
+Django's default handlers keep small uploads in memory and spool large ones
+to a temporary file, which is copied again into MEDIA_ROOT when the model is
+saved. StreamingImageUploadHandler writes each chunk straight into the blob
+directory of utils.storage while hashing it, so the saved file is only moved
+into place. The payload is checked against the image signatures on its first
+bytes and against IMAGE_UPLOAD_MAX_SIZE as it streams, so oversized or
+non-image bodies are rejected without reading the rest of the request.
+"""
+
+import functools
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+
+from utils.exceptions.exceptions import (
+    InvalidImageUploadException,
+    TooManyUploadsException,
+    UploadTooLargeException,
+)
+from utils.storage import blob_storage
+
+# Leading bytes of the accepted image formats, with the blob extension for each.
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+HEADER_SIZE = 12
+
+# Room for the multipart boundaries and the other form fields of an upload.
+FORM_OVERHEAD = 64 * 1024
+
+
+def sniff_image(header):
+    """
+    Return the file extension matching the leading bytes of an image.
+
+    Parameters:
+    header (bytes): At least the first HEADER_SIZE bytes of the file.
+
+    Returns:
+    str: The extension, e.g. `.png`, or None when the bytes are not a supported image.
+    """
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    for signature, extension in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return extension
+    return None
+
+
+def _too_large():
+    return UploadTooLargeException(
+        item="Image",
+        message="Images may not be larger than {}.".format(
+            filesizeformat(settings.IMAGE_UPLOAD_MAX_SIZE)
+        ),
+    )
+
+
+class StoredUpload(UploadedFile):
+    """
+    StoredUpload is an upload already written to the blob storage.
+
+    Attributes:
+        blob_name (str): The storage name the upload was committed under.
+
+    Methods:
+        - temporary_file_path(): Return the path of the stored file, so validators read it from disk.
+    """
+
+    def __init__(self, blob_name, **kwargs):
+        self.blob_name = blob_name
+        super().__init__(open(blob_storage.path(blob_name), "rb"), **kwargs)
+
+    def temporary_file_path(self):
+        return blob_storage.path(self.blob_name)
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """
+    StreamingImageUploadHandler streams uploaded files into the blob storage with bounded memory.
+
+    Methods:
+        - handle_raw_input(...): Reject a body whose Content-Length is already too large.
+        - new_file(...): Open a temporary blob file for the next upload.
+        - receive_data_chunk(raw_data, start): Check the size and image header, hash and write the chunk.
+        - file_complete(file_size): Commit the blob and return a StoredUpload.
+        - upload_interrupted(): Delete the partial file.
+    """
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > settings.IMAGE_UPLOAD_MAX_SIZE + FORM_OVERHEAD:
+            raise _too_large()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b""
+        self.extension = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.path = blob_storage.temporary_path()
+        self.file = open(self.path, "wb")
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.upload_interrupted()
+            raise _too_large()
+        if self.extension is None and len(self.header) < HEADER_SIZE:
+            self.header += raw_data[: HEADER_SIZE - len(self.header)]
+            if len(self.header) == HEADER_SIZE:
+                self._check_header()
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+
+    def _check_header(self):
+        self.extension = sniff_image(self.header)
+        if self.extension is None:
+            self.upload_interrupted()
+            raise InvalidImageUploadException(
+                item="Image", message="Upload a valid JPEG, PNG, GIF or WebP image."
+            )
+
+    def file_complete(self, file_size):
+        self.file.close()
+        if self.extension is None:
+            self._check_header()
+        blob_name = blob_storage.commit(
+            self.path, self.digest.hexdigest(), self.extension
+        )
+        return StoredUpload(
+            blob_name,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        path = getattr(self, "path", None)
+        if path and os.path.exists(path):
+            self.file.close()
+            os.remove(path)
+
+
+def stream_image_uploads(request):
+    """
+    Make a request parse its uploads with StreamingImageUploadHandler only.
+
+    Called from the initial() of views taking image uploads, before the body
+    is read; other views keep Django's default handlers.
+
+    Parameters:
+    request (Request): The request, not parsed yet.
+    """
+    request.upload_handlers = [StreamingImageUploadHandler(request)]
+
+
+def limit_concurrent_uploads(method):
+    """
+    Decorate a view method so a user runs at most UPLOAD_CONCURRENCY_PER_USER of them at once.
+
+    The counter lives in the default cache, so the limit holds across
+    processes when that cache is shared. Counters expire after
+    UPLOAD_SLOT_TIMEOUT seconds in case a worker dies holding a slot.
+
+    Parameters:
+    method (function): A view handler taking (self, request, *args, **kwargs).
+
+    Returns:
+    function: The wrapped handler, raising TooManyUploadsException when no slot is free.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = "uploads:{}".format(request.user.pk)
+        if cache.add(key, 1, settings.UPLOAD_SLOT_TIMEOUT):
+            running = 1
+        else:
+            try:
+                running = cache.incr(key)
+            except ValueError:
+                running = 1
+                cache.set(key, running, settings.UPLOAD_SLOT_TIMEOUT)
+        if running > settings.UPLOAD_CONCURRENCY_PER_USER:
+            cache.decr(key)
+            raise TooManyUploadsException(
+                item="Upload",
+                message="Wait for your other uploads to finish.",
+            )
+        try:
+            return method(self, request, *args, **kwargs)
+        finally:
+            try:
+                cache.decr(key)
+            except ValueError:
+                pass
+
+    return wrapper
@@ -0,0 +1,151 @@
+"""
+Module containing the single-writer queue in front of SQLite.
+
+SQLite lets one connection write at a time. Request threads writing at once
+queue on the database lock, polling it until their busy timeout runs out
+and failing with "database is locked" after that, and every one of them
+pays for its own commit. WriteQueue hands small writes to one thread
+instead: the jobs that queued up while it was busy run together in one
+transaction, each in its own savepoint so a failing job only undoes itself,
+and one commit covers them all. Callers wait for their job, so responses
+are still sent once the data is committed.
+
+Jobs and their commit hooks see the event loop of the ASGI server thread
+that queued them, as they would running inline, so hooks that hand work to
+the channel layer (live like counts, like digests) reach the server loop
+instead of starting a private one on the writer thread.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from asgiref.sync import SyncToAsync
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _use_loop(loop):
+    SyncToAsync.threadlocal.main_event_loop = loop
+
+
+class WriteQueue:
+    """
+    WriteQueue runs the writes of every thread on one writer thread, batched into shared transactions.
+
+    Attributes:
+        thread (Thread): The writer thread, started by the first job.
+        stats (dict): Running totals of jobs, batches, failed jobs and failed commits.
+
+    Methods:
+        - submit(func, *args, **kwargs): Queue a write and return a Future of its result.
+        - run(func, *args, **kwargs): Run a write through the queue and return its result.
+    """
+
+    def __init__(self):
+        self.jobs = queue.SimpleQueue()
+        self.thread = None
+        self.stats = {"jobs": 0, "batches": 0, "failed": 0, "failed_commits": 0}
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self._work, name="database-writer", daemon=True
+                )
+                self.thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue a write for the writer thread.
+
+        Parameters:
+        func (callable): Writes to the database; runs in its own savepoint.
+        args, kwargs: Passed to func.
+
+        Returns:
+        Future: Resolved with the result of func, or its exception, once the
+            transaction holding it has committed.
+        """
+        future = Future()
+        loop = getattr(SyncToAsync.threadlocal, "main_event_loop", None)
+        self._start()
+        self.jobs.put((future, func, args, kwargs, loop))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run a write through the queue, or inline when queueing does not apply.
+
+        Writes run inline when DATABASE_WRITE_QUEUE is off, on databases
+        other than SQLite, on the writer thread itself, and inside a
+        transaction of the caller, whose lock the writer thread would wait
+        for.
+
+        Parameters:
+        func (callable): Writes to the database.
+        args, kwargs: Passed to func.
+
+        Returns:
+        The result of func; its exceptions are raised here.
+        """
+        if (
+            not settings.DATABASE_WRITE_QUEUE
+            or connection.vendor != "sqlite"
+            or threading.current_thread() is self.thread
+            or connection.in_atomic_block
+        ):
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def _work(self):
+        while True:
+            batch = [self.jobs.get()]
+            while len(batch) < settings.DATABASE_WRITE_QUEUE_BATCH_SIZE:
+                try:
+                    batch.append(self.jobs.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        close_old_connections()
+        outcomes, committed = [], []
+        try:
+            with transaction.atomic():
+                # Runs first after the commit, before the hooks of the jobs.
+                transaction.on_commit(lambda: committed.append(True))
+                for future, func, args, kwargs, loop in batch:
+                    # Hooks run in the order they were added, so this one
+                    # switches the loop before the hooks of the job run.
+                    _use_loop(loop)
+                    transaction.on_commit(lambda loop=loop: _use_loop(loop))
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, func(*args, **kwargs), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            if committed:
+                logger.exception("A commit hook of queued writes failed")
+            else:
+                self.stats["failed_commits"] += 1
+                logger.exception("Committing %d queued writes failed", len(batch))
+                outcomes = [(future, None, exc) for future, *_ in batch]
+
+        _use_loop(None)
+        self.stats["batches"] += 1
+        for future, result, exc in outcomes:
+            self.stats["jobs"] += 1
+            if exc is None:
+                future.set_result(result)
+            else:
+                self.stats["failed"] += 1
+                future.set_exception(exc)
+
+
+write_queue = WriteQueue()